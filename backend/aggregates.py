@@ -0,0 +1,163 @@
+"""
+LandWatch - Dashboard Aggregates
+Counts and sums behind the dashboard and industrial-area summaries, kept up to
+date as plots, alerts and analyses change instead of being recomputed from the
+full plot registry and alert table on every request.
+
+Alert and analysis counts come from the store and are re-read only when its
+version moves, which a write from any worker does. Responses built from the
+aggregates are cached per ETag, which is derived from the store version and a
+digest of the plot registry: workers in the same state hand out the same
+ETag, so polling clients revalidate with a conditional GET whichever answers.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+
+
+def _area_totals() -> dict:
+    return {"plots": 0, "compliant": 0, "compliance_score": 0, "area_sqm": 0, "dues_pending": 0, "plots_with_dues": 0,
+            "compliance_high": 0, "compliance_medium": 0, "compliance_low": 0}
+
+
+def _plot_entry(plot: dict) -> tuple:
+    return plot["industrial_area"], plot["status"], plot["compliance_score"], plot["area_sqm"], plot["dues_pending"]
+
+
+def _plot_digest(plot_id: str, entry: tuple) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(repr((plot_id, entry)).encode(), digest_size=8).digest(), "big")
+
+
+def compliance_band(score: float) -> str:
+    """high (70-100), medium (40-69) or low (0-39)."""
+    return "high" if score >= 70 else "medium" if score >= 40 else "low"
+
+
+class DashboardAggregates:
+    """
+    Plot counters keyed by industrial area and status, maintained
+    incrementally, plus the alert and analysis counts of `store`.
+
+    Each plot's current contribution is remembered, so an update subtracts
+    the old contribution and adds the new one without rescanning.
+    Safe to call from worker threads.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._plots = {}  # plot_id -> (area, status, score, area_sqm, dues)
+        self._digest = 0  # XOR of _plot_digest over the registry
+        self.plot_status = Counter()  # (area, status) -> plots
+        self.areas = defaultdict(_area_totals)
+        self.alert_status = Counter()  # (severity, status) -> alerts
+        self.analyses = 0
+        self._store_version = None
+        self._store_modified = 0.0
+        self._plots_modified = 0.0
+        self._views = {}
+        self._views_etag = None
+
+    @property
+    def etag(self) -> str:
+        return f'"agg-{self._store_version}-{self._digest:016x}"'
+
+    @property
+    def last_modified(self) -> float:
+        return max(self._store_modified, self._plots_modified)
+
+    # ── Updates ──
+
+    def _apply_plot(self, entry: tuple, sign: int):
+        area, status, score, area_sqm, dues = entry
+        self.plot_status[(area, status)] += sign
+        totals = self.areas[area]
+        totals["plots"] += sign
+        totals["compliant"] += sign * (status == "Compliant")
+        totals["compliance_score"] += sign * score
+        totals["area_sqm"] += sign * area_sqm
+        totals["dues_pending"] += sign * dues
+        totals["plots_with_dues"] += sign * (dues > 0)
+        totals[f"compliance_{compliance_band(score)}"] += sign
+
+    def _account(self, plot_id: str, entry: tuple):
+        previous = self._plots.pop(plot_id, None)
+        if previous is not None:
+            self._apply_plot(previous, -1)
+            self._digest ^= _plot_digest(plot_id, previous)
+        if entry is not None:
+            self._apply_plot(entry, 1)
+            self._digest ^= _plot_digest(plot_id, entry)
+            self._plots[plot_id] = entry
+
+    def load_plots(self, plots: list):
+        """Seed the plot counters from the registry at startup."""
+        with self._lock:
+            for plot in plots:
+                self._account(plot["id"], _plot_entry(plot))
+
+    def update_plots(self, plots: list):
+        """Add plots, or re-account plots whose area, status, score, area or dues changed."""
+        with self._lock:
+            changed = False
+            for plot in plots:
+                entry = _plot_entry(plot)
+                if self._plots.get(plot["id"]) != entry:
+                    self._account(plot["id"], entry)
+                    changed = True
+            if changed:
+                self._plots_modified = time.time()
+
+    def remove_plot(self, plot_id: str):
+        with self._lock:
+            if plot_id in self._plots:
+                self._account(plot_id, None)
+                self._plots_modified = time.time()
+
+    def refresh(self) -> "DashboardAggregates":
+        """Re-read the alert and analysis counts if the store has been written since (blocking)."""
+        version, modified = self.store.version()
+        if version == self._store_version:
+            return self
+        # Read after the version, so the counts are never older than the version they are filed under
+        alert_status, analyses = Counter(self.store.alert_counts()), self.store.count_analyses()
+        with self._lock:
+            self.alert_status, self.analyses = alert_status, analyses
+            self._store_version, self._store_modified = version, modified
+        return self
+
+    # ── Reads ──
+
+    def view(self, name: str, build):
+        """Response body `name`, built by `build(self)` once per ETag."""
+        with self._lock:
+            if self._views_etag != self.etag:
+                self._views.clear()
+                self._views_etag = self.etag
+            body = self._views.get(name)
+            if body is None:
+                body = self._views[name] = build(self)
+            return body
+
+    def status_counts(self) -> Counter:
+        """Plots per status across all areas."""
+        counts = Counter()
+        for (_, status), n in self.plot_status.items():
+            counts[status] += n
+        return counts
+
+    def totals(self) -> dict:
+        """Sums of the per-area totals."""
+        total = _area_totals()
+        for totals in self.areas.values():
+            for key, value in totals.items():
+                total[key] += value
+        return total
+
+    def alerts_with(self, severity: str = None, status: str = None) -> int:
+        return sum(
+            n for (s, st), n in self.alert_status.items()
+            if (severity is None or s == severity) and (status is None or st == status)
+        )
@@ -0,0 +1,303 @@
+"""
+LandWatch - Alert Engine
+Evaluates declarative alert rules against plot facts: registry fields, days
+since the last inspection and the plot's latest analysis. Only the plots a
+change touches are re-evaluated; the outcome is diffed against the plot's
+open alerts so each condition raises at most one open alert, which is updated
+while the condition persists and resolved once it clears.
+
+A rule is a dict:
+    rule      unique rule name
+    type      alert type, or type_from: the fact holding it
+    when      {fact: value or (op, value)}; every condition must hold
+    severity  a severity, a list of (conditions, severity) tiers (first
+              match wins; {} always matches), or severity_from: a fact
+    status    status of a newly raised alert (default "Open")
+    message / action   str.format templates over the facts
+"""
+import operator
+import os
+import string
+import threading
+import uuid
+from datetime import date, datetime, timezone
+
+from storage import SEVERITY_RANK
+
+INSPECTION_OVERDUE_DAYS = int(os.environ.get("LANDWATCH_INSPECTION_OVERDUE_DAYS", 365))
+
+CLOSED_STATUSES = ("Resolved",)
+
+# Deviation classes reported by compute_difference -> alert type
+ANALYSIS_ALERT_TYPES = {
+    "Possible Encroachment/Construction": "Encroachment",
+    "Unauthorized Development": "Unauthorized Construction",
+    "Boundary Deviation": "Boundary Deviation",
+    "Possible Demolition/Clearing": "Land Use Change",
+    "Land Use Change Detected": "Land Use Change",
+}
+
+ALERT_RULES = [
+    {
+        "rule": "encroachment",
+        "type": "Encroachment",
+        "when": {"status": "Encroachment Detected"},
+        "severity": "Critical",
+        "message": "Encroachment detected beyond allotted boundary at {name}. Built-up area is "
+                   "{constructed_area_pct}% of the allotment.",
+        "action": "Issue notice for immediate ground-truthing and rectification",
+    },
+    {
+        "rule": "unauthorized_construction",
+        "type": "Unauthorized Construction",
+        "when": {"status": "Unauthorized Construction"},
+        "severity": "Critical",
+        "message": "Unauthorized construction detected at {name}. Construction observed outside approved plan.",
+        "action": "Issue stop-work order and initiate legal proceedings",
+    },
+    {
+        "rule": "vacant",
+        "type": "Vacant Plot",
+        "when": {"status": "Vacant/Unused"},
+        "severity": "High",
+        "message": "Plot {id} remains vacant despite allotment on {allotment_date}. No construction activity detected.",
+        "action": "Review allotment conditions and issue show-cause notice",
+    },
+    {
+        "rule": "boundary_deviation",
+        "type": "Boundary Deviation",
+        "when": {"status": "Boundary Deviation"},
+        "severity": "Medium",
+        "status": "Under Review",
+        "message": "Boundary mismatch detected at {name}. Current land-use boundary does not align with "
+                   "original allotment map.",
+        "action": "Update base maps and verify on ground",
+    },
+    {
+        "rule": "dues",
+        "type": "Payment Due",
+        "when": {"dues_pending": (">", 0)},
+        "severity": [({"dues_pending": (">", 100000)}, "High"), ({}, "Medium")],
+        "message": "Outstanding dues of ₹{dues_pending:,} for {name}. Includes lease payments and/or water charges.",
+        "action": "Issue demand notice for ₹{dues_pending:,}",
+    },
+    {
+        "rule": "inspection_overdue",
+        "type": "Inspection Overdue",
+        "when": {"days_since_inspection": (">", INSPECTION_OVERDUE_DAYS)},
+        "severity": "Low",
+        "message": "{name} was last inspected on {last_inspection} ({days_since_inspection} days ago).",
+        "action": "Schedule a site inspection",
+    },
+    {
+        "rule": "analysis",
+        "type_from": "analysis_alert_type",
+        "when": {"analysis_risk": ("in", ("Critical", "High", "Medium"))},
+        "severity_from": "analysis_risk",
+        "message": "{analysis_deviations} deviation(s) detected at {name} covering {analysis_change_pct}% of the "
+                   "plot image; the most severe is {analysis_top_severity}.",
+        "action": "{analysis_action}",
+    },
+]
+
+_OPS = {
+    "==": operator.eq, "!=": operator.ne, ">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+    "in": lambda value, options: value in options,
+}
+
+
+def _compile_conditions(when: dict):
+    """(fact, predicate, operand) triples; an unknown operator raises KeyError at import time."""
+    compiled = []
+    for fact, test in when.items():
+        op, operand = test if isinstance(test, tuple) else ("==", test)
+        compiled.append((fact, _OPS[op], operand))
+    return compiled
+
+
+def _holds(conditions, facts: dict) -> bool:
+    for fact, predicate, operand in conditions:
+        value = facts.get(fact)
+        if value is None or not predicate(value, operand):
+            return False
+    return True
+
+
+def _template_facts(*templates) -> tuple:
+    """Facts referenced by str.format templates."""
+    names = {field.split(".")[0].split("[")[0]
+             for template in templates for _, field, _, _ in string.Formatter().parse(template) if field}
+    return tuple(sorted(names))
+
+
+def _compile_rule(rule: dict) -> dict:
+    compiled = dict(rule, conditions=_compile_conditions(rule["when"]),
+                    template_facts=_template_facts(rule["message"], rule["action"]))
+    if isinstance(rule.get("severity"), list):
+        compiled["tiers"] = [(_compile_conditions(when), severity) for when, severity in rule["severity"]]
+    return compiled
+
+
+def analysis_facts(results: dict) -> dict:
+    """Facts of a plot's latest analysis (a stored result or a latest_plot_analyses row)."""
+    summary = results["summary"]
+    top = results.get("top_deviation")
+    if top is None:
+        top = results["deviations"][0] if results.get("deviations") else {}
+    recommendations = results.get("recommendations") or []
+    return {
+        "analysis_result_id": results["result_id"],
+        "analysis_risk": summary["risk_level"],
+        "analysis_deviations": summary["total_deviations"],
+        "analysis_change_pct": summary["change_percentage"],
+        "analysis_top_severity": top.get("severity"),
+        "analysis_alert_type": ANALYSIS_ALERT_TYPES.get(top.get("type"), "Change Detected"),
+        "analysis_action": recommendations[0]["action"] if recommendations else "Review the analysis and verify on ground",
+    }
+
+
+class AlertEngine:
+    """
+    Rule evaluation with an index of open alerts by (plot_id, type). Callers
+    refresh the index from storage before evaluating (see `load`) and persist
+    what `evaluate` returns; the engine itself never touches storage.
+    Safe to call from worker threads.
+    """
+
+    def __init__(self, rules: list = ALERT_RULES):
+        self.rules = [_compile_rule(rule) for rule in rules]
+        # Rules with an equality condition are only tried for plots whose fact
+        # has that value (e.g. the status rules), looked up per combination.
+        self._keys = tuple(sorted({fact for rule in self.rules for fact, test in rule["when"].items()
+                                   if not isinstance(test, tuple)}))
+        self._candidates = {}
+        # Every fact a rule reads; a plot whose values (and the day and its
+        # latest analysis) are unchanged since its last evaluation is skipped.
+        self._inputs = tuple(sorted(
+            {fact for rule in self.rules for fact in rule["when"]}
+            | {fact for rule in self.rules for conditions, _ in rule.get("tiers", ()) for fact, _, _ in conditions}
+            | {rule[key] for rule in self.rules for key in ("type_from", "severity_from") if key in rule}
+            | {fact for rule in self.rules for fact in rule["template_facts"]}
+            | {"last_inspection"}
+        ))
+        self._signatures = {}  # plot_id -> inputs at its last evaluation
+        self._lock = threading.Lock()
+        self._open = {}  # plot_id -> {type: alert}
+        self._fingerprints = {}  # alert_id -> (rule, severity, template facts) it was last rendered from
+        self._analyses = {}  # plot_id -> analysis facts
+        self._inspection_dates = {}
+
+    def load(self, alerts: list, plot_ids: list = None):
+        """
+        Index the open alerts already stored. With `plot_ids` the index of
+        those plots is replaced, picking up what other processes raised or resolved.
+        """
+        with self._lock:
+            kept = {alert["id"] for alert in alerts}
+            for plot_id in plot_ids or ():
+                for alert in self._open.pop(plot_id, {}).values():
+                    if alert["id"] not in kept:
+                        self._fingerprints.pop(alert["id"], None)
+            for alert in alerts:
+                if alert.get("status") not in CLOSED_STATUSES and alert.get("plot_id"):
+                    self._open.setdefault(alert["plot_id"], {})[alert["type"]] = alert
+
+    def set_analysis(self, plot_id: str, results: dict):
+        with self._lock:
+            self._analyses[plot_id] = analysis_facts(results)
+
+    def _facts(self, plot: dict, today: date) -> dict:
+        facts = dict(plot)
+        inspected = plot.get("last_inspection")
+        if inspected:
+            day = self._inspection_dates.get(inspected)
+            if day is None:
+                day = self._inspection_dates[inspected] = date.fromisoformat(inspected)
+            facts["days_since_inspection"] = (today - day).days
+        facts.update(self._analyses.get(plot["id"], ()))
+        return facts
+
+    def _severity(self, rule: dict, facts: dict) -> str:
+        if "severity_from" in rule:
+            return facts[rule["severity_from"]]
+        if "tiers" in rule:
+            return next(severity for conditions, severity in rule["tiers"] if _holds(conditions, facts))
+        return rule["severity"]
+
+    def _rules_for(self, facts: dict) -> list:
+        values = tuple(facts.get(fact) for fact in self._keys)
+        rules = self._candidates.get(values)
+        if rules is None:
+            rules = self._candidates[values] = [
+                rule for rule in self.rules
+                if all(facts.get(fact) == test for fact, test in rule["when"].items() if not isinstance(test, tuple))
+            ]
+        return rules
+
+    def _desired(self, facts: dict) -> dict:
+        """type -> (rule, severity) for every rule that holds; the most severe rule wins a shared type."""
+        desired = {}
+        for rule in self._rules_for(facts):
+            if not _holds(rule["conditions"], facts):
+                continue
+            alert_type = facts[rule["type_from"]] if "type_from" in rule else rule["type"]
+            severity = self._severity(rule, facts)
+            current = desired.get(alert_type)
+            if current is None or SEVERITY_RANK.get(severity, 4) < SEVERITY_RANK.get(current[1], 4):
+                desired[alert_type] = (rule, severity)
+        return desired
+
+    def evaluate(self, plots: list, now: datetime = None) -> list:
+        """
+        Re-evaluate `plots` and return the alerts that were raised, updated or
+        resolved (to be persisted). Unchanged open alerts are not returned.
+        """
+        now = now or datetime.now(timezone.utc)
+        today, stamp = now.date(), now.isoformat()
+        changed = []
+        with self._lock:
+            for plot in plots:
+                analysis = self._analyses.get(plot["id"])
+                signature = (today, analysis, *[plot.get(f) for f in self._inputs])
+                if self._signatures.get(plot["id"]) == signature:
+                    continue
+                self._signatures[plot["id"]] = signature
+                facts = self._facts(plot, today)
+                open_alerts = self._open.setdefault(plot["id"], {})
+                desired = self._desired(facts)
+                for alert_type, (rule, severity) in desired.items():
+                    fingerprint = (rule["rule"], severity, *[facts.get(f) for f in rule["template_facts"]])
+                    alert = open_alerts.get(alert_type)
+                    if alert is not None and self._fingerprints.get(alert["id"]) == fingerprint:
+                        continue
+                    message = rule["message"].format(**facts)
+                    action = rule["action"].format(**facts)
+                    if alert is None:
+                        alert = open_alerts[alert_type] = {
+                            "id": f"ALT-{uuid.uuid4().hex[:8].upper()}",
+                            "type": alert_type,
+                            "severity": severity,
+                            "plot_id": plot["id"],
+                            "plot_name": plot["name"],
+                            "message": message,
+                            "timestamp": stamp,
+                            "action_required": action,
+                            "status": rule.get("status", "Open"),
+                            "rule": rule["rule"],
+                        }
+                    elif (alert["severity"], alert["message"], alert["action_required"]) != (severity, message, action):
+                        alert.update({"severity": severity, "message": message, "action_required": action,
+                                      "rule": rule["rule"], "updated_at": stamp})
+                    else:
+                        self._fingerprints[alert["id"]] = fingerprint
+                        continue
+                    self._fingerprints[alert["id"]] = fingerprint
+                    if rule["rule"] == "analysis":
+                        alert["result_id"] = facts["analysis_result_id"]
+                    changed.append(alert)
+                for alert_type in [t for t in open_alerts if t not in desired]:
+                    alert = open_alerts.pop(alert_type)
+                    self._fingerprints.pop(alert["id"], None)
+                    alert.update({"status": "Resolved", "resolved_at": stamp})
+                    changed.append(alert)
+        return changed
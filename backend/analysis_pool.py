@@ -0,0 +1,304 @@
+"""
+LandWatch - Analysis Worker Pool
+Runs CPU-bound change detection in a bounded process pool so the API event loop stays responsive.
+The pipeline modules are bound lazily: only worker processes load OpenCV and NumPy.
+"""
+import asyncio
+import collections
+import contextlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from geo import GeoTransform, PlotZones
+from lazy import lazy_import
+from metrics import SamplingProfiler, StageTimer
+
+cv2 = lazy_import("cv2")
+image_processing = lazy_import("image_processing")
+ingest = lazy_import("ingest")
+references = lazy_import("references")
+
+POOL_WORKERS = int(os.environ.get("LANDWATCH_POOL_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+POOL_QUEUE_DEPTH = int(os.environ.get("LANDWATCH_POOL_QUEUE_DEPTH", POOL_WORKERS * 2))
+POOL_RETRY_AFTER = int(os.environ.get("LANDWATCH_POOL_RETRY_AFTER", 10))
+WORKER_CV_THREADS = int(os.environ.get("LANDWATCH_WORKER_CV_THREADS", 1))
+
+
+class ImageDecodeError(ValueError):
+    """Raised by a worker when an uploaded image cannot be decoded."""
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Analysis pool is saturated")
+        self.retry_after = retry_after
+
+
+# Set in each worker process by _init_worker; carries (job_id, stage, data)
+# progress events back to the API process.
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+    # Each worker is one process; keep OpenCV from oversubscribing the cores.
+    cv2.setNumThreads(WORKER_CV_THREADS)
+
+
+def job_progress(job_id: str):
+    """Return a progress callback that forwards pipeline events for `job_id`."""
+    if job_id is None or _progress_queue is None:
+        return None
+
+    def progress(stage, **data):
+        _progress_queue.put((job_id, stage, data))
+    return progress
+
+
+def analyze_files(ref_path: str, cur_path: str, job_id: str = None, reference_dir: str = None,
+                  geotransform: list = None, plots: list = None, mode: str = None, profile: bool = False) -> dict:
+    """
+    Decode two uploads spooled to disk (see ingest.spool_file) and run change
+    detection. Executed inside a pool worker. Only the paths cross the process
+    boundary, and large GeoTIFF/JP2 scenes are decoded window by window into
+    disk-backed arrays.
+    With `reference_dir` (a registered reference map) `ref_path` is ignored and
+    the preprocessed reference is memory-mapped instead of decoded.
+    With a `geotransform` for the reference, deviations are clipped against the
+    boundaries of `plots` (dicts with id and boundary) in the same pass.
+    `mode` selects full or coarse-to-fine ("pyramid") detection.
+    With `profile` the run is sampled and the collapsed stacks are returned
+    under the result's "profile" key.
+    """
+    profiler = SamplingProfiler() if profile else contextlib.nullcontext()
+    with profiler:
+        timer = StageTimer(job_progress(job_id))
+        timer("decode")
+        ref_img = ingest.read_image_from_path(ref_path) if reference_dir is None else None
+        cur_img = ingest.read_image_from_path(cur_path)
+        results = _analyze(ref_img, cur_img, timer, job_id, reference_dir, geotransform, plots, mode)
+    if profile:
+        results["profile"] = profiler.collapsed()
+    return results
+
+
+def _analyze(ref_img, cur_img, timer: StageTimer, job_id, reference_dir, geotransform, plots, mode) -> dict:
+    prepared = None
+    if reference_dir is not None:
+        prepared = references.load_prepared_reference(reference_dir)
+        ref_img = prepared["image"]
+    if ref_img is None or cur_img is None:
+        raise ImageDecodeError("Could not decode one or both images")
+
+    zones = None
+    if geotransform is not None:
+        zones = PlotZones(plots or [], GeoTransform(geotransform), ref_img.shape[1], ref_img.shape[0])
+
+    results = image_processing.compute_difference(ref_img, cur_img, progress=timer, result_id=job_id,
+                                                  prepared=prepared, zones=zones, mode=mode)
+    results["metadata"] = {
+        "reference_dimensions": f"{ref_img.shape[1]}x{ref_img.shape[0]}",
+        "current_dimensions": f"{cur_img.shape[1]}x{cur_img.shape[0]}",
+        "megapixels": round(cur_img.shape[0] * cur_img.shape[1] / 1e6, 2),
+        "registration": results.pop("registration", None),
+        # Worker-side stage durations; the API adds the time spent storing the result
+        "timings_ms": {stage: round(ms, 1) for stage, ms in timer.durations().items()},
+    }
+    if zones is not None:
+        results["geotransform"] = zones.transform.gt
+        results["plots"] = zones.summary()
+        results["summary"]["pixel_area_sqm"] = round(zones.pixel_area, 4)
+        results["summary"]["changed_area_sqm"] = round(results["summary"]["changed_area_pixels"] * zones.pixel_area, 1)
+    return results
+
+
+def register_reference_file(path: str, directory: str) -> dict:
+    """Decode, preprocess and persist a reference map from a spooled upload or stored image file.
+    Executed inside a pool worker."""
+    img = ingest.read_image_from_path(path)
+    if img is None:
+        raise ImageDecodeError("Could not decode the reference image")
+    return references.register_reference_image(img, directory)
+
+
+class AnalysisPool:
+    """
+    Bounded process pool with admission control.
+    At most `workers` analyses run at once and at most `queue_depth` more wait;
+    anything beyond that is rejected with PoolSaturated instead of piling up.
+    All bookkeeping happens on the event loop thread, so no locking is needed.
+
+    Progress events emitted by workers are delivered to `on_progress(job_id,
+    stage, data)` on the event loop.
+    """
+
+    def __init__(self, workers: int = POOL_WORKERS, queue_depth: int = POOL_QUEUE_DEPTH,
+                 retry_after: int = POOL_RETRY_AFTER):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self._executor = None
+        self._progress_queue = None
+        self._pump = None
+        self.on_progress = None
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._busy_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._progress_queue = multiprocessing.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self._progress_queue,)
+            )
+            self._pump = threading.Thread(
+                target=self._pump_progress, args=(asyncio.get_running_loop(), self._progress_queue), daemon=True
+            )
+            self._pump.start()
+        return self._executor
+
+    def _pump_progress(self, loop, queue):
+        while True:
+            item = queue.get()
+            if item is None:
+                break
+            if self.on_progress is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self.on_progress, *item)
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_depth
+
+    def submit(self, fn, *args) -> asyncio.Future:
+        """
+        Schedule `fn(*args)` in a worker process and return an awaitable for its result.
+        Admission is decided synchronously: raises PoolSaturated if at capacity.
+        """
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+
+        self.in_flight += 1
+        self.submitted += 1
+        return asyncio.ensure_future(self._run(fn, *args))
+
+    async def map(self, fn, arg_tuples: list) -> list:
+        """
+        Run `fn(*args)` for every tuple in `arg_tuples`, keeping as many in flight
+        as there are free slots (at most one per worker), and return the results
+        in order. A failed call yields its exception in place of a result.
+        Raises PoolSaturated only if no slot is free at all.
+        """
+        free = min(self.workers, self.capacity - self.in_flight)
+        if free <= 0:
+            self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+
+        results = [None] * len(arg_tuples)
+        pending = iter(enumerate(arg_tuples))
+        running = {}
+
+        def launch():
+            for index, args in pending:
+                self.in_flight += 1
+                self.submitted += 1
+                running[asyncio.ensure_future(self._run(fn, *args))] = index
+                return
+
+        for _ in range(free):
+            launch()
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                results[index] = future.exception() or future.result()
+                launch()
+        return results
+
+    def imap(self, fn, arg_tuples):
+        """
+        Ordered, streaming counterpart of `map`: an async iterator over the
+        results of `fn(*args)` in input order, each yielded as soon as it and
+        every earlier one are done, with as many calls in flight as there were
+        free slots. Abandoning the iteration cancels the calls not yet awaited.
+        Admission is decided synchronously: raises PoolSaturated only if no
+        slot is free at all.
+        """
+        free = min(self.workers, self.capacity - self.in_flight)
+        if free <= 0:
+            self.rejected += 1
+            raise PoolSaturated(self.retry_after)
+        return self._imap(fn, arg_tuples, free)
+
+    async def _imap(self, fn, arg_tuples, free: int):
+        pending = iter(arg_tuples)
+        running = collections.deque()
+
+        def launch():
+            for args in pending:
+                self.in_flight += 1
+                self.submitted += 1
+                running.append(asyncio.ensure_future(self._run(fn, *args)))
+                return
+
+        for _ in range(free):
+            launch()
+        try:
+            while running:
+                future = running.popleft()
+                try:
+                    result = await future
+                except Exception as exc:
+                    result = exc
+                launch()
+                yield result
+        finally:
+            for future in running:
+                future.cancel()
+
+    async def _run(self, fn, *args):
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._busy_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        running = min(self.in_flight, self.workers)
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "running": running,
+            "queued": max(0, self.in_flight - self.workers),
+            "utilization": round(running / self.workers, 3) if self.workers else 0,
+            "saturated": self.in_flight >= self.capacity,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_turnaround_ms": round(self._busy_seconds / finished * 1000, 1) if finished else 0,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._progress_queue.put(None)
+            self._progress_queue = None
@@ -0,0 +1,239 @@
+"""
+LandWatch - Consolidated Area Reports
+One PDF per industrial area: a cover summarising every plot, then one section
+per plot with its latest analysis and imagery (downsampled to print
+resolution). Each section is rendered as a separate small PDF, so sections can
+be rendered in parallel in the worker pool, and PDFConcatenator merges them
+into one document while streaming it out section by section.
+"""
+import io
+import os
+import re
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, Image as RLImage
+
+from image_processing import render_visualization
+from report_generator import (
+    META_TABLE_STYLE, RISK_COLORS, body_style, deviation_table, footer_elements, header_elements, heading_style,
+    new_document, recommendation_elements, risk_table, small_style,
+)
+
+REPORT_DPI = int(os.environ.get("LANDWATCH_REPORT_DPI", 150))
+# Embedded side by side: where the change was (reference) and what is there now
+REPORT_IMAGE_KINDS = (("annotated_reference", "Reference (deviations outlined)"), ("overlay", "Current (changes in red)"))
+IMAGE_WIDTH = 83 * mm  # two per row across the 170 mm text width
+IMAGE_MAX_HEIGHT = 95 * mm
+
+PLOT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2d3748')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e2e8f0')),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('ALIGN', (3, 0), (-1, -1), 'CENTER'),
+])
+IMAGE_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTSIZE', (0, 1), (-1, 1), 8),
+    ('TEXTCOLOR', (0, 1), (-1, 1), colors.HexColor('#718096')),
+])
+
+
+def _plot_facts_table(plot: dict) -> Table:
+    rows = [
+        ["Lessee:", plot.get("lessee", "N/A"), "Status:", plot.get("status", "N/A")],
+        ["Allotted:", plot.get("allotment_date", "N/A"), "Last Inspection:", plot.get("last_inspection", "N/A")],
+        ["Area:", f"{plot.get('area_sqm', 0):,} m²", "Land Use:", plot.get("land_use", "N/A")],
+        ["Compliance:", f"{plot.get('compliance_score', 0)}/100", "Dues Pending:", f"Rs. {plot.get('dues_pending', 0):,}"],
+    ]
+    table = Table(rows, colWidths=[70, 160, 90, 155])
+    table.setStyle(META_TABLE_STYLE)
+    return table
+
+
+def _image_row(sources: dict) -> Table:
+    """The REPORT_IMAGE_KINDS visualizations of an analysis, side by side at print resolution."""
+    max_dim = round(IMAGE_WIDTH / 72 * REPORT_DPI)  # points -> pixels
+    images, captions = [], []
+    for kind, caption in REPORT_IMAGE_KINDS:
+        data = render_visualization(kind, sources, "jpeg", max_dim=max_dim)
+        w, h = ImageReader(io.BytesIO(data)).getSize()
+        scale = min(IMAGE_WIDTH / w, IMAGE_MAX_HEIGHT / h)
+        images.append(RLImage(io.BytesIO(data), width=w * scale, height=h * scale))
+        captions.append(caption)
+    table = Table([images, captions], colWidths=[IMAGE_WIDTH + 2 * mm] * len(images))
+    table.setStyle(IMAGE_TABLE_STYLE)
+    return table
+
+
+def render_plot_section(path: str, plot: dict, analysis: dict = None, sources: dict = None) -> str:
+    """
+    Write the report section of one plot to `path` and return it. `sources`
+    are the analysis' render sources with image entries as local file paths
+    (see AnalysisStore.get_render_sources). Executed inside a pool worker.
+    """
+    elements = [Paragraph(f"{plot['id']} - {plot['name']}", heading_style), _plot_facts_table(plot), Spacer(1, 10)]
+    if analysis is None:
+        elements.append(Paragraph("No analysis on record for this plot.", body_style))
+    else:
+        metadata = analysis.get("metadata", {})
+        elements.append(Paragraph(
+            f"Latest analysis {analysis['result_id']} of {metadata.get('analyzed_at', 'N/A')[:16].replace('T', ' ')}",
+            small_style
+        ))
+        elements.append(Spacer(1, 4))
+        elements.append(risk_table(analysis.get("summary", {})))
+        elements.append(Spacer(1, 10))
+        if sources is not None:
+            try:
+                loaded = dict(sources)
+                for name in ("reference", "current"):
+                    with open(sources[name], "rb") as f:
+                        loaded[name] = f.read()
+                elements.append(_image_row(loaded))
+            except (OSError, KeyError, ValueError):
+                elements.append(Paragraph("Imagery for this analysis is no longer available.", small_style))
+            elements.append(Spacer(1, 10))
+        if analysis.get("deviations"):
+            elements.append(deviation_table(analysis["deviations"]))
+            elements.append(Spacer(1, 10))
+        if analysis.get("recommendations"):
+            elements.extend(recommendation_elements(analysis["recommendations"]))
+    new_document(path).build(elements)
+    return path
+
+
+def render_area_cover(path: str, area: dict, plots: list, latest: dict) -> str:
+    """Write the cover of an area report to `path`: area totals and one row per plot with its latest risk level."""
+    analysed = [p for p in plots if p["id"] in latest]
+    elements = header_elements(f"{area['name']} - Consolidated Compliance Report")
+    meta = Table([
+        ["Area ID:", area["id"], "Generated:", datetime.now().strftime("%d-%m-%Y %H:%M")],
+        ["Plots:", str(len(plots)), "Analysed Plots:", str(len(analysed))],
+        ["Compliant:", str(sum(p["status"] == "Compliant" for p in plots)),
+         "Dues Pending:", f"Rs. {sum(p['dues_pending'] for p in plots):,}"],
+    ], colWidths=[85, 150, 90, 150])
+    meta.setStyle(META_TABLE_STYLE)
+    elements += [meta, Spacer(1, 12), Paragraph("Plot Summary", heading_style)]
+
+    rows = [["Plot", "Lessee", "Status", "Compliance", "Dues (Rs.)", "Latest Risk"]]
+    risk_cells = []
+    for i, plot in enumerate(plots, start=1):
+        summary = latest[plot["id"]]["summary"] if plot["id"] in latest else None
+        risk = summary.get("risk_level", "Unknown") if summary else "Not analysed"
+        rows.append([plot["id"], (plot.get("lessee") or "")[:28], plot["status"], str(plot["compliance_score"]),
+                     f"{plot['dues_pending']:,}", risk])
+        if risk in RISK_COLORS:
+            risk_cells += [('BACKGROUND', (5, i), (5, i), RISK_COLORS[risk]), ('TEXTCOLOR', (5, i), (5, i), colors.white)]
+    table = Table(rows, colWidths=[60, 130, 120, 60, 60, 65], repeatRows=1)
+    table.setStyle(PLOT_TABLE_STYLE)
+    table.setStyle(risk_cells)
+    elements.append(table)
+    elements.extend(footer_elements())
+    new_document(path).build(elements)
+    return path
+
+
+# ── Merging ──
+
+_REF = re.compile(rb"(\d+) 0 R\b")
+_OBJ_HEADER = re.compile(rb"\s*(\d+) 0 obj\s")
+_STREAM = re.compile(rb">>\s*stream\r?\n")
+
+
+def _ref(body: bytes, key: bytes):
+    match = re.search(re.escape(key) + rb"\s+(\d+) 0 R", body)
+    return int(match.group(1)) if match else None
+
+
+class PDFConcatenator:
+    """
+    Merges PDFs as written by ReportLab (one classic cross-reference table,
+    flat page tree) into one document, emitting each as it is added. Every
+    object of an added PDF except its catalog, page tree, outlines and info is
+    renumbered and written straight out; only object offsets and page ids are
+    kept, and the page tree, catalog and cross-reference table close the file.
+    """
+
+    def __init__(self, title: str = ""):
+        self.title = title
+        self.offset = 0
+        self.offsets = {}  # object number -> byte offset
+        self.kids = []
+        self.next_id = 3  # 1 = catalog, 2 = page tree
+
+    def _emit(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\x93\x8c\x8b\x9e\n")
+
+    def add(self, data: bytes) -> bytes:
+        """Append the pages of one PDF; returns the bytes to send for it."""
+        start = int(data[data.rindex(b"startxref") + 9:].split()[0])
+        xref, _, trailer = data[start:].partition(b"trailer")
+        lines = xref.split(b"\n")
+        first, count = (int(v) for v in lines[1].split())
+        offsets = {}
+        for number, line in enumerate(lines[2:2 + count], start=first):
+            fields = line.split()
+            if len(fields) == 3 and fields[2] == b"n":
+                offsets[number] = int(fields[0])
+        ends = dict(zip(sorted(offsets, key=offsets.get), sorted(offsets.values())[1:] + [start]))
+
+        def body(number):
+            chunk = data[offsets[number]:ends[number]]
+            chunk = chunk[_OBJ_HEADER.match(chunk).end():].rstrip()
+            return chunk[:-len(b"endobj")].rstrip() if chunk.endswith(b"endobj") else chunk
+
+        root = _ref(trailer, b"/Root")
+        catalog = body(root)
+        pages = _ref(catalog, b"/Pages")
+        kids = [int(n) for n in _REF.findall(re.search(rb"/Kids\s*\[(.*?)\]", body(pages), re.S).group(1))]
+        skip = {root, pages, _ref(trailer, b"/Info"), _ref(catalog, b"/Outlines")}
+        numbers = {old: self.next_id + i for i, old in enumerate(n for n in sorted(offsets) if n not in skip)}
+        numbers[pages] = 2  # pages now hang off the merged page tree
+        self.next_id += len(numbers) - 1
+
+        out = []
+        for old, new in numbers.items():
+            if old == pages:
+                continue
+            chunk = body(old)
+            stream = _STREAM.search(chunk)
+            split = stream.start() if stream else len(chunk)
+            # References only occur in the dictionary part; stream data is copied verbatim
+            head = _REF.sub(lambda m: b"%d 0 R" % numbers[int(m.group(1))], chunk[:split])
+            self.offsets[new] = self.offset + sum(len(c) for c in out)
+            out.append(b"%d 0 obj\n%s%s\nendobj\n" % (new, head, chunk[split:]))
+        self.kids += [numbers[k] for k in kids]
+        return self._emit(b"".join(out))
+
+    def finish(self) -> bytes:
+        """Page tree, catalog, info and cross-reference table."""
+        title = self.title.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+        info = self.next_id
+        objects = {
+            2: b"<< /Count %d /Kids [ %s ] /Type /Pages >>" % (len(self.kids), b" ".join(b"%d 0 R" % k for k in self.kids)),
+            1: b"<< /PageMode /UseNone /Pages 2 0 R /Type /Catalog >>",
+            info: b"<< /Producer (LandWatch) /Title (%s) /CreationDate (D:%s) >>" % (
+                title, datetime.now().strftime("%Y%m%d%H%M%S").encode()),
+        }
+        out = []
+        for number, content in objects.items():
+            self.offsets[number] = self.offset + sum(len(c) for c in out)
+            out.append(b"%d 0 obj\n%s\nendobj\n" % (number, content))
+        xref = self.offset + sum(len(c) for c in out)
+        size = info + 1
+        out.append(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+        out.append(b"".join(b"%010d 00000 n \n" % self.offsets[n] for n in range(1, size)))
+        out.append(b"trailer\n<< /Info %d 0 R /Root 1 0 R /Size %d >>\nstartxref\n%d\n%%%%EOF\n" % (info, size, xref))
+        return self._emit(b"".join(out))
@@ -0,0 +1,143 @@
+"""
+LandWatch - Batch Archives
+Reads a ZIP of plot image pairs for batch analysis of an industrial area.
+
+The archive either carries a manifest.json:
+
+    {"plots": [{"plot_id": "PLOT-001", "reference": "a1_ref.png", "current": "a1_cur.png"},
+               {"plot_id": "PLOT-002", "reference_id": "REF-0123456789AB", "current": "a2.png"}]}
+
+or follows a naming convention, one pair per plot:
+
+    PLOT-001/reference.png  PLOT-001/current.png
+    PLOT-002_reference.jpg  PLOT-002_current.jpg
+
+Pairs are spooled to disk one member at a time (see ingest.spool_file), so
+neither the archive nor its images are held in memory.
+"""
+import json
+import os
+import re
+import zipfile
+
+from lazy import lazy_import
+
+ingest = lazy_import("ingest")
+
+BATCH_MAX_PLOTS = int(os.environ.get("LANDWATCH_BATCH_MAX_PLOTS", 200))
+BATCH_MAX_BYTES = int(os.environ.get("LANDWATCH_BATCH_MAX_MB", 1024)) * 1024 * 1024
+
+_MANIFEST_FIELDS = ("plot_id", "reference", "reference_id", "current")
+_PAIR_NAME = re.compile(r"^(?P<plot>[^/]+?)(?:/|_)(?P<role>reference|current)\.(?:png|jpe?g)$", re.IGNORECASE)
+
+
+class BatchArchiveError(ValueError):
+    """Raised when an uploaded batch archive is malformed."""
+
+
+def _spool_member(archive: zipfile.ZipFile, name: str) -> dict:
+    try:
+        with archive.open(name) as member:
+            return ingest.spool_file(member, os.path.basename(name))
+    except KeyError:
+        raise BatchArchiveError(f"File listed in manifest not found in archive: {name}")
+    except (ingest.UnsupportedImage, ingest.UploadTooLarge) as e:
+        raise BatchArchiveError(f"{name}: {e}")
+
+
+def _manifest_items(archive: zipfile.ZipFile) -> list:
+    try:
+        manifest = json.loads(archive.read("manifest.json"))
+        entries = manifest["plots"]
+    except (ValueError, KeyError, TypeError):
+        raise BatchArchiveError("manifest.json must be a JSON object with a 'plots' list")
+
+    if not isinstance(entries, list):
+        raise BatchArchiveError("manifest.json must be a JSON object with a 'plots' list")
+    items = []
+    for entry in entries:
+        if not isinstance(entry, dict) or "plot_id" not in entry or "current" not in entry:
+            raise BatchArchiveError("Each manifest entry needs 'plot_id' and 'current'")
+        if not all(isinstance(v, str) for k, v in entry.items() if k in _MANIFEST_FIELDS):
+            raise BatchArchiveError(f"Manifest fields {', '.join(_MANIFEST_FIELDS)} must be strings")
+        if ("reference" in entry) == ("reference_id" in entry):
+            raise BatchArchiveError(f"{entry['plot_id']}: give either 'reference' or 'reference_id'")
+        items.append({
+            "plot_id": entry["plot_id"],
+            "reference_filename": entry.get("reference"),
+            "reference": entry.get("reference"),
+            "reference_id": entry.get("reference_id"),
+            "current_filename": entry["current"],
+            "current": entry["current"],
+        })
+    return items
+
+
+def _convention_items(archive: zipfile.ZipFile) -> list:
+    pairs = {}
+    for name in archive.namelist():
+        match = _PAIR_NAME.match(name)
+        if match:
+            pairs.setdefault(match["plot"], {})[match["role"].lower()] = name
+
+    items = []
+    for plot_id, pair in sorted(pairs.items()):
+        if len(pair) != 2:
+            raise BatchArchiveError(f"{plot_id}: both a reference and a current image are required")
+        items.append({
+            "plot_id": plot_id,
+            "reference_filename": os.path.basename(pair["reference"]),
+            "reference": pair["reference"],
+            "reference_id": None,
+            "current_filename": os.path.basename(pair["current"]),
+            "current": pair["current"],
+        })
+    return items
+
+
+def read_batch_archive(file) -> list:
+    """
+    Extract the plot image pairs from a batch ZIP (a path or seekable file).
+    Returns a list of dicts with plot_id, reference/current spooled uploads
+    (see ingest.spool_file) and filenames, and an optional reference_id;
+    the caller owns the spooled files (see discard_items).
+    """
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile:
+        raise BatchArchiveError("Batch upload must be a ZIP archive")
+
+    with archive:
+        # Guard against archives that expand far beyond their upload size
+        if sum(info.file_size for info in archive.infolist()) > BATCH_MAX_BYTES:
+            raise BatchArchiveError("Batch archive is too large")
+        if "manifest.json" in archive.namelist():
+            items = _manifest_items(archive)
+        else:
+            items = _convention_items(archive)
+
+        if not items:
+            raise BatchArchiveError("No plot image pairs found in archive")
+        if len(items) > BATCH_MAX_PLOTS:
+            raise BatchArchiveError(f"Batch exceeds the limit of {BATCH_MAX_PLOTS} plots")
+        seen = set()
+        for item in items:
+            if item["plot_id"] in seen:
+                raise BatchArchiveError(f"Duplicate plot in batch: {item['plot_id']}")
+            seen.add(item["plot_id"])
+
+        try:
+            for item in items:
+                for role in ("reference", "current"):
+                    if item[role] is not None:
+                        item[role] = _spool_member(archive, item[role])
+        except BaseException:
+            discard_items(items)
+            raise
+    return items
+
+
+def discard_items(items: list):
+    """Remove the spooled images of batch items."""
+    for item in items:
+        ingest.discard(*(item[role] for role in ("reference", "current") if isinstance(item[role], dict)))
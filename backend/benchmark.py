@@ -0,0 +1,346 @@
+"""
+LandWatch - Benchmarks
+Reproducible timings of the change-detection pipeline and report generation
+on deterministic synthetic scenes, to catch performance regressions from code
+changes or OpenCV/NumPy upgrades.
+
+    python benchmark.py                                   # default suite
+    python benchmark.py --sizes 1024,8192x4096 --changes 16 --noise 6 --shift 3 --rotate 0.5
+    python benchmark.py --save-baseline                   # record this machine's numbers
+    python benchmark.py --compare                         # exit 1 on regressions beyond --tolerance
+    python benchmark.py --check                           # registration regression checks only
+
+Each case runs in a fresh process (so peak RSS is its own) and reports the
+median wall time of every pipeline stage over --repeat runs, peak RSS,
+throughput and how many planted changes were detected. A baseline is only
+meaningful on the machine (and thread settings) it was recorded on.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from image_processing import (
+    TILED_MIN_PIXELS, classify_deviation, compute_difference, copy_banded, image_to_base64, register_images,
+    scratch_array,
+)
+from metrics import StageTimer
+from report_generator import generate_pdf_report
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_SIZES = "1024,2048,4096"
+BAND_ROWS = 1024  # scenes are generated a band at a time, so 20k px scenes stay disk-backed
+PIPELINE_STAGES = ("align", "diff", "contours", "classify", "render")
+
+
+# ─── SYNTHETIC SCENES ──────────────────────────────────────────────────
+
+def _blank(h: int, w: int) -> np.ndarray:
+    return scratch_array((h, w, 3)) if h * w > TILED_MIN_PIXELS else np.empty((h, w, 3), np.uint8)
+
+
+def _add_noise(img: np.ndarray, sigma: float, seed: int):
+    """Gaussian noise, one deterministic band at a time."""
+    for i, y in enumerate(range(0, img.shape[0], BAND_ROWS)):
+        band = img[y:y + BAND_ROWS]
+        noise = np.random.default_rng((seed, i)).normal(0, sigma, band.shape).astype(np.int16)
+        band[:] = np.clip(band.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_scene(width: int, height: int, changes: int = 8, noise: float = 4.0, shift: float = 0.0,
+                    rotate: float = 0.0, seed: int = 0) -> tuple:
+    """
+    (reference, current, planted) for a deterministic synthetic industrial
+    area: smooth terrain with building footprints and a road grid. The current
+    image has `changes` planted rectangles (new construction or clearing,
+    alternately; `planted` holds their boxes as (x, y, w, h)), is misaligned by
+    a `shift` px translation and a `rotate` degree rotation, and both images
+    carry independent Gaussian noise of sigma `noise`.
+    """
+    rng = np.random.default_rng(seed)
+    reference = _blank(height, width)
+    terrain = rng.integers(80, 150, (height // 128 + 2, width // 128 + 2, 3), dtype=np.uint8)
+    cv2.resize(terrain, (width, height), dst=reference, interpolation=cv2.INTER_LINEAR)
+
+    cell = 256
+    for y in range(0, height - cell, cell):
+        cv2.rectangle(reference, (0, y), (width, y + 12), (105, 105, 110), -1)  # roads between plot rows
+        for x in range(0, width - cell, cell):
+            if rng.random() < 0.55:
+                bw, bh = rng.integers(cell // 4, cell // 2, 2)
+                bx, by = x + int(rng.integers(20, cell - bw - 8)), y + int(rng.integers(20, cell - bh - 8))
+                shade = int(rng.integers(150, 200))
+                cv2.rectangle(reference, (bx, by), (bx + int(bw), by + int(bh)), (shade, shade, shade + 10), -1)
+
+    current = _blank(height, width)
+    copy_banded(reference, current)
+    planted = []
+    side = max(16, min(width, height) // 20)
+    attempts = 0
+    while len(planted) < changes and attempts < changes * 50:
+        attempts += 1
+        w, h = (int(v) for v in rng.integers(side // 2, side * 2, 2))
+        x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+        if any(x < px + pw + 8 and px < x + w + 8 and y < py + ph + 8 and py < y + h + 8 for px, py, pw, ph in planted):
+            continue
+        color = (225, 225, 230) if len(planted) % 2 == 0 else (40, 60, 75)
+        cv2.rectangle(current, (x, y), (x + w, y + h), color, -1)
+        planted.append((x, y, w, h))
+
+    if shift or rotate:
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), rotate, 1.0)
+        matrix[:, 2] += shift
+        warped = _blank(height, width)
+        cv2.warpAffine(current, matrix, (width, height), dst=warped, borderMode=cv2.BORDER_REFLECT)
+        current = warped
+    if noise:
+        _add_noise(reference, noise, seed * 2 + 1)
+        _add_noise(current, noise, seed * 2 + 2)
+    return reference, current, planted
+
+
+def _recall(planted: list, deviations: list) -> float:
+    """Share of planted changes overlapped by at least one detected deviation."""
+    if not planted:
+        return 1.0
+    boxes = [(d["bbox"]["x"], d["bbox"]["y"], d["bbox"]["width"], d["bbox"]["height"]) for d in deviations]
+    found = sum(
+        any(x < bx + bw and bx < x + w and y < by + bh and by < y + h for bx, by, bw, bh in boxes)
+        for x, y, w, h in planted
+    )
+    return round(found / len(planted), 3)
+
+
+# ─── CASES ─────────────────────────────────────────────────────────────
+
+def case_key(case: dict) -> str:
+    return (f"{case['width']}x{case['height']}-c{case['changes']}-n{case['noise']:g}-s{case['shift']:g}"
+            f"-r{case['rotate']:g}-{case['mode']}")
+
+
+def run_case(case: dict) -> dict:
+    """Benchmark one scene configuration. Executed in its own process."""
+    if case.get("threads") is not None:
+        cv2.setNumThreads(case["threads"])
+    started = time.perf_counter()
+    reference, current, planted = synthetic_scene(case["width"], case["height"], case["changes"], case["noise"],
+                                                  case["shift"], case["rotate"], case["seed"])
+    synth_ms = (time.perf_counter() - started) * 1000
+
+    runs = []
+    for _ in range(case["repeat"]):
+        timer = StageTimer()
+        result = compute_difference(reference, current, progress=timer, mode=case["mode"])
+        runs.append({**dict.fromkeys(PIPELINE_STAGES, 0.0), **timer.durations()})
+
+    deviations = result["deviations"]
+    timings = {stage: round(statistics.median(run[stage] for run in runs), 2) for stage in runs[0]}
+
+    # Helpers the API calls per deviation / per response, timed in isolation
+    boxes = [(d["bbox"]["x"], d["bbox"]["y"], d["bbox"]["width"], d["bbox"]["height"]) for d in deviations[:200]]
+    preview = np.ascontiguousarray(current[:2048, :2048])
+    helpers = {
+        "classify_deviation_per_call": lambda: [classify_deviation(reference, current, None, *box) for box in boxes],
+        "image_to_base64_2k": lambda: image_to_base64(preview),
+        "pdf_report": lambda: generate_pdf_report(result),
+    }
+    for name, call in helpers.items():
+        samples = []
+        for _ in range(case["repeat"]):
+            started = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - started) * 1000)
+        if name == "classify_deviation_per_call":
+            timings[name] = round(statistics.median(samples) / max(1, len(boxes)), 4)
+        else:
+            timings[name] = round(statistics.median(samples), 2)
+
+    megapixels = case["width"] * case["height"] / 1e6
+    return {
+        "case": case,
+        "timings_ms": timings,
+        "synth_ms": round(synth_ms, 1),
+        "images_per_sec": round(1000 / timings["total"], 3),
+        "megapixels_per_sec": round(megapixels * 1000 / timings["total"], 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # KiB on Linux
+        "deviations": len(deviations),
+        "recall": _recall(planted, deviations),
+    }
+
+
+def run_suite(cases: list) -> dict:
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        # A fresh interpreter per case so ru_maxrss is that case's own peak
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, case).result()
+        results[case_key(case)] = result
+        _print_result(case_key(case), result)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": f"{platform.system()} {platform.machine()}",
+            "cpu_count": os.cpu_count(),
+            "cv_threads": cases[0].get("threads") if cases else None,
+        },
+        "cases": results,
+    }
+
+
+# ─── REGISTRATION CHECKS ───────────────────────────────────────────────
+#
+# Scenes registration has got wrong before: a genuine change on flat imagery
+# must not be mistaken for misalignment, and a pure shift of fine texture must
+# be recovered to within REGISTRATION_CHECK_TOLERANCE px.
+
+REGISTRATION_CHECK_TOLERANCE = 0.5
+
+
+def _flat_scene_with_new_building() -> tuple:
+    reference = np.full((400, 500, 3), 180, np.uint8)
+    cv2.rectangle(reference, (50, 50), (90, 90), (40, 40, 40), -1)
+    current = reference.copy()
+    cv2.rectangle(current, (250, 200), (290, 240), (40, 40, 40), -1)
+    return reference, current
+
+
+def _shifted_texture(dx: float, dy: float, seed: int = 0) -> tuple:
+    noise = np.random.default_rng(seed).integers(0, 256, (400, 500)).astype(np.uint8)
+    texture = cv2.normalize(cv2.GaussianBlur(noise, (0, 0), 3), None, 0, 255, cv2.NORM_MINMAX)
+    reference = cv2.cvtColor(texture, cv2.COLOR_GRAY2BGR)
+    current = cv2.warpAffine(reference, np.float32([[1, 0, dx], [0, 1, dy]]), (500, 400),
+                             borderMode=cv2.BORDER_REFLECT)
+    return reference, current
+
+
+def registration_checks() -> list:
+    """Failures of the registration regression scenes (empty when all pass)."""
+    failures = []
+    reference, current = _flat_scene_with_new_building()
+    _, info = register_images(reference, current)
+    if info["applied"]:
+        failures.append(f"flat scene: a new building was registered as a {info['shift_px']} px shift")
+    boxes = [(d["bbox"]["x"], d["bbox"]["y"]) for d in compute_difference(reference, current)["deviations"]]
+    if boxes != [(249, 199)]:
+        failures.append(f"flat scene: expected one deviation at (249, 199), got {boxes}")
+
+    reference, current = _shifted_texture(5, 3)
+    _, info = register_images(reference, current)
+    error = np.hypot(info["shift_px"][0] - 5, info["shift_px"][1] - 3)
+    if not info["applied"] or error > REGISTRATION_CHECK_TOLERANCE:
+        failures.append(f"textured scene: shift (5, 3) estimated as {info['shift_px']} (applied: {info['applied']})")
+    return failures
+
+
+# ─── REPORTING ─────────────────────────────────────────────────────────
+
+def _print_result(key: str, result: dict):
+    t = result["timings_ms"]
+    stages = "  ".join(f"{s} {t[s]:.1f}" for s in PIPELINE_STAGES)
+    print(f"{key}\n  total {t['total']:.1f} ms  [{stages}]\n"
+          f"  {result['images_per_sec']} img/s  {result['megapixels_per_sec']} MP/s  peak RSS {result['peak_rss_mb']} MB"
+          f"  deviations {result['deviations']}  recall {result['recall']}\n"
+          f"  classify_deviation {t['classify_deviation_per_call']} ms/call  image_to_base64 {t['image_to_base64_2k']} ms"
+          f"  pdf_report {t['pdf_report']} ms")
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_ms: float) -> list:
+    """
+    Regressions of `current` against `baseline`: timings or peak RSS that grew
+    by more than `tolerance` (a fraction) and, for timings, by at least
+    `min_ms`, plus any drop in recall. Cases missing from either side are skipped.
+    """
+    regressions = []
+    for key, result in current["cases"].items():
+        base = baseline["cases"].get(key)
+        if base is None:
+            continue
+        metrics = [(f"{name} ms", value, base["timings_ms"].get(name), min_ms)
+                   for name, value in result["timings_ms"].items()]
+        metrics.append(("peak RSS MB", result["peak_rss_mb"], base["peak_rss_mb"], 0))
+        for name, value, old, floor in metrics:
+            if old and value > old * (1 + tolerance) and value - old >= floor:
+                regressions.append(f"{key}: {name} {old} -> {value} (+{(value / old - 1) * 100:.0f}%)")
+        if result["recall"] < base["recall"]:
+            regressions.append(f"{key}: recall {base['recall']} -> {result['recall']}")
+    return regressions
+
+
+def _parse_sizes(value: str) -> list:
+    sizes = []
+    for item in value.split(","):
+        width, _, height = item.strip().lower().partition("x")
+        sizes.append((int(width), int(height or width)))
+    return sizes
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the LandWatch change-detection pipeline.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated sizes, N or WxH px (default: %(default)s)")
+    parser.add_argument("--changes", type=int, default=8, help="planted changes per scene")
+    parser.add_argument("--noise", type=float, default=4.0, help="Gaussian noise sigma")
+    parser.add_argument("--shift", type=float, default=2.0, help="misalignment translation in px")
+    parser.add_argument("--rotate", type=float, default=0.3, help="misalignment rotation in degrees")
+    parser.add_argument("--modes", default="full", help="detection modes to run: full, pyramid or both")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the median is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--threads", type=int, help="OpenCV threads (default: OpenCV's choice)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown as a fraction")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="ignore timing differences smaller than this")
+    parser.add_argument("--check", action="store_true", help="run the registration checks only; exit 1 on failure")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = registration_checks()
+        for line in failures:
+            print(f"FAILED {line}")
+        print(f"{len(failures)} registration check(s) failed")
+        return 1 if failures else 0
+
+    cases = [
+        {"width": w, "height": h, "changes": args.changes, "noise": args.noise, "shift": args.shift,
+         "rotate": args.rotate, "mode": mode.strip(), "repeat": args.repeat, "seed": args.seed, "threads": args.threads}
+        for w, h in _parse_sizes(args.sizes) for mode in args.modes.split(",")
+    ]
+    results = run_suite(cases)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; record one with --save-baseline", file=sys.stderr)
+            return 2
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regression(s) against the baseline of {baseline['meta']['created']}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
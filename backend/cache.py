@@ -0,0 +1,143 @@
+"""
+LandWatch - Caching Utilities
+Small in-process caches shared by the API (rendered visualizations, analysis
+results keyed by input content, etc.).
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by entry count and total value size.
+    Values are sized with `sizeof` (len() by default, which suits bytes).
+    With `ttl` (seconds) set, entries older than that are treated as missing.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, sizeof=len, ttl: float = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        if key not in self._data:
+            self.misses += 1
+            return default
+        value, _, stored_at = self._data[key]
+        if self.ttl and time.monotonic() - stored_at > self.ttl:
+            self.discard(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        if key in self._data:
+            self.current_bytes -= self._data.pop(key)[1]
+        self._data[key] = (value, size, time.monotonic())
+        self.current_bytes += size
+        while len(self._data) > self.max_entries or self.current_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._data.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def discard(self, key):
+        if key in self._data:
+            self.current_bytes -= self._data.pop(key)[1]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "ttl_seconds": self.ttl,
+        }
+
+
+def content_key(*blobs: bytes, params: dict = None) -> str:
+    """SHA-256 over the given byte strings and a canonical JSON dump of `params`."""
+    return digest_key(*(hashlib.sha256(blob).hexdigest() for blob in blobs), params=params)
+
+
+def digest_key(*sha256s: str, params: dict = None) -> str:
+    """content_key for inputs already hashed, given their SHA-256 hex digests."""
+    digest = hashlib.sha256()
+    for sha256 in sha256s:
+        digest.update(bytes.fromhex(sha256))
+    digest.update(json.dumps(params or {}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Maps content keys of analysis inputs to stored result ids. A bounded LRU
+    index answers repeat lookups in memory; on a miss the store's content-key
+    index is consulted, so hits survive restarts and are shared by workers.
+    """
+
+    def __init__(self, store, max_entries: int = 4096, ttl: float = 0):
+        self.store = store
+        self.ttl = ttl
+        self.index = LRUCache(max_entries=max_entries, max_bytes=max_entries, sizeof=lambda _: 1, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # misses that joined an identical analysis already in flight
+
+    def lookup(self, key: str):
+        result_id = self.index.get(key)
+        if result_id is not None and not self.store.has_analysis(result_id):
+            # Evicted from the store by its retention policy
+            self.index.discard(key)
+            result_id = None
+        if result_id is None:
+            result_id = self.store.find_by_content_key(key, max_age_seconds=self.ttl)
+            if result_id is not None:
+                self.index.put(key, result_id)
+        if result_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result_id
+
+    def remember(self, key: str, result_id: str):
+        self.index.put(key, result_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "coalesced": self.coalesced,
+            "indexed_entries": len(self.index),
+            "max_entries": self.index.max_entries,
+            "evictions": self.index.evictions,
+            "ttl_seconds": self.ttl,
+        }
@@ -0,0 +1,118 @@
+"""
+LandWatch - Data Exports
+Row-by-row CSV (optionally gzip-compressed), Arrow IPC and Parquet encoders
+for the plot registry and alert exports. Every encoder consumes an iterator
+of records and yields bytes as it goes, so memory stays constant however
+many rows are exported.
+
+Arrow and Parquet need pyarrow (optional); without it only CSV is available.
+pyarrow is slow to import, so it is loaded on the first columnar export.
+"""
+import csv
+import io
+import tempfile
+import zlib
+
+from lazy import lazy_import
+
+try:
+    pa = lazy_import("pyarrow")
+except ImportError:
+    pa = None
+
+EXPORT_FORMATS = {
+    # format: (media type, file extension)
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+CHUNK_BYTES = 64 * 1024
+BATCH_ROWS = 10_000  # rows per Arrow record batch / Parquet row group
+
+
+class ExportUnavailable(RuntimeError):
+    """Raised when a columnar export is requested but pyarrow is not installed."""
+
+
+def csv_stream(columns: list, records):
+    """CSV of `records` restricted to `columns` (names), header first."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(chunks):
+    """Gzip-compress a byte stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _schema(columns: list):
+    """pyarrow schema from (name, type) columns; types are pyarrow type names such as "string" or "int64"."""
+    if pa is None:
+        raise ExportUnavailable("Arrow and Parquet exports require pyarrow")
+    return pa.schema([(name, pa.type_for_alias(kind)) for name, kind in columns])
+
+
+def _batches(schema, records):
+    names = schema.names
+    rows = []
+    for record in records:
+        rows.append(record)
+        if len(rows) == BATCH_ROWS:
+            yield pa.RecordBatch.from_pylist([{n: r.get(n) for n in names} for r in rows], schema=schema)
+            rows = []
+    if rows:
+        yield pa.RecordBatch.from_pylist([{n: r.get(n) for n in names} for r in rows], schema=schema)
+
+
+def arrow_stream(columns: list, records):
+    """Arrow IPC stream: one record batch per BATCH_ROWS records, sent as each is encoded."""
+    schema = _schema(columns)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in _batches(schema, records):
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def parquet_stream(columns: list, records, scratch_dir: str = None):
+    """
+    Parquet file, one row group per BATCH_ROWS records. Parquet's footer is
+    only known at the end, so row groups are written to a temporary file
+    (not memory) and the file is streamed once complete.
+    """
+    import pyarrow.parquet as pq
+
+    schema = _schema(columns)
+    with tempfile.TemporaryFile(dir=scratch_dir) as spool:
+        with pq.ParquetWriter(pa.PythonFile(spool, mode="w"), schema, compression="zstd") as writer:
+            for batch in _batches(schema, records):
+                writer.write_batch(batch)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def check_format(fmt: str):
+    """Raise ExportUnavailable for a columnar format without pyarrow."""
+    if fmt in ("arrow", "parquet") and pa is None:
+        raise ExportUnavailable("Arrow and Parquet exports require pyarrow")
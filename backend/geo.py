@@ -0,0 +1,206 @@
+"""
+LandWatch - Geo Referencing
+Maps scene pixels to latitude/longitude, indexes plot boundary polygons and
+assigns detected deviations to the plots they intersect, with areas in m².
+
+Geotransforms use the GDAL convention for the reference image's pixel grid:
+    lon = gt[0] + col * gt[1] + row * gt[2]
+    lat = gt[3] + col * gt[4] + row * gt[5]
+Plot boundaries are lists of [lat, lon] vertices, like plot `coordinates`.
+"""
+import json
+import math
+
+from lazy import lazy_import
+
+# Only PlotZones, which runs in the analysis workers, needs these
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+M_PER_DEG_LAT = 110_574.0
+M_PER_DEG_LON_EQUATOR = 111_320.0
+INDEX_CELL_PX = 256
+MAX_MASK_PIXELS = 4_000_000  # deviation masks above this are rasterized at reduced scale
+
+
+def metres_per_degree(lat: float) -> tuple:
+    """(metres per degree of longitude, metres per degree of latitude) at `lat`."""
+    return M_PER_DEG_LON_EQUATOR * math.cos(math.radians(lat)), M_PER_DEG_LAT
+
+
+def square_boundary(center: list, area_sqm: float) -> list:
+    """Axis-aligned square of `area_sqm` centred on a [lat, lon] point, as [lat, lon] vertices."""
+    m_lon, m_lat = metres_per_degree(center[0])
+    half = math.sqrt(area_sqm) / 2
+    dlat, dlon = half / m_lat, half / m_lon
+    lat, lon = center
+    return [
+        [round(lat + dlat, 7), round(lon - dlon, 7)],
+        [round(lat + dlat, 7), round(lon + dlon, 7)],
+        [round(lat - dlat, 7), round(lon + dlon, 7)],
+        [round(lat - dlat, 7), round(lon - dlon, 7)],
+    ]
+
+
+def polygon_area_sqm(boundary: list) -> float:
+    """Planar (shoelace) area of a small [lat, lon] polygon in square metres."""
+    lat0 = sum(p[0] for p in boundary) / len(boundary)
+    m_lon, m_lat = metres_per_degree(lat0)
+    pts = [(p[1] * m_lon, p[0] * m_lat) for p in boundary]
+    return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(pts, pts[1:] + pts[:1]))) / 2
+
+
+def parse_geotransform(value) -> list:
+    """Validate a geotransform given as a JSON string or a 6-number sequence."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError("geotransform must be a JSON list of 6 numbers")
+    if not isinstance(value, (list, tuple)) or len(value) != 6 or not all(isinstance(v, (int, float)) for v in value):
+        raise ValueError("geotransform must be a JSON list of 6 numbers")
+    gt = [float(v) for v in value]
+    if gt[1] * gt[5] - gt[2] * gt[4] == 0:
+        raise ValueError("geotransform is degenerate")
+    return gt
+
+
+class GeoTransform:
+    """Affine pixel <-> geographic mapping for one scene."""
+
+    def __init__(self, gt: list):
+        self.gt = parse_geotransform(gt)
+        a, b, c, d = self.gt[1], self.gt[2], self.gt[4], self.gt[5]
+        det = a * d - b * c
+        self._inv = (d / det, -b / det, -c / det, a / det)
+
+    def to_geo(self, col: float, row: float) -> tuple:
+        """Pixel -> (lat, lon)."""
+        gt = self.gt
+        return gt[3] + col * gt[4] + row * gt[5], gt[0] + col * gt[1] + row * gt[2]
+
+    def to_pixel(self, lat: float, lon: float) -> tuple:
+        """(lat, lon) -> fractional (col, row)."""
+        dx, dy = lon - self.gt[0], lat - self.gt[3]
+        ia, ib, ic, id_ = self._inv
+        return ia * dx + ib * dy, ic * dx + id_ * dy
+
+    def pixel_area_sqm(self, lat: float) -> float:
+        m_lon, m_lat = metres_per_degree(lat)
+        gt = self.gt
+        return abs(gt[1] * gt[5] - gt[2] * gt[4]) * m_lon * m_lat
+
+
+class GridIndex:
+    """Uniform-grid spatial index over axis-aligned boxes (x0, y0, x1, y1)."""
+
+    def __init__(self, cell: float = INDEX_CELL_PX):
+        self.cell = cell
+        self.cells = {}
+
+    def _span(self, box):
+        c = self.cell
+        return (
+            range(int(math.floor(box[0] / c)), int(math.floor(box[2] / c)) + 1),
+            range(int(math.floor(box[1] / c)), int(math.floor(box[3] / c)) + 1),
+        )
+
+    def insert(self, box, item):
+        xs, ys = self._span(box)
+        for gx in xs:
+            for gy in ys:
+                self.cells.setdefault((gx, gy), []).append((box, item))
+
+    def remove(self, box, item):
+        """Remove `item`, inserted with `box`."""
+        xs, ys = self._span(box)
+        for gx in xs:
+            for gy in ys:
+                entries = self.cells.get((gx, gy), [])
+                entries[:] = [(b, other) for b, other in entries if other is not item]
+
+    def query(self, box) -> list:
+        """Items whose box intersects `box`, each reported once."""
+        found = {}
+        xs, ys = self._span(box)
+        for gx in xs:
+            for gy in ys:
+                for other, item in self.cells.get((gx, gy), ()):
+                    if other[0] <= box[2] and other[2] >= box[0] and other[1] <= box[3] and other[3] >= box[1]:
+                        found[id(item)] = item
+        return list(found.values())
+
+
+class PlotZones:
+    """
+    Plot boundaries projected into a scene's pixel grid. Passed to
+    compute_difference as `zones`: each deviation is measured against the
+    plots its contour intersects as soon as it is classified.
+    """
+
+    def __init__(self, plots: list, transform: GeoTransform, width: int, height: int):
+        self.transform = transform
+        center_lat, _ = transform.to_geo(width / 2, height / 2)
+        self.pixel_area = transform.pixel_area_sqm(center_lat)
+        self.index = GridIndex()
+        self.plots = []
+        scene = (0, 0, width, height)
+        for plot in plots:
+            poly = np.array([transform.to_pixel(lat, lon) for lat, lon in plot["boundary"]], dtype=np.float64)
+            box = (poly[:, 0].min(), poly[:, 1].min(), poly[:, 0].max(), poly[:, 1].max())
+            if box[0] > scene[2] or box[2] < 0 or box[1] > scene[3] or box[3] < 0:
+                continue
+            zone = {"plot_id": plot["id"], "polygon": poly, "box": box, "deviations": [],
+                    "changed_sqm": 0.0, "encroachment_sqm": 0.0}
+            self.plots.append(zone)
+            self.index.insert(box, zone)
+
+    def assign(self, deviation: dict, contour: "np.ndarray"):
+        """Add area_sqm and per-plot inside/outside areas to a deviation."""
+        bbox = deviation["bbox"]
+        x, y, w, h = bbox["x"], bbox["y"], bbox["width"], bbox["height"]
+        area_sqm = deviation["area_pixels"] * self.pixel_area
+        deviation["area_sqm"] = round(area_sqm, 1)
+        deviation["plots"] = []
+
+        candidates = self.index.query((x, y, x + w, y + h))
+        if not candidates:
+            return
+        scale = min(1.0, math.sqrt(MAX_MASK_PIXELS / max(w * h, 1)))
+        mw, mh = max(1, math.ceil(w * scale)), max(1, math.ceil(h * scale))
+        origin = np.array([x, y], dtype=np.float64)
+        region = np.zeros((mh, mw), dtype=np.uint8)
+        pts = ((contour.reshape(-1, 2) - origin) * scale).round().astype(np.int32)
+        cv2.fillPoly(region, [pts], 255)
+        region_px = cv2.countNonZero(region)
+        if region_px == 0:
+            return
+
+        for zone in candidates:
+            plot_mask = np.zeros_like(region)
+            cv2.fillPoly(plot_mask, [((zone["polygon"] - origin) * scale).round().astype(np.int32)], 255)
+            inside = cv2.countNonZero(cv2.bitwise_and(region, plot_mask))
+            if inside == 0:
+                continue
+            inside_sqm = area_sqm * inside / region_px
+            outside_sqm = area_sqm - inside_sqm
+            deviation["plots"].append({
+                "plot_id": zone["plot_id"],
+                "inside_sqm": round(inside_sqm, 1),
+                "outside_sqm": round(outside_sqm, 1),
+            })
+            zone["deviations"].append(deviation["id"])
+            zone["changed_sqm"] += inside_sqm
+            zone["encroachment_sqm"] += outside_sqm
+
+    def summary(self) -> list:
+        """Per-plot findings for every plot the scene covers."""
+        return [
+            {
+                "plot_id": zone["plot_id"],
+                "deviations": zone["deviations"],
+                "changed_sqm": round(zone["changed_sqm"], 1),
+                "encroachment_sqm": round(zone["encroachment_sqm"], 1),
+            }
+            for zone in self.plots
+        ]
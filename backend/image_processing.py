@@ -5,8 +5,56 @@ Performs change detection between reference allotment maps and current satellite
 import cv2
 import numpy as np
 import base64
+import os
+import tempfile
+import time
 import uuid
 
+from masks import MAGIC as MASK_MAGIC, RunMask
+
+# Tiled engine configuration. TILE_SIZE bounds the working set of the tiled
+# path (roughly a dozen uint8 buffers of (TILE_SIZE + 2 * TILE_HALO)^2 px).
+TILE_SIZE = int(os.environ.get("LANDWATCH_TILE_SIZE", 2048))
+TILE_HALO = 16  # >= receptive field of blur + close/open (10 px)
+TILED_MIN_PIXELS = int(os.environ.get("LANDWATCH_TILED_MIN_PIXELS", 4096 * 4096))
+PREVIEW_MAX_DIM = int(os.environ.get("LANDWATCH_PREVIEW_MAX_DIM", 2048))
+# Full-resolution intermediates of scenes above TILED_MIN_PIXELS (decoded
+# images, resized or warped copies) live in unlinked files here, not in RAM.
+SCRATCH_DIR = os.environ.get("LANDWATCH_SCRATCH_DIR") or None
+
+MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+# Everything that changes analysis output for identical inputs; part of the
+# result-cache key, so bump PIPELINE_VERSION whenever detection logic changes.
+PIPELINE_VERSION = 3
+REGISTRATION = os.environ.get("LANDWATCH_REGISTRATION", "1") != "0"
+
+# Coarse-to-fine detection (see compute_difference_pyramid). PYRAMID_THRESHOLD
+# is the coarse-scale intensity a change must reach to be examined at full
+# resolution: lower finds fainter or smaller changes, higher skips more of the scene.
+DETECTION_MODES = ("full", "pyramid")
+DETECTION_MODE = os.environ.get("LANDWATCH_DETECTION_MODE", "full")
+PYRAMID_LEVEL = int(os.environ.get("LANDWATCH_PYRAMID_LEVEL", 2))  # detect at 1/2**level scale
+PYRAMID_THRESHOLD = int(os.environ.get("LANDWATCH_PYRAMID_THRESHOLD", 15))
+PYRAMID_TILE_SIZE = 256  # granularity of the full-resolution refinement
+PYRAMID_MARGIN = 2  # coarse px added around every candidate
+
+# Deviation outlines are simplified (Douglas-Peucker) to within this many px
+# of the traced contour; 0 keeps every contour vertex.
+OUTLINE_TOLERANCE = float(os.environ.get("LANDWATCH_OUTLINE_TOLERANCE", 1.0))
+
+ANALYSIS_PARAMS = {
+    "pipeline_version": PIPELINE_VERSION,
+    "registration": REGISTRATION,
+    "detection_mode": DETECTION_MODE,
+    "pyramid_level": PYRAMID_LEVEL,
+    "pyramid_threshold": PYRAMID_THRESHOLD,
+    "tile_size": TILE_SIZE,
+    "tiled_min_pixels": TILED_MIN_PIXELS,
+    "preview_max_dim": PREVIEW_MAX_DIM,
+    "outline_tolerance": OUTLINE_TOLERANCE,
+}
+
 
 def read_image_from_bytes(file_bytes: bytes) -> np.ndarray:
     """Convert uploaded file bytes to OpenCV image."""
@@ -18,10 +66,27 @@ def read_image_from_bytes(file_bytes: bytes) -> np.ndarray:
 def resize_to_match(ref: np.ndarray, cur: np.ndarray) -> tuple:
     """Resize current image to match reference dimensions."""
     h, w = ref.shape[:2]
-    cur_resized = cv2.resize(cur, (w, h), interpolation=cv2.INTER_AREA)
+    dst = scratch_array((h, w) + cur.shape[2:], cur.dtype) if h * w > TILED_MIN_PIXELS else None
+    cur_resized = cv2.resize(cur, (w, h), dst=dst, interpolation=cv2.INTER_AREA)
     return ref, cur_resized
 
 
+def scratch_array(shape: tuple, dtype=np.uint8) -> np.ndarray:
+    """
+    Disk-backed array in an already unlinked file under SCRATCH_DIR. Its pages
+    are file-backed, so the kernel can evict them instead of growing RSS; the
+    space is reclaimed as soon as the array is released.
+    """
+    with tempfile.TemporaryFile(dir=SCRATCH_DIR) as f:
+        return np.memmap(f, dtype=dtype, mode="w+", shape=shape)
+
+
+def copy_banded(src: np.ndarray, dst: np.ndarray, rows: int = 1024):
+    """Copy `src` into `dst` a band of rows at a time."""
+    for y in range(0, src.shape[0], rows):
+        dst[y:y + rows] = src[y:y + rows]
+
+
 def image_to_base64(img: np.ndarray) -> str:
     """Convert OpenCV image to base64 string for JSON transport."""
     _, buffer = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 85])
@@ -40,55 +105,121 @@ def classify_deviation(ref, cur, contour, x, y, w, h):
     cur_mean = np.mean(cur_gray)
     ref_std = np.std(ref_gray)
     cur_std = np.std(cur_gray)
+    return classify_from_stats(ref_mean, cur_mean, ref_std, cur_std)
+
+
+def classify_from_stats(ref_mean, cur_mean, ref_std, cur_std):
+    """Classify a deviation from the grayscale mean/std of its region in both images."""
+    return str(classify_regions(np.array([ref_mean]), np.array([cur_mean]), np.array([ref_std]), np.array([cur_std]))[0])
 
-    # Bright → Dark: new construction on open land
-    if ref_mean > 180 and cur_mean < 150:
-        return "Possible Encroachment/Construction"
-    # Dark → Bright: demolition or clearing
-    elif ref_mean < 120 and cur_mean > 160:
-        return "Possible Demolition/Clearing"
-    # Texture change: different land use
-    elif abs(ref_std - cur_std) > 25:
-        return "Land Use Change Detected"
-    # Significant intensity shift: unauthorized activity
-    elif abs(ref_mean - cur_mean) > 40:
-        return "Unauthorized Development"
-    # Moderate change
-    elif abs(ref_mean - cur_mean) > 20:
-        return "Boundary Deviation"
-    else:
-        return "Minor Surface Change"
+
+def classify_regions(ref_mean, cur_mean, ref_std, cur_std) -> np.ndarray:
+    """Vectorized classify_from_stats over arrays of region statistics."""
+    shift = np.abs(ref_mean - cur_mean)
+    return np.select(
+        [
+            (ref_mean > 180) & (cur_mean < 150),  # Bright → Dark: new construction on open land
+            (ref_mean < 120) & (cur_mean > 160),  # Dark → Bright: demolition or clearing
+            np.abs(ref_std - cur_std) > 25,       # Texture change: different land use
+            shift > 40,                           # Significant intensity shift: unauthorized activity
+            shift > 20,                           # Moderate change
+        ],
+        [
+            "Possible Encroachment/Construction",
+            "Possible Demolition/Clearing",
+            "Land Use Change Detected",
+            "Unauthorized Development",
+            "Boundary Deviation",
+        ],
+        default="Minor Surface Change",
+    )
 
 
 def compute_severity(area_pixels, total_area, intensity):
     """Compute deviation severity based on area, proportion, and intensity."""
+    return str(severity_of_regions(np.array([area_pixels]), total_area, np.array([intensity]))[0])
+
+
+def severity_of_regions(area_pixels, total_area, intensity) -> np.ndarray:
+    """Vectorized compute_severity over arrays of region areas and intensities."""
     proportion = area_pixels / max(total_area, 1) * 100
-    if proportion > 5 or intensity > 80:
-        return "Critical"
-    elif proportion > 2 or intensity > 60:
-        return "High"
-    elif proportion > 0.5 or intensity > 40:
-        return "Medium"
-    else:
-        return "Low"
+    return np.select(
+        [
+            (proportion > 5) | (intensity > 80),
+            (proportion > 2) | (intensity > 60),
+            (proportion > 0.5) | (intensity > 40),
+        ],
+        ["Critical", "High", "Medium"],
+        default="Low",
+    )
 
 
-def compute_difference(reference: np.ndarray, current: np.ndarray) -> dict:
+STATS_BAND_ROWS = 512  # rows per integral-image band in box_statistics
+
+
+def box_statistics(boxes: np.ndarray, ref_gray: np.ndarray, cur_gray: np.ndarray, diff: np.ndarray) -> dict:
     """
-    Compare reference map with current satellite image.
-    Returns comprehensive change detection analysis with visualizations.
+    Mean/std of both grayscale images and mean difference inside every (x, y, w, h)
+    box. Sums are exact, so the means equal np.mean over each ROI.
+
+    When the boxes cover a large part of the image (busy scenes, nested or
+    overlapping boxes) every box is answered from integral images, built in row
+    bands small enough for int32 pixel sums to be exact. Sparse boxes are cheaper
+    to reduce directly with cv2.meanStdDev.
     """
-    # Ensure same size
-    reference, current = resize_to_match(reference, current)
-    h, w = reference.shape[:2]
-    total_area = h * w
+    n = len(boxes)
+    h, w = ref_gray.shape[:2]
+    count = (boxes[:, 2] * boxes[:, 3]).astype(np.float64)
+    if count.sum() * 4 < h * w:
+        stats = np.zeros((5, n))
+        for i, (x, y, bw, bh) in enumerate(boxes.tolist()):
+            ref_m, ref_s = cv2.meanStdDev(ref_gray[y:y+bh, x:x+bw])
+            cur_m, cur_s = cv2.meanStdDev(cur_gray[y:y+bh, x:x+bw])
+            stats[:, i] = ref_m[0, 0], ref_s[0, 0], cur_m[0, 0], cur_s[0, 0], cv2.mean(diff[y:y+bh, x:x+bw])[0]
+        return {
+            "ref_mean": stats[0], "ref_std": stats[1],
+            "cur_mean": stats[2], "cur_std": stats[3],
+            "diff_mean": stats[4],
+        }
 
-    # Convert to grayscale
-    ref_gray = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
-    cur_gray = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY)
+    band_rows = max(1, min(STATS_BAND_ROWS, (2 ** 31 - 1) // (255 * max(w, 1))))
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+    sums = np.zeros((5, n))
+    for top in range(0, h, band_rows):
+        bottom = min(h, top + band_rows)
+        a, b = np.clip(y0, top, bottom) - top, np.clip(y1, top, bottom) - top
+        rows = np.nonzero(b > a)[0]
+        if len(rows) == 0:
+            continue
+        a, b, l, r = a[rows], b[rows], x0[rows], x1[rows]
 
+        def box_sum(ii):
+            return (ii[b, r] - ii[a, r]) - (ii[b, l] - ii[a, l])
+
+        ref_ii, ref_sq = cv2.integral2(ref_gray[top:bottom], sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        cur_ii, cur_sq = cv2.integral2(cur_gray[top:bottom], sdepth=cv2.CV_32S, sqdepth=cv2.CV_64F)
+        diff_ii = cv2.integral(diff[top:bottom], sdepth=cv2.CV_32S)
+        sums[:, rows] += [box_sum(ref_ii), box_sum(ref_sq), box_sum(cur_ii), box_sum(cur_sq), box_sum(diff_ii)]
+
+    ref_mean, cur_mean = sums[0] / count, sums[2] / count
+    return {
+        "ref_mean": ref_mean,
+        "cur_mean": cur_mean,
+        "ref_std": np.sqrt(np.maximum(sums[1] / count - ref_mean ** 2, 0.0)),
+        "cur_std": np.sqrt(np.maximum(sums[3] / count - cur_mean ** 2, 0.0)),
+        "diff_mean": sums[4] / count,
+    }
+
+
+def compute_change_mask(ref_gray: np.ndarray, cur_gray: np.ndarray, ref_blur: np.ndarray = None) -> tuple:
+    """
+    Blur, difference, threshold and clean two grayscale images. Returns (diff, thresh).
+    A precomputed reference blur (see prepare_reference) may be passed as `ref_blur`.
+    """
     # Apply Gaussian blur to reduce noise
-    ref_blur = cv2.GaussianBlur(ref_gray, (5, 5), 0)
+    if ref_blur is None:
+        ref_blur = cv2.GaussianBlur(ref_gray, (5, 5), 0)
     cur_blur = cv2.GaussianBlur(cur_gray, (5, 5), 0)
 
     # Compute absolute difference
@@ -98,75 +229,381 @@ def compute_difference(reference: np.ndarray, current: np.ndarray) -> dict:
     _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
 
     # Morphological operations to clean up noise
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, MORPH_KERNEL)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, MORPH_KERNEL)
+    return diff, thresh
 
-    # Find contours of changed regions
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-    # Filter small contours (noise)
-    min_area = total_area * 0.001  # 0.1% of image
-    significant_contours = [c for c in contours if cv2.contourArea(c) > min_area]
+def _gray(img: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
 
-    # -- Generate visual outputs --
 
-    # 1. Overlay: highlight changes on the current image in red
-    overlay = current.copy()
-    mask = np.zeros_like(ref_gray)
-    cv2.drawContours(mask, significant_contours, -1, 255, -1)
-    overlay[mask > 0] = [0, 0, 255]  # Red overlay
-    overlay = cv2.addWeighted(current, 0.6, overlay, 0.4, 0)
-    # Draw contour outlines
-    cv2.drawContours(overlay, significant_contours, -1, (0, 0, 255), 2)
+# ─── REFERENCE PREPROCESSING ────────────────────────────────────────────
+#
+# Reference allotment maps rarely change, so a registered reference is
+# decoded, converted and blurred once; compute_difference then takes the
+# prepared arrays instead of redoing that work for every analysis.
 
-    # 2. Heatmap: intensity-based visualization of change magnitude
-    heatmap = cv2.applyColorMap(diff, cv2.COLORMAP_JET)
-    heatmap = cv2.addWeighted(current, 0.5, heatmap, 0.5, 0)
+PYRAMID_LEVELS = 3
+ORB_FEATURES = 2000
+KEYPOINT_LEVEL = 1  # pyramid index keypoints are detected on (1/4 scale)
 
-    # 3. Difference mask: binary black/white
-    diff_colored = cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
 
-    # 4. Annotated reference: reference image with deviation boxes
-    annotated_ref = reference.copy()
-    for i, contour in enumerate(significant_contours):
-        x, y, bw, bh = cv2.boundingRect(contour)
-        cv2.rectangle(annotated_ref, (x, y), (x + bw, y + bh), (0, 255, 0), 2)
-        cv2.putText(annotated_ref, f"D{i+1}", (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+def prepare_reference(reference: np.ndarray) -> dict:
+    """
+    Precompute the reference-side inputs of change detection: grayscale,
+    blurred grayscale, a blurred Gaussian pyramid (1/2, 1/4, 1/8 ...), ORB
+    keypoints/descriptors in full-resolution coordinates and the display preview.
+    """
+    h, w = reference.shape[:2]
+    gray = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    pyramid = _pyramid(blurred)
+    keypoints, descriptors = _orb_features(blurred, pyramid)
 
-    # 5. Annotated current: current image with deviation boxes
-    annotated_cur = current.copy()
-    for i, contour in enumerate(significant_contours):
-        x, y, bw, bh = cv2.boundingRect(contour)
-        cv2.rectangle(annotated_cur, (x, y), (x + bw, y + bh), (0, 0, 255), 2)
-        cv2.putText(annotated_cur, f"D{i+1}", (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+    scale = min(1.0, PREVIEW_MAX_DIM / max(h, w))
+    return {
+        "image": reference,
+        "gray": gray,
+        "blurred": blurred,
+        "pyramid": pyramid,
+        "keypoints": keypoints,
+        "descriptors": descriptors,
+        "preview": _downscale(reference, scale),
+    }
 
-    # -- Classify each deviation --
-    deviations = []
-    for i, contour in enumerate(significant_contours):
+
+def _pyramid(blurred: np.ndarray) -> list:
+    pyramid = []
+    level = blurred
+    for _ in range(PYRAMID_LEVELS):
+        if min(level.shape[:2]) < 2:
+            break
+        level = cv2.pyrDown(level)
+        pyramid.append(level)
+    return pyramid
+
+
+def _orb_features(blurred: np.ndarray, pyramid: list) -> tuple:
+    """ORB keypoints (Nx6: x, y, size, angle, response, octave in full-res px) and descriptors."""
+    kp_index = min(KEYPOINT_LEVEL, len(pyramid) - 1)
+    kp_image = pyramid[kp_index] if kp_index >= 0 else blurred
+    factor = 2 ** (kp_index + 1) if kp_index >= 0 else 1
+    kps, descriptors = cv2.ORB_create(nfeatures=ORB_FEATURES).detectAndCompute(kp_image, None)
+    keypoints = np.array(
+        [(kp.pt[0] * factor, kp.pt[1] * factor, kp.size * factor, kp.angle, kp.response, kp.octave) for kp in kps],
+        dtype=np.float32,
+    ).reshape(-1, 6)
+    if descriptors is None:
+        descriptors = np.zeros((0, 32), dtype=np.uint8)
+    return keypoints, descriptors
+
+
+# ─── REGISTRATION ───────────────────────────────────────────────────────
+#
+# Passes are rarely pixel-aligned: a small shift, rotation or scale change
+# turns every edge in the scene into a false deviation. The current image is
+# registered to the reference before differencing. Candidate transforms are
+# ORB matches on the 1/4 scale pyramid level fitted by RANSAC (least-squares
+# refined over the inliers, so sub-pixel at full resolution), and phase
+# correlation refined by ECC (on a level of at most ECC_MAX_DIM px) for
+# rotation and scale. Candidates that move the scene by more than
+# REGISTRATION_MAX_SHIFT of its size or change its scale by more than
+# REGISTRATION_MAX_SCALE are discarded: passes of one plot are never that far
+# apart, and such estimates come from genuine changes rather than misalignment.
+# The rest are scored by normalized cross-correlation over the region they
+# overlap on a pyramid level of at most REGISTRATION_MAX_DIM px, and one only
+# replaces the identity when it beats it by REGISTRATION_MIN_GAIN, so
+# registration does not make alignment worse (ORB fails on smooth imagery,
+# and large genuine changes can bias phase correlation and ECC). The current
+# image is then warped once at full resolution; pixels it does not cover are
+# taken from the reference so they never register as change.
+
+REGISTRATION_MAX_DIM = 512
+REGISTRATION_MIN_CONFIDENCE = 0.3
+REGISTRATION_MIN_GAIN = 0.02
+REGISTRATION_MAX_SHIFT = 0.05  # fraction of the image width/height
+REGISTRATION_MAX_SCALE = 0.05
+REGISTRATION_MIN_OVERLAP = 0.5  # fraction of the scoring level a candidate must cover
+MIN_MATCHES = 12
+ECC_MAX_DIM = 256
+REGISTRATION_SOURCE_MAX_DIM = 4096  # large scenes are registered on copies reduced to this
+ECC_CRITERIA = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 1e-4)
+
+
+def _similarity_from_matches(ref_kp, ref_desc, cur_kp, cur_desc):
+    """Estimate the reference->current similarity from ORB matches, or None."""
+    if len(ref_desc) < MIN_MATCHES or len(cur_desc) < MIN_MATCHES:
+        return None
+    pairs = cv2.BFMatcher(cv2.NORM_HAMMING).knnMatch(np.asarray(ref_desc), cur_desc, k=2)
+    good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < 0.75 * p[1].distance]
+    if len(good) < MIN_MATCHES:
+        return None
+    ref_pts = np.float32([ref_kp[m.queryIdx][:2] for m in good])
+    cur_pts = np.float32([cur_kp[m.trainIdx][:2] for m in good])
+    matrix, inliers = cv2.estimateAffinePartial2D(ref_pts, cur_pts, method=cv2.RANSAC, ransacReprojThreshold=8.0)
+    if matrix is None or int(inliers.sum()) < MIN_MATCHES:
+        return None
+    return matrix
+
+
+def _scaled(matrix: np.ndarray, factor: int) -> np.ndarray:
+    """Express a full-resolution transform on a pyramid level `factor` times smaller."""
+    scaled = np.float32(matrix).copy()
+    scaled[:, 2] /= factor
+    return scaled
+
+
+def _alignment_score(ref_level: np.ndarray, cur_level: np.ndarray, matrix: np.ndarray, factor: int) -> float:
+    """
+    Normalized cross-correlation between the reference level and the aligned
+    current level, over the pixels the aligned level covers (-1 when it covers
+    less than REGISTRATION_MIN_OVERLAP of them).
+    """
+    h, w = ref_level.shape[:2]
+    scaled = _scaled(matrix, factor)
+    flags = cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP
+    aligned = cv2.warpAffine(np.float32(cur_level), scaled, (w, h), flags=flags, borderMode=cv2.BORDER_CONSTANT)
+    covered = cv2.warpAffine(np.ones((h, w), np.uint8), scaled, (w, h), flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP,
+                             borderMode=cv2.BORDER_CONSTANT) > 0
+    if np.count_nonzero(covered) < REGISTRATION_MIN_OVERLAP * h * w:
+        return -1.0
+    ref_values = np.asarray(ref_level, dtype=np.float32)[covered]
+    cur_values = aligned[covered]
+    ref_values -= ref_values.mean()
+    cur_values -= cur_values.mean()
+    norm = float(np.sqrt(np.dot(ref_values, ref_values) * np.dot(cur_values, cur_values)))
+    return float(np.dot(ref_values, cur_values)) / norm if norm > 0 else 0.0
+
+
+def _plausible(matrix: np.ndarray, h: int, w: int) -> bool:
+    """Whether a reference->current transform is within the shift and scale two passes can differ by."""
+    dx, dy = matrix @ np.float32([w / 2, h / 2, 1]) - np.float32([w / 2, h / 2])
+    scale = float(np.hypot(matrix[0, 0], matrix[1, 0]))
+    return (abs(dx) <= REGISTRATION_MAX_SHIFT * w and abs(dy) <= REGISTRATION_MAX_SHIFT * h
+            and abs(scale - 1) <= REGISTRATION_MAX_SCALE)
+
+
+def _describe_transform(matrix: np.ndarray) -> dict:
+    a, b = float(matrix[0, 0]), float(matrix[1, 0])
+    return {
+        "matrix": [[round(float(v), 6) for v in row] for row in matrix],
+        "shift_px": [round(float(matrix[0, 2]), 2), round(float(matrix[1, 2]), 2)],
+        "rotation_deg": round(float(np.degrees(np.arctan2(b, a))), 3),
+        "scale": round(float(np.hypot(a, b)), 5),
+    }
+
+
+def register_images(reference: np.ndarray, current: np.ndarray, prepared: dict = None) -> tuple:
+    """
+    Align `current` to `reference` (same size). Returns (aligned current, info)
+    where info reports the method, the reference->current transform, the
+    alignment confidence (NCC after alignment) and whether the warp was applied.
+    """
+    started = time.perf_counter()
+    h, w = reference.shape[:2]
+    if h * w > TILED_MIN_PIXELS:
+        return _register_large(reference, current, prepared, started)
+    return _register_in_memory(reference, current, prepared, started)
+
+
+def _register_in_memory(reference, current, prepared, started, warp: bool = True) -> tuple:
+    h, w = reference.shape[:2]
+    if prepared is not None:
+        ref_blur, ref_pyr = prepared["blurred"], prepared["pyramid"]
+        ref_kp, ref_desc = prepared["keypoints"], prepared["descriptors"]
+    else:
+        ref_blur = cv2.GaussianBlur(_gray(reference), (5, 5), 0)
+        ref_pyr = _pyramid(ref_blur)
+        ref_kp, ref_desc = _orb_features(ref_blur, ref_pyr)
+    cur_blur = cv2.GaussianBlur(cv2.cvtColor(current, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+    cur_pyr = _pyramid(cur_blur)
+    cur_kp, cur_desc = _orb_features(cur_blur, cur_pyr)
+
+    # Candidates are scored on the finest level within the size budget
+    ref_levels, cur_levels = [ref_blur, *ref_pyr], [cur_blur, *cur_pyr]
+    index = next((i for i, level in enumerate(ref_levels) if max(level.shape) <= REGISTRATION_MAX_DIM),
+                 len(ref_levels) - 1)
+    ref_level, cur_level, factor = np.asarray(ref_levels[index]), cur_levels[index], 2 ** index
+    while max(ref_level.shape) > REGISTRATION_MAX_DIM:
+        ref_level, cur_level, factor = cv2.pyrDown(ref_level), cv2.pyrDown(cur_level), factor * 2
+    ref_small, cur_small, small_factor = ref_level, cur_level, factor
+    while max(ref_small.shape) > ECC_MAX_DIM:
+        ref_small, cur_small, small_factor = cv2.pyrDown(ref_small), cv2.pyrDown(cur_small), small_factor * 2
+
+    candidates = {"identity": np.float32([[1, 0, 0], [0, 1, 0]])}
+    orb = _similarity_from_matches(ref_kp, ref_desc, cur_kp, cur_desc)
+    if orb is not None:
+        candidates["orb"] = orb
+    window = cv2.createHanningWindow(ref_level.shape[::-1], cv2.CV_32F)
+    (dx, dy), _ = cv2.phaseCorrelate(np.float32(ref_level), np.float32(cur_level), window)
+    candidates["phase"] = np.float32([[1, 0, dx * factor], [0, 1, dy * factor]])
+    try:
+        _, refined = cv2.findTransformECC(ref_small, cur_small, _scaled(candidates["phase"], small_factor),
+                                          cv2.MOTION_EUCLIDEAN, ECC_CRITERIA, None, 1)
+        refined[:, 2] *= small_factor
+        candidates["phase+ecc"] = refined
+    except cv2.error:
+        pass  # ECC did not converge; the plain phase shift remains a candidate
+
+    candidates = {name: m for name, m in candidates.items() if _plausible(m, h, w)}
+    scores = {name: _alignment_score(ref_level, cur_level, m, factor) for name, m in candidates.items()}
+    method = max(scores, key=scores.get)
+    if scores[method] < scores["identity"] + REGISTRATION_MIN_GAIN:
+        method = "identity"
+    matrix = candidates[method]
+
+    info = {"method": method, "confidence": round(max(scores[method], 0.0), 3), **_describe_transform(matrix)}
+    info["applied"] = bool(method != "identity" and scores[method] >= REGISTRATION_MIN_CONFIDENCE)
+    if info["applied"] and warp:
+        aligned = reference.copy()
+        cv2.warpAffine(current, matrix, (w, h), dst=aligned,
+                       flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_TRANSPARENT)
+        current = aligned
+    info["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return current, info
+
+
+def _register_large(reference, current, prepared, started) -> tuple:
+    """
+    register_images for scenes above TILED_MIN_PIXELS: the transform is
+    estimated on copies reduced to at most REGISTRATION_SOURCE_MAX_DIM, built
+    band by band, and the warp is written to a scratch array, so no
+    full-resolution intermediate is held in memory.
+    """
+    h, w = reference.shape[:2]
+    level = max(0, int(np.ceil(np.log2(max(h, w) / REGISTRATION_SOURCE_MAX_DIM))))
+    factor = 2 ** level
+    ref_src = prepared["gray"] if prepared is not None else reference
+    _, info = _register_in_memory(_halve_banded(ref_src, level), _halve_banded(current, level), None, started,
+                                  warp=False)
+    matrix = _scaled(np.float32(info["matrix"]), 1 / factor)
+    info.update(_describe_transform(matrix))
+    info["source_scale"] = 1 / factor
+    if info["applied"]:
+        aligned = scratch_array(reference.shape, reference.dtype)
+        copy_banded(reference, aligned)
+        cv2.warpAffine(current, matrix, (w, h), dst=aligned,
+                       flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_TRANSPARENT)
+        current = aligned
+    info["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return current, info
+
+
+# ─── VISUALIZATIONS ─────────────────────────────────────────────────────
+#
+# Analyses keep only compact render sources (downscaled JPEG sources, the
+# run-length change mask and simplified deviation outlines); each
+# visualization is rendered on demand from them by render_visualization.
+
+RENDER_KINDS = ("overlay", "heatmap", "difference", "annotated_reference", "annotated_current")
+RENDER_FORMATS = {
+    "jpeg": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 85], "image/jpeg"),
+    "webp": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 85], "image/webp"),
+}
+
+
+def _downscale(img: np.ndarray, scale: float, interpolation=cv2.INTER_AREA) -> np.ndarray:
+    if scale >= 1.0:
+        return img
+    h, w = img.shape[:2]
+    return cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=interpolation)
+
+
+def simplify_outline(contour: np.ndarray, tolerance: float = OUTLINE_TOLERANCE) -> list:
+    """A contour as a simplified closed polygon, [[x, y], ...]."""
+    if tolerance > 0 and len(contour) > 3:
+        contour = cv2.approxPolyDP(contour, tolerance, True)
+    return contour.reshape(-1, 2).tolist()
+
+
+def build_render_sources(reference, current, diff, thresh, contours, scale: float = 1.0) -> dict:
+    """
+    Encode the inputs every visualization is rendered from. Images are expected
+    at display resolution already; `contours` are in full-resolution pixels and
+    are scaled by `scale`.
+    """
+    return {
+        "reference": cv2.imencode('.jpg', reference, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes(),
+        "current": cv2.imencode('.jpg', current, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes(),
+        "diff": cv2.imencode('.jpg', diff, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes(),
+        "mask": RunMask.from_array(thresh).encode(),
+        "outlines": [simplify_outline(np.round(c * scale).astype(np.int32)) for c in contours],
+        "scale": scale,
+    }
+
+
+def load_mask(data: bytes) -> RunMask:
+    """The change mask of stored render sources (analyses from before PIPELINE_VERSION 3 kept a PNG)."""
+    if data.startswith(MASK_MAGIC):
+        return RunMask.decode(data)
+    return RunMask.from_array(_decode_source(data, cv2.IMREAD_GRAYSCALE))
+
+
+def _decode_source(data: bytes, flags=cv2.IMREAD_COLOR) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+
+
+def _annotate(img, contours, color):
+    for i, contour in enumerate(contours):
         x, y, bw, bh = cv2.boundingRect(contour)
-        area_px = cv2.contourArea(contour)
-        roi_diff = diff[y:y+bh, x:x+bw]
-        avg_intensity = float(np.mean(roi_diff))
-        dev_type = classify_deviation(reference, current, contour, x, y, bw, bh)
-        severity = compute_severity(area_px, total_area, avg_intensity)
+        cv2.rectangle(img, (x, y), (x + bw, y + bh), color, 2)
+        cv2.putText(img, f"D{i+1}", (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return img
 
-        deviations.append({
-            "id": f"D{i+1}",
-            "type": dev_type,
-            "severity": severity,
-            "area_pixels": int(area_px),
-            "area_percentage": round(area_px / total_area * 100, 3),
-            "bbox": {"x": int(x), "y": int(y), "width": int(bw), "height": int(bh)},
-            "avg_change_intensity": round(avg_intensity, 1),
-        })
+
+def render_visualization(kind: str, sources: dict, fmt: str = "jpeg", max_dim: int = None) -> bytes:
+    """
+    Render one visualization (see RENDER_KINDS) from stored render sources as
+    encoded bytes, downscaled to at most `max_dim` px per side if given.
+    """
+    contours = [np.array(c, dtype=np.int32).reshape(-1, 1, 2) for c in sources["outlines"]]
+
+    if kind == "overlay":
+        # Highlight changes on the current image in red
+        current = _decode_source(sources["current"])
+        overlay = current.copy()
+        mask = np.zeros(current.shape[:2], dtype=np.uint8)
+        cv2.drawContours(mask, contours, -1, 255, -1)
+        overlay[mask > 0] = [0, 0, 255]  # Red overlay
+        img = cv2.addWeighted(current, 0.6, overlay, 0.4, 0)
+        # Draw contour outlines
+        cv2.drawContours(img, contours, -1, (0, 0, 255), 2)
+    elif kind == "heatmap":
+        # Intensity-based visualization of change magnitude
+        current = _decode_source(sources["current"])
+        diff = _decode_source(sources["diff"], cv2.IMREAD_GRAYSCALE)
+        img = cv2.addWeighted(current, 0.5, cv2.applyColorMap(diff, cv2.COLORMAP_JET), 0.5, 0)
+    elif kind == "difference":
+        # Binary black/white change mask
+        img = load_mask(sources["mask"]).to_array()
+    elif kind == "annotated_reference":
+        img = _annotate(_decode_source(sources["reference"]), contours, (0, 255, 0))
+    elif kind == "annotated_current":
+        img = _annotate(_decode_source(sources["current"]), contours, (0, 0, 255))
+    else:
+        raise ValueError(f"Unknown visualization kind: {kind}")
+
+    if max_dim and max(img.shape[:2]) > max_dim:
+        img = _downscale(img, max_dim / max(img.shape[:2]))
+    ext, params, _ = RENDER_FORMATS[fmt]
+    return cv2.imencode(ext, img, params)[1].tobytes()
+
+
+def _no_progress(stage, **data):
+    pass
+
+
+def build_result(deviations: list, changed_pixels: int, w: int, h: int, render_sources: dict,
+                 result_id: str = None) -> dict:
+    """Sort deviations, derive the overall risk level and assemble the analysis result."""
+    total_area = h * w
 
     # Sort by severity
     severity_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
     deviations.sort(key=lambda d: severity_order.get(d["severity"], 4))
 
     # Summary stats
-    changed_pixels = int(np.count_nonzero(thresh))
     change_pct = round(changed_pixels / total_area * 100, 2)
     risk_level = "Low"
     if any(d["severity"] == "Critical" for d in deviations) or change_pct > 10:
@@ -176,17 +613,9 @@ def compute_difference(reference: np.ndarray, current: np.ndarray) -> dict:
     elif any(d["severity"] == "Medium" for d in deviations) or change_pct > 2:
         risk_level = "Medium"
 
-    result_id = str(uuid.uuid4())[:8].upper()
-
     return {
-        "result_id": result_id,
-        "images": {
-            "overlay": image_to_base64(overlay),
-            "heatmap": image_to_base64(heatmap),
-            "difference": image_to_base64(diff_colored),
-            "annotated_reference": image_to_base64(annotated_ref),
-            "annotated_current": image_to_base64(annotated_cur),
-        },
+        "result_id": result_id or new_result_id(),
+        "render_sources": render_sources,
         "deviations": deviations,
         "summary": {
             "total_deviations": len(deviations),
@@ -197,3 +626,565 @@ def compute_difference(reference: np.ndarray, current: np.ndarray) -> dict:
             "image_dimensions": f"{w}x{h}",
         },
     }
+
+
+def new_result_id() -> str:
+    return str(uuid.uuid4())[:8].upper()
+
+
+def compute_difference(reference: np.ndarray, current: np.ndarray, tile_size: int = None,
+                       progress=None, result_id: str = None, prepared: dict = None, zones=None,
+                       register: bool = None, mode: str = None) -> dict:
+    """
+    Compare reference map with current satellite image.
+    Returns the change detection analysis plus compact render sources from
+    which visualizations (at most PREVIEW_MAX_DIM px per side) are rendered.
+
+    Scenes larger than TILED_MIN_PIXELS are routed through the tiled engine
+    (see compute_difference_tiled) so memory stays bounded by the tile budget.
+    Pass tile_size=0 to force the whole-image path. With mode="pyramid"
+    (default: LANDWATCH_DETECTION_MODE) change is first detected at reduced
+    scale and only candidate areas are refined at full resolution (see
+    compute_difference_pyramid).
+
+    `progress(stage, **data)` is called as the pipeline advances through the
+    align, diff, contours, classify and render stages; each classified
+    deviation is reported as soon as it is found.
+
+    `prepared` is the output of prepare_reference for `reference`; when given,
+    the reference-side preprocessing is reused rather than recomputed.
+
+    `zones` (a geo.PlotZones) assigns each deviation to the plot boundaries
+    its contour intersects and adds areas in square metres.
+
+    Unless `register` is False (default: LANDWATCH_REGISTRATION), the current
+    image is first registered to the reference (see register_images) and the
+    transform and its confidence are reported under "registration".
+    """
+    progress = progress or _no_progress
+    if register is None:
+        register = REGISTRATION
+    mode = mode or DETECTION_MODE
+    if mode not in DETECTION_MODES:
+        raise ValueError(f"Unknown detection mode: {mode}")
+
+    # Ensure same size, then align
+    progress("align")
+    if reference.shape[:2] != current.shape[:2]:
+        reference, current = resize_to_match(reference, current)
+    registration = None
+    if register:
+        current, registration = register_images(reference, current, prepared)
+
+    if tile_size is None and reference.shape[0] * reference.shape[1] > TILED_MIN_PIXELS:
+        tile_size = TILE_SIZE
+    if mode == "pyramid":
+        result = compute_difference_pyramid(reference, current, progress=progress, result_id=result_id,
+                                            prepared=prepared, zones=zones)
+    elif tile_size:
+        result = compute_difference_tiled(reference, current, tile_size=tile_size,
+                                          progress=progress, result_id=result_id, prepared=prepared, zones=zones)
+    else:
+        result = _compute_difference_whole(reference, current, progress, result_id, prepared, zones)
+    if registration is not None:
+        result["registration"] = registration
+    return result
+
+
+def _compute_difference_whole(reference, current, progress, result_id, prepared, zones) -> dict:
+    """Whole-image change detection on aligned, equally sized images."""
+    h, w = reference.shape[:2]
+    total_area = h * w
+
+    # Convert to grayscale
+    if prepared is not None:
+        ref_gray, ref_blur = prepared["gray"], prepared["blurred"]
+    else:
+        ref_gray, ref_blur = cv2.cvtColor(reference, cv2.COLOR_BGR2GRAY), None
+    cur_gray = cv2.cvtColor(current, cv2.COLOR_BGR2GRAY)
+
+    progress("diff")
+    diff, thresh = compute_change_mask(ref_gray, cur_gray, ref_blur=ref_blur)
+
+    # Find contours of changed regions
+    progress("contours")
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # Filter small contours (noise)
+    min_area = total_area * 0.001  # 0.1% of image
+    areas = np.array([cv2.contourArea(c) for c in contours], dtype=np.float64)
+    keep = np.nonzero(areas > min_area)[0]
+    significant_contours = [contours[i] for i in keep]
+    areas = areas[keep]
+
+    # -- Classify all deviations at once from per-box statistics --
+    progress("classify", total=len(significant_contours))
+    boxes = np.array([cv2.boundingRect(c) for c in significant_contours], dtype=np.int64).reshape(-1, 4)
+    stats = box_statistics(boxes, ref_gray, cur_gray, diff)
+    types = classify_regions(stats["ref_mean"], stats["cur_mean"], stats["ref_std"], stats["cur_std"])
+    severities = severity_of_regions(areas, total_area, stats["diff_mean"])
+    percentages = areas / total_area * 100
+
+    deviations = []
+    for i, contour in enumerate(significant_contours):
+        x, y, bw, bh = boxes[i].tolist()
+        deviations.append({
+            "id": f"D{i+1}",
+            "type": str(types[i]),
+            "severity": str(severities[i]),
+            "area_pixels": int(areas[i]),
+            "area_percentage": round(float(percentages[i]), 3),
+            "bbox": {"x": x, "y": y, "width": bw, "height": bh},
+            "outline": simplify_outline(contour),
+            "avg_change_intensity": round(float(stats["diff_mean"][i]), 1),
+        })
+        if zones is not None:
+            zones.assign(deviations[-1], contour)
+        progress("classify", deviation=deviations[-1])
+
+    # -- Generate visual outputs --
+    progress("render")
+    scale = min(1.0, PREVIEW_MAX_DIM / max(h, w))
+    ref_preview = prepared["preview"] if prepared is not None else _downscale(reference, scale)
+    render_sources = build_render_sources(
+        ref_preview, _downscale(current, scale), _downscale(diff, scale),
+        _downscale(thresh, scale, cv2.INTER_NEAREST), significant_contours, scale,
+    )
+
+    changed_pixels = int(np.count_nonzero(thresh))
+    return build_result(deviations, changed_pixels, w, h, render_sources, result_id=result_id)
+
+
+# ─── TILED ENGINE ───────────────────────────────────────────────────────
+#
+# Large scenes are processed in overlapping windows. The change mask of a
+# pixel depends only on its neighbourhood within TILE_HALO (5x5 blur plus
+# close/open with a 5x5 kernel = 10 px), so cropping each window back to its
+# core gives exactly the whole-image mask. Connected regions are stitched
+# across tile seams with a union-find over the seam rows/columns, then each
+# significant region is re-traced in a window around its bounding box to get
+# the same contour (and contourArea) findContours would return on the full
+# image. No full-resolution intermediate array is ever allocated.
+
+
+class _UnionFind:
+    """Minimal union-find over integer labels, grown on demand."""
+
+    def __init__(self):
+        self.parent = [0]
+
+    def add(self, n: int) -> int:
+        start = len(self.parent)
+        self.parent.extend(range(start, start + n))
+        return start
+
+    def find(self, a: int) -> int:
+        parent = self.parent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _union_seam(uf: _UnionFind, a: np.ndarray, b: np.ndarray):
+    """Union labels of two adjacent 1-D label lines under 8-connectivity."""
+    n = min(len(a), len(b))
+    pairs = []
+    for shift in (-1, 0, 1):
+        lo, hi = max(0, -shift), min(n, n - shift)
+        la, lb = a[lo:hi], b[lo + shift:hi + shift]
+        both = (la > 0) & (lb > 0)
+        if both.any():
+            pairs.append(np.stack([la[both], lb[both]], axis=1))
+    if pairs:
+        for la, lb in np.unique(np.concatenate(pairs), axis=0):
+            uf.union(int(la), int(lb))
+
+
+def _window_change_mask(reference, current, x0, y0, x1, y1, ref_blur=None) -> tuple:
+    """
+    Compute (diff, thresh) for the region [y0:y1, x0:x1] using a TILE_HALO margin.
+    `ref_blur` is the full blurred reference from prepare_reference, if available.
+    """
+    h, w = reference.shape[:2]
+    wx0, wy0 = max(0, x0 - TILE_HALO), max(0, y0 - TILE_HALO)
+    wx1, wy1 = min(w, x1 + TILE_HALO), min(h, y1 + TILE_HALO)
+    cur_gray = cv2.cvtColor(current[wy0:wy1, wx0:wx1], cv2.COLOR_BGR2GRAY)
+    if ref_blur is not None:
+        diff, thresh = compute_change_mask(None, cur_gray, ref_blur=ref_blur[wy0:wy1, wx0:wx1])
+    else:
+        ref_gray = cv2.cvtColor(reference[wy0:wy1, wx0:wx1], cv2.COLOR_BGR2GRAY)
+        diff, thresh = compute_change_mask(ref_gray, cur_gray)
+    cy, cx = y0 - wy0, x0 - wx0
+    core = (slice(cy, cy + y1 - y0), slice(cx, cx + x1 - x0))
+    return diff[core], thresh[core]
+
+
+def _region_stats_tiled(reference, current, x0, y0, x1, y1, tile_size, ref_blur=None, mask_scale: float = 1.0) -> dict:
+    """
+    Accumulate classification statistics over a region too large for one
+    window, and assemble its change mask at `mask_scale` (a reduced window is
+    set where most of its pixels changed).
+    """
+    n = 0
+    changed = 0
+    sums = {"diff": 0.0, "ref": 0.0, "ref_sq": 0.0, "cur": 0.0, "cur_sq": 0.0}
+    mask = np.zeros((max(1, round((y1 - y0) * mask_scale)), max(1, round((x1 - x0) * mask_scale))), dtype=np.uint8)
+    for ty in range(y0, y1, tile_size):
+        for tx in range(x0, x1, tile_size):
+            ty1, tx1 = min(y1, ty + tile_size), min(x1, tx + tile_size)
+            diff, thresh = _window_change_mask(reference, current, tx, ty, tx1, ty1, ref_blur)
+            ref_gray = _gray(reference[ty:ty1, tx:tx1]).astype(np.float64)
+            cur_gray = cv2.cvtColor(current[ty:ty1, tx:tx1], cv2.COLOR_BGR2GRAY).astype(np.float64)
+            n += diff.size
+            changed += cv2.countNonZero(thresh)
+            sums["diff"] += float(diff.sum())
+            sums["ref"] += ref_gray.sum()
+            sums["ref_sq"] += (ref_gray ** 2).sum()
+            sums["cur"] += cur_gray.sum()
+            sums["cur_sq"] += (cur_gray ** 2).sum()
+            if mask_scale >= 1.0:
+                mask[ty - y0:ty1 - y0, tx - x0:tx1 - x0] = thresh
+                continue
+            mx0, my0 = round((tx - x0) * mask_scale), round((ty - y0) * mask_scale)
+            mx1, my1 = round((tx1 - x0) * mask_scale), round((ty1 - y0) * mask_scale)
+            if mx1 > mx0 and my1 > my0:
+                reduced = cv2.resize(thresh, (mx1 - mx0, my1 - my0), interpolation=cv2.INTER_AREA)
+                mask[my0:my1, mx0:mx1] = np.where(reduced >= 128, 255, 0).astype(np.uint8)
+    ref_mean, cur_mean = sums["ref"] / n, sums["cur"] / n
+    return {
+        "changed_pixels": changed,
+        "mask": mask,
+        "avg_intensity": sums["diff"] / n,
+        "ref_mean": ref_mean,
+        "cur_mean": cur_mean,
+        "ref_std": max(sums["ref_sq"] / n - ref_mean ** 2, 0.0) ** 0.5,
+        "cur_std": max(sums["cur_sq"] / n - cur_mean ** 2, 0.0) ** 0.5,
+    }
+
+
+def compute_difference_tiled(reference: np.ndarray, current: np.ndarray, tile_size: int = TILE_SIZE,
+                             progress=None, result_id: str = None, prepared: dict = None, zones=None,
+                             tile_mask: np.ndarray = None, window_size: int = None,
+                             background: np.ndarray = None) -> dict:
+    """
+    Tiled change detection for scenes too large to process as whole arrays.
+    Produces the same deviations list as the whole-image path, except that a
+    single region larger than TILED_MIN_PIXELS is traced on a reduced mask;
+    its deviation is then flagged "exact": False.
+
+    `tile_mask` (a boolean grid of tiles) restricts processing to the marked
+    tiles; any region reaching the edge of a processed tile pulls in its
+    neighbour, so regions touching a marked tile are still traced exactly.
+    `window_size` bounds the re-trace windows of pass 2 (default: tile_size)
+    and `background` is a low-resolution diff drawn under unprocessed tiles.
+    """
+    progress = progress or _no_progress
+    progress("align")
+    if reference.shape[:2] != current.shape[:2]:
+        reference, current = resize_to_match(reference, current)
+    h, w = reference.shape[:2]
+    total_area = h * w
+    min_area = total_area * 0.001  # 0.1% of image
+    window_size = window_size or tile_size
+    # With a prepared reference, windows crop its blur and classification reads its grayscale
+    ref_blur = prepared["blurred"] if prepared is not None else None
+    ref_stats_src = prepared["gray"] if prepared is not None else reference
+
+    scale = min(1.0, PREVIEW_MAX_DIM / max(h, w))
+    pw, ph = max(1, round(w * scale)), max(1, round(h * scale))
+    if background is not None:
+        diff_preview = cv2.resize(background, (pw, ph), interpolation=cv2.INTER_LINEAR)
+    else:
+        diff_preview = np.zeros((ph, pw), dtype=np.uint8)
+    thresh_preview = np.zeros((ph, pw), dtype=np.uint8)
+
+    # -- Pass 1: per-tile masks and connected components --
+    tiles_y, tiles_x = -(-h // tile_size), -(-w // tile_size)
+    if tile_mask is None:
+        tile_mask = np.ones((tiles_y, tiles_x), dtype=bool)
+    pending = [(int(ty), int(tx)) for ty, tx in np.argwhere(tile_mask)]
+    queued = set(pending)
+    edges = {}
+    uf = _UnionFind()
+    comp_ids, comp_boxes = [], []
+    changed_pixels = 0
+    examined_pixels = 0
+    done = 0
+    while done < len(pending):
+        ty, tx = pending[done]
+        done += 1
+        progress("diff", fraction=round(done / len(pending), 3))
+        y0, x0 = ty * tile_size, tx * tile_size
+        y1, x1 = min(h, y0 + tile_size), min(w, x0 + tile_size)
+        diff, thresh = _window_change_mask(reference, current, x0, y0, x1, y1, ref_blur)
+        changed_pixels += cv2.countNonZero(thresh)
+        examined_pixels += (y1 - y0) * (x1 - x0)
+
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(np.ascontiguousarray(thresh), connectivity=8)
+        base = uf.add(n - 1) - 1 if n > 1 else 0
+
+        def remap(line):
+            return np.where(line > 0, line.astype(np.int64) + base, 0)
+
+        top, bottom, left, right = remap(labels[0]), remap(labels[-1]), remap(labels[:, 0]), remap(labels[:, -1])
+        edges[ty, tx] = (top, bottom, left, right)
+        if n > 1:
+            s = stats[1:]
+            comp_ids.append(np.arange(1, n, dtype=np.int64) + base)
+            comp_boxes.append(np.stack([
+                s[:, cv2.CC_STAT_LEFT] + x0,
+                s[:, cv2.CC_STAT_TOP] + y0,
+                s[:, cv2.CC_STAT_LEFT] + s[:, cv2.CC_STAT_WIDTH] + x0,
+                s[:, cv2.CC_STAT_TOP] + s[:, cv2.CC_STAT_HEIGHT] + y0,
+            ], axis=1))
+            # Follow regions that leave this tile into tiles not yet scheduled
+            for dy, dx, touches in ((-1, 0, top.any()), (1, 0, bottom.any()), (0, -1, left.any()),
+                                    (0, 1, right.any()), (-1, -1, top[0]), (-1, 1, top[-1]),
+                                    (1, -1, bottom[0]), (1, 1, bottom[-1])):
+                nb = (ty + dy, tx + dx)
+                if touches and 0 <= nb[0] < tiles_y and 0 <= nb[1] < tiles_x and nb not in queued:
+                    queued.add(nb)
+                    pending.append(nb)
+
+        # Downsampled copies for the preview visualizations
+        px0, py0 = round(x0 * scale), round(y0 * scale)
+        px1, py1 = round(x1 * scale), round(y1 * scale)
+        if px1 > px0 and py1 > py0:
+            size = (px1 - px0, py1 - py0)
+            diff_preview[py0:py1, px0:px1] = cv2.resize(diff, size, interpolation=cv2.INTER_AREA)
+            thresh_preview[py0:py1, px0:px1] = cv2.resize(thresh, size, interpolation=cv2.INTER_NEAREST)
+
+    # -- Stitch components across tile seams, in raster order --
+    prev_bottom = None
+    for ty in range(tiles_y):
+        top = np.zeros(w, dtype=np.int64)
+        bottom = np.zeros(w, dtype=np.int64)
+        prev_right = None
+        for tx in range(tiles_x):
+            edge = edges.get((ty, tx))
+            if edge is None:
+                prev_right = None
+                continue
+            x0, x1 = tx * tile_size, min(w, (tx + 1) * tile_size)
+            top[x0:x1], bottom[x0:x1] = edge[0], edge[1]
+            if prev_right is not None:
+                _union_seam(uf, prev_right, edge[2])
+            prev_right = edge[3]
+        if prev_bottom is not None:
+            _union_seam(uf, prev_bottom, top)
+        prev_bottom = bottom
+
+    # -- Merge per-tile boxes into regions that span seams --
+    regions = []
+    if comp_ids:
+        ids = np.concatenate(comp_ids)
+        boxes = np.concatenate(comp_boxes)
+        roots = np.fromiter((uf.find(int(i)) for i in ids), dtype=np.int64, count=len(ids))
+        _, inverse = np.unique(roots, return_inverse=True)
+        n_regions = int(inverse.max()) + 1
+        merged = np.empty((n_regions, 4), dtype=np.int64)
+        merged[:, :2] = np.iinfo(np.int64).max
+        merged[:, 2:] = -1
+        np.minimum.at(merged[:, 0], inverse, boxes[:, 0])
+        np.minimum.at(merged[:, 1], inverse, boxes[:, 1])
+        np.maximum.at(merged[:, 2], inverse, boxes[:, 2])
+        np.maximum.at(merged[:, 3], inverse, boxes[:, 3])
+        # contourArea never exceeds the bounding box area, so this prefilter is exact
+        areas = (merged[:, 2] - merged[:, 0]) * (merged[:, 3] - merged[:, 1])
+        regions = [tuple(int(v) for v in box) for box in merged[areas > min_area]]
+
+    # -- Pass 2: re-trace each candidate region in a window around its bbox --
+    progress("contours", candidates=len(regions))
+    window_budget = (window_size + 2 * TILE_HALO) ** 2
+    found = []
+    for bx0, by0, bx1, by1 in regions:
+        bw, bh = bx1 - bx0, by1 - by0
+        if (bw + 2 * TILE_HALO) * (bh + 2 * TILE_HALO) <= window_budget:
+            diff, thresh = _window_change_mask(reference, current, bx0, by0, bx1, by1, ref_blur)
+            padded = cv2.copyMakeBorder(thresh, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+            contours, _ = cv2.findContours(padded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            contours = [c for c in contours if cv2.boundingRect(c) == (1, 1, bw, bh)]
+            if not contours:
+                continue
+            contour = max(contours, key=cv2.contourArea) + np.array([bx0 - 1, by0 - 1], dtype=np.int32)
+            area_px = cv2.contourArea(contour)
+            if area_px <= min_area:
+                continue
+            avg_intensity = float(np.mean(diff))
+            dev_type = classify_deviation(ref_stats_src, current, contour, bx0, by0, bw, bh)
+            start = (int(contour[0][0][1]), int(contour[0][0][0]))
+            exact = True
+        else:
+            # Region larger than the window budget: stream its statistics
+            # through windows and assemble its change mask, at full resolution
+            # up to TILED_MIN_PIXELS and reduced beyond (traced approximately).
+            mask_scale = min(1.0, (TILED_MIN_PIXELS / (bw * bh)) ** 0.5)
+            stats = _region_stats_tiled(ref_stats_src, current, bx0, by0, bx1, by1, window_size, ref_blur,
+                                        mask_scale=mask_scale)
+            exact = mask_scale >= 1.0
+            padded = cv2.copyMakeBorder(stats.pop("mask"), 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+            contours, _ = cv2.findContours(padded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if exact:
+                contours = [c for c in contours if cv2.boundingRect(c) == (1, 1, bw, bh)]
+            if not contours:
+                continue
+            contour = max(contours, key=cv2.contourArea) - 1
+            if not exact:
+                contour = np.round(contour / mask_scale).astype(np.int32)
+            contour = contour + np.array([bx0, by0], dtype=np.int32)
+            area_px = cv2.contourArea(contour)
+            if area_px <= min_area:
+                continue
+            avg_intensity = stats["avg_intensity"]
+            dev_type = classify_from_stats(stats["ref_mean"], stats["cur_mean"], stats["ref_std"], stats["cur_std"])
+            start = (int(contour[0][0][1]), int(contour[0][0][0]))
+        found.append({
+            "contour": contour, "bbox": (bx0, by0, bw, bh), "area": area_px,
+            "intensity": avg_intensity, "type": dev_type, "start": start, "exact": exact,
+        })
+
+    # RETR_EXTERNAL drops regions lying inside a hole of another region
+    outer = []
+    for region in found:
+        x, y, bw, bh = region["bbox"]
+        nested = any(
+            other is not region and other["exact"]
+            and other["bbox"][0] <= x and other["bbox"][1] <= y
+            and other["bbox"][0] + other["bbox"][2] >= x + bw
+            and other["bbox"][1] + other["bbox"][3] >= y + bh
+            and cv2.pointPolygonTest(other["contour"], (region["start"][1], region["start"][0]), False) > 0
+            for other in found
+        )
+        if not nested:
+            outer.append(region)
+
+    # Same ordering findContours uses (reverse raster order of contour start points)
+    outer.sort(key=lambda r: r["start"], reverse=True)
+
+    # -- Classify each deviation --
+    progress("classify", total=len(outer))
+    severities = severity_of_regions(
+        np.array([r["area"] for r in outer], dtype=np.float64), total_area,
+        np.array([r["intensity"] for r in outer], dtype=np.float64),
+    )
+    deviations = []
+    for i, region in enumerate(outer):
+        x, y, bw, bh = region["bbox"]
+        area_px = region["area"]
+        deviations.append({
+            "id": f"D{i+1}",
+            "type": region["type"],
+            "severity": str(severities[i]),
+            "area_pixels": int(area_px),
+            "area_percentage": round(area_px / total_area * 100, 3),
+            "bbox": {"x": int(x), "y": int(y), "width": int(bw), "height": int(bh)},
+            "outline": simplify_outline(region["contour"]),
+            "avg_change_intensity": round(region["intensity"], 1),
+        })
+        if not region["exact"]:
+            deviations[-1]["exact"] = False
+        if zones is not None:
+            zones.assign(deviations[-1], region["contour"])
+        progress("classify", deviation=deviations[-1])
+
+    # -- Preview visualizations --
+    progress("render")
+    if prepared is not None:
+        ref_preview = prepared["preview"]
+    else:
+        ref_preview = cv2.resize(reference, (pw, ph), interpolation=cv2.INTER_AREA)
+    cur_preview = cv2.resize(current, (pw, ph), interpolation=cv2.INTER_AREA)
+    render_sources = build_render_sources(
+        ref_preview, cur_preview, diff_preview, thresh_preview, [r["contour"] for r in outer], scale,
+    )
+
+    result = build_result(deviations, changed_pixels, w, h, render_sources, result_id=result_id)
+    result["processing"] = {
+        "mode": "tiled",
+        "tile_size": tile_size,
+        "tiles": tiles_y * tiles_x,
+        "tiles_examined": len(pending),
+        "examined_fraction": round(examined_pixels / total_area, 4),
+        "preview_scale": round(scale, 4),
+    }
+    return result
+
+
+# ─── COARSE-TO-FINE ─────────────────────────────────────────────────────
+#
+# Routine monitoring scenes are mostly unchanged. Pyramid mode differences
+# both images at 1/2**level scale, marks the PYRAMID_TILE_SIZE tiles under any
+# coarse candidate and hands only those to the tiled engine, which follows
+# regions into neighbouring tiles and re-traces them at full resolution.
+# Every region that overlaps a candidate is therefore identical to the full
+# path; a region is missed only if no part of it reaches `threshold` at the
+# coarse scale.
+
+
+def _halve(img: np.ndarray, times: int) -> np.ndarray:
+    """Downscale by 2**times in exact halvings (OpenCV's fast integer-factor area path)."""
+    for _ in range(times):
+        h, w = img.shape[:2]
+        img = cv2.resize(img, (-(-w // 2), -(-h // 2)), interpolation=cv2.INTER_AREA)
+    return img
+
+
+def _halve_banded(img: np.ndarray, times: int, band_rows: int = 2048) -> np.ndarray:
+    """_halve over bands of rows, so only one band of a large (memory-mapped) image is read at a time."""
+    if times == 0:
+        return np.ascontiguousarray(img)
+    step = band_rows - band_rows % (2 ** times)
+    return np.concatenate([_halve(img[y:y + step], times) for y in range(0, img.shape[0], step)])
+
+
+def coarse_change_mask(reference: np.ndarray, current: np.ndarray, level: int = PYRAMID_LEVEL,
+                       threshold: int = PYRAMID_THRESHOLD, prepared: dict = None) -> tuple:
+    """Difference both images at 1/2**level scale. Returns (coarse diff, dilated candidate mask)."""
+    ref_small = _gray(_halve(prepared["gray"] if prepared is not None else reference, level))
+    cur_small = _gray(_halve(current, level))
+    diff = cv2.absdiff(cv2.GaussianBlur(ref_small, (3, 3), 0), cv2.GaussianBlur(cur_small, (3, 3), 0))
+    _, mask = cv2.threshold(diff, threshold, 255, cv2.THRESH_BINARY)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * PYRAMID_MARGIN + 1, 2 * PYRAMID_MARGIN + 1))
+    return diff, cv2.dilate(mask, kernel)
+
+
+def compute_difference_pyramid(reference: np.ndarray, current: np.ndarray, level: int = PYRAMID_LEVEL,
+                               threshold: int = PYRAMID_THRESHOLD, progress=None, result_id: str = None,
+                               prepared: dict = None, zones=None) -> dict:
+    """
+    Coarse-to-fine change detection on aligned, equally sized images.
+    Reports the share of the scene processed at full resolution under
+    processing.examined_fraction.
+    """
+    started = time.perf_counter()
+    h, w = reference.shape[:2]
+    tile_size = PYRAMID_TILE_SIZE
+    factor = 2 ** level
+    coarse_diff, candidates = coarse_change_mask(reference, current, level, threshold, prepared)
+
+    # Tile grid over the coarse mask: a tile is examined if any candidate falls in it
+    cells = tile_size // factor
+    tiles_y, tiles_x = -(-h // tile_size), -(-w // tile_size)
+    grid = np.zeros((tiles_y * cells, tiles_x * cells), dtype=np.uint8)
+    grid[:candidates.shape[0], :candidates.shape[1]] = candidates
+    tile_mask = grid.reshape(tiles_y, cells, tiles_x, cells).any(axis=(1, 3))
+    coarse_ms = (time.perf_counter() - started) * 1000
+
+    result = compute_difference_tiled(
+        reference, current, tile_size=tile_size, progress=progress, result_id=result_id, prepared=prepared,
+        zones=zones, tile_mask=tile_mask, window_size=TILE_SIZE, background=coarse_diff,
+    )
+    result["processing"].update({
+        "mode": "pyramid",
+        "level": level,
+        "threshold": threshold,
+        "candidate_tiles": int(tile_mask.sum()),
+        "coarse_ms": round(coarse_ms, 1),
+    })
+    return result
@@ -0,0 +1,218 @@
+"""
+LandWatch - Upload Ingestion
+Spools uploads to disk in fixed-size chunks and decodes scenes from the
+spooled files. GeoTIFFs are decoded tile by tile (or strip by strip) straight
+into a disk-backed array, so a multi-hundred-MB scene is never held in memory
+whole; JPEG 2000 is decoded band by band the same way when glymur is installed.
+"""
+import hashlib
+import os
+import uuid
+
+import cv2
+import numpy as np
+import tifffile
+
+from geo import parse_geotransform
+from image_processing import TILED_MIN_PIXELS, scratch_array
+from storage import DATA_DIR
+
+try:
+    import glymur  # optional: windowed JPEG 2000 decoding
+except ImportError:
+    glymur = None
+
+SPOOL_DIR = os.environ.get("LANDWATCH_SPOOL_DIR", os.path.join(DATA_DIR, "spool"))
+MAX_UPLOAD_BYTES = int(os.environ.get("LANDWATCH_MAX_UPLOAD_MB", 2048)) * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+DECODE_BAND_ROWS = 1024
+
+IMAGE_FORMATS = ("jpeg", "png", "tiff", "jp2")
+
+
+class UnsupportedImage(ValueError):
+    """Raised when an upload is not a JPEG, PNG, TIFF or JPEG 2000 image."""
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds LANDWATCH_MAX_UPLOAD_MB."""
+
+
+def sniff_format(head: bytes):
+    """Image format from the first bytes of a file, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] in (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+"):
+        return "tiff"
+    if head.startswith(b"\x00\x00\x00\x0cjP  \r\n\x87\n") or head.startswith(b"\xff\x4f\xff\x51"):
+        return "jp2"
+    return None
+
+
+def spool_file(src, filename: str = None) -> dict:
+    """
+    Copy a readable binary file object to SPOOL_DIR in UPLOAD_CHUNK_BYTES
+    chunks, hashing as it goes. Returns {path, sha256, size, format, filename}.
+    """
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    fmt = None
+    try:
+        with open(path, "wb") as out:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if size == 0:
+                    fmt = sniff_format(chunk[:16])
+                    if fmt is None:
+                        raise UnsupportedImage("Only JPG, PNG, GeoTIFF and JPEG 2000 images are supported")
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise UploadTooLarge(f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UnsupportedImage("Uploaded file is empty")
+    except BaseException:
+        discard_path(path)
+        raise
+    return {"path": path, "sha256": digest.hexdigest(), "size": size, "format": fmt, "filename": filename}
+
+
+def discard_path(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard(*spooled):
+    """Remove spooled uploads (None entries are ignored)."""
+    for item in spooled:
+        if item is not None:
+            discard_path(item["path"])
+
+
+# ─── DECODING ───────────────────────────────────────────────────────────
+
+
+def _sniff_path(path: str):
+    with open(path, "rb") as f:
+        return sniff_format(f.read(16))
+
+
+def read_image_from_path(path: str):
+    """
+    Decode an image file to a BGR uint8 array (None if undecodable). Scenes
+    above TILED_MIN_PIXELS come back as disk-backed arrays (see scratch_array).
+    """
+    fmt = _sniff_path(path)
+    if fmt == "tiff":
+        image = _read_tiff(path)
+    elif fmt == "jp2" and glymur is not None:
+        image = _read_jp2(path)
+    else:
+        image = None
+    if image is None:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+    return image
+
+
+def _read_tiff(path: str):
+    try:
+        with tifffile.TiffFile(path) as tif:
+            page = tif.pages[0]
+            axes = page.axes
+            if not set(axes) <= set("YXS"):
+                return None
+            large = page.imagelength * page.imagewidth > TILED_MIN_PIXELS
+            # tifffile decodes each tile/strip directly into `out`
+            data = page.asarray(out=scratch_array(page.shape, page.dtype) if large else None)
+    except (ValueError, NotImplementedError, KeyError):
+        return None  # e.g. a compression tifffile cannot decode without imagecodecs; OpenCV may
+    if axes.startswith("S"):
+        data = np.moveaxis(data, 0, -1)
+    return to_bgr8(data)
+
+
+def _read_jp2(path: str):
+    jp2 = glymur.Jp2k(path)
+    h, w = jp2.shape[:2]
+    if h * w <= TILED_MIN_PIXELS:
+        return to_bgr8(jp2[:])
+    first = jp2[0:min(h, DECODE_BAND_ROWS), :]
+    data = scratch_array((h, w) + first.shape[2:], first.dtype)
+    data[:len(first)] = first
+    for y in range(DECODE_BAND_ROWS, h, DECODE_BAND_ROWS):
+        data[y:y + DECODE_BAND_ROWS] = jp2[y:min(h, y + DECODE_BAND_ROWS), :]
+    return to_bgr8(data)
+
+
+def to_bgr8(data: np.ndarray) -> np.ndarray:
+    """
+    Convert a decoded (rows, cols[, bands]) raster to BGR uint8, one band of
+    rows at a time. Integer data wider than 8 bits is shifted down by its
+    significant bit depth; float data is taken as 0-1 reflectance if it fits.
+    """
+    h, w = data.shape[:2]
+    bands = data.shape[2] if data.ndim == 3 else 1
+    if data.dtype == np.uint8 and bands == 3 and h * w <= TILED_MIN_PIXELS:
+        return np.ascontiguousarray(data[..., ::-1])
+
+    peak = max(float(data[y:y + DECODE_BAND_ROWS].max()) for y in range(0, h, DECODE_BAND_ROWS))
+    if np.issubdtype(data.dtype, np.floating):
+        gain = 255.0 if peak <= 1.0 else 1.0
+        shift = 0
+    else:
+        gain = 1.0
+        shift = max(0, int(np.ceil(np.log2(peak + 1))) - 8)
+
+    out = scratch_array((h, w, 3)) if h * w > TILED_MIN_PIXELS else np.empty((h, w, 3), dtype=np.uint8)
+    for y in range(0, h, DECODE_BAND_ROWS):
+        band = data[y:y + DECODE_BAND_ROWS]
+        if shift:
+            band = band >> shift
+        elif gain != 1.0:
+            band = band * gain
+        band = np.clip(band, 0, 255).astype(np.uint8) if band.dtype != np.uint8 else band
+        if bands == 1 or bands == 2:
+            out[y:y + DECODE_BAND_ROWS] = cv2.cvtColor(np.ascontiguousarray(band[..., 0] if band.ndim == 3 else band),
+                                                       cv2.COLOR_GRAY2BGR)
+        else:
+            out[y:y + DECODE_BAND_ROWS] = band[..., 2::-1]
+    return out
+
+
+def read_geotransform(path: str):
+    """
+    GDAL-style geotransform of a GeoTIFF in geographic (lat/lon) coordinates,
+    or None for other files and projected rasters.
+    """
+    if _sniff_path(path) != "tiff":
+        return None
+    with tifffile.TiffFile(path) as tif:
+        geokeys = tif.geotiff_metadata or {}
+        tags = tif.pages[0].tags
+        if geokeys.get("GTModelTypeGeoKey") != 2:  # ModelTypeGeographic
+            return None
+        if "ModelTransformationTag" in tags:
+            m = tags["ModelTransformationTag"].value
+            gt = [m[3], m[0], m[1], m[7], m[4], m[5]]
+        elif "ModelPixelScaleTag" in tags and "ModelTiepointTag" in tags:
+            sx, sy = tags["ModelPixelScaleTag"].value[:2]
+            i, j, _, x, y = tags["ModelTiepointTag"].value[:5]
+            gt = [x - i * sx, sx, 0.0, y + j * sy, 0.0, -sy]
+        else:
+            return None
+        if geokeys.get("GTRasterTypeGeoKey") == 2:  # RasterPixelIsPoint: tie point is a pixel centre
+            gt[0] -= (gt[1] + gt[2]) / 2
+            gt[3] -= (gt[4] + gt[5]) / 2
+    try:
+        return parse_geotransform(gt)
+    except ValueError:
+        return None
@@ -0,0 +1,208 @@
+"""
+LandWatch - Analysis Jobs
+Tracks asynchronous analysis jobs: their current stage, progress events and
+early deviations, and lets clients stream those events as they happen.
+
+A job runs in the API worker that accepted it, but its state and events are
+also written to the shared store, so any worker can report and stream it.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+JOB_STAGES = ["queued", "decode", "align", "diff", "contours", "classify", "render", "completed"]
+TERMINAL_STATUSES = {"completed", "failed"}
+MAX_JOBS = int(os.environ.get("LANDWATCH_MAX_JOBS", 500))
+# Events are written to the store in batches at most this often
+JOB_FLUSH_SECONDS = float(os.environ.get("LANDWATCH_JOB_FLUSH_SECONDS", 0.25))
+# How often a stream of a job running in another worker polls the store
+JOB_POLL_SECONDS = float(os.environ.get("LANDWATCH_JOB_POLL_SECONDS", 0.5))
+KEEP_ALIVE_SECONDS = 15
+
+logger = logging.getLogger("landwatch")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JobManager:
+    """
+    Registry of analysis jobs. Each job keeps an append-only event log so late
+    subscribers can replay everything from the start. Jobs of this process are
+    served from memory; new events are written to `store` by a background
+    flush, and jobs of other processes are read (and streamed by polling) from
+    there. Runs entirely on the event loop thread.
+    """
+
+    def __init__(self, store=None, max_jobs: int = MAX_JOBS):
+        self.store = store
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self._dirty = OrderedDict()  # job_id -> job with events not yet in the store
+        self._flusher = None
+        self._last_flush = 0.0
+
+    def create(self, job_id: str, **metadata) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "created_at": now,
+            "updated_at": now,
+            "deviations_found": [],
+            "error": None,
+            "error_status": None,
+            "metadata": metadata,
+            "_events": [],
+            "_stored": 0,
+            "_changed": asyncio.Event(),
+        }
+        self.jobs[job_id] = job
+        self._evict()
+        self._emit(job, "stage", {"stage": "queued"})
+        return job
+
+    def get(self, job_id: str):
+        """A job of this process, else one stored by another (blocking read), or None."""
+        job = self.jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.get_job(job_id)
+        return job
+
+    def _evict(self):
+        # Drop the oldest finished jobs once the registry is full; they stay in the store
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id]["status"] in TERMINAL_STATUSES and job_id not in self._dirty:
+                del self.jobs[job_id]
+
+    def _emit(self, job: dict, event: str, data: dict):
+        job["updated_at"] = datetime.now(timezone.utc).isoformat()
+        job["_events"].append((event, data))
+        # Wake current subscribers and arm a fresh event for the next update
+        job["_changed"].set()
+        job["_changed"] = asyncio.Event()
+        if self.store is not None:
+            self._dirty[job["job_id"]] = job
+            if self._flusher is None:
+                self._flusher = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        """Write the new events of every changed job, at most once every JOB_FLUSH_SECONDS."""
+        try:
+            while self._dirty:
+                wait = self._last_flush + JOB_FLUSH_SECONDS - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_flush = time.monotonic()
+                batch = []
+                for job in self._dirty.values():
+                    state = {k: v for k, v in self.view(job).items() if k != "deviations_found"}
+                    batch.append((job, state, job["_stored"], job["_events"][job["_stored"]:]))
+                self._dirty.clear()
+                try:
+                    await asyncio.to_thread(self.store.save_jobs, [(s, first + 1, e) for _, s, first, e in batch])
+                    for job, _, first, events in batch:
+                        job["_stored"] = first + len(events)
+                    if any(state["status"] in TERMINAL_STATUSES for _, state, _, _ in batch):
+                        await asyncio.to_thread(self.store.prune_jobs, self.max_jobs)
+                except Exception:
+                    logger.exception("Could not store the state of %d analysis job(s); retrying", len(batch))
+                    for job, *_ in batch:
+                        self._dirty.setdefault(job["job_id"], job)
+        finally:
+            self._flusher = None
+
+    async def flushed(self):
+        """Wait until every event emitted so far is in the store."""
+        while self._flusher is not None:
+            await asyncio.shield(self._flusher)
+
+    def update(self, job_id: str, stage: str, data: dict = None):
+        """Record a progress event reported by the analysis pipeline."""
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return
+        data = data or {}
+        job["status"] = "running"
+        deviation = data.get("deviation")
+        if deviation is not None:
+            job["deviations_found"].append(deviation)
+            self._emit(job, "deviation", deviation)
+        if stage != job["stage"] or "fraction" in data:
+            job["stage"] = stage
+            base = JOB_STAGES.index(stage) if stage in JOB_STAGES else 0
+            fraction = data.get("fraction", 0.0)
+            job["progress"] = round((base + fraction) / (len(JOB_STAGES) - 1), 3)
+            self._emit(job, "stage", {"stage": stage, "progress": job["progress"]})
+
+    def complete(self, job_id: str, summary: dict):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.update(status="completed", stage="completed", progress=1.0)
+        self._emit(job, "completed", {"result_id": job_id, "summary": summary})
+
+    def fail(self, job_id: str, error: str, status_code: int = 500):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.update(status="failed", error=error, error_status=status_code)
+        self._emit(job, "failed", {"error": error, "status_code": status_code})
+
+    def view(self, job: dict) -> dict:
+        """Public representation of a job (without internal bookkeeping)."""
+        return {k: v for k, v in job.items() if not k.startswith("_")}
+
+    async def stream(self, job_id: str):
+        """Yield Server-Sent Events for a job until it reaches a terminal state."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            if self.store is not None:
+                async for chunk in self._stream_stored(job_id):
+                    yield chunk
+            return
+        sent = 0
+        while True:
+            changed = job["_changed"]
+            events = job["_events"]
+            while sent < len(events):
+                event, data = events[sent]
+                sent += 1
+                yield _sse(event, data)
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=KEEP_ALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+
+    async def _stream_stored(self, job_id: str):
+        """stream() for a job running in another process: poll its stored events."""
+        sent = 0
+        idle = 0.0
+        while True:
+            events = await asyncio.to_thread(self.store.job_events, job_id, sent)
+            for seq, event, data in events:
+                sent = seq
+                yield _sse(event, data)
+                if event in TERMINAL_STATUSES:
+                    return
+            if events:
+                idle = 0.0
+            elif await asyncio.to_thread(self.store.get_job, job_id) is None:
+                return  # pruned meanwhile
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            idle += JOB_POLL_SECONDS
+            if idle >= KEEP_ALIVE_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
@@ -0,0 +1,33 @@
+"""
+LandWatch - Lazy Imports
+OpenCV, NumPy, ReportLab and pyarrow take most of the API's import time but
+are only needed on the analysis, report and export paths. Modules bound with
+lazy_import are executed on first attribute access instead, so a process
+that only serves read-only endpoints never loads them.
+"""
+import importlib.util
+import sys
+import types
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    The module `name`, executed on first attribute access. Raises
+    ModuleNotFoundError right away if it is not installed.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """Whether `name` has actually been executed (not just bound lazily)."""
+    return type(sys.modules.get(name)) is types.ModuleType
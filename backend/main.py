@@ -1,16 +1,45 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 import os
 import json
-import csv
-import io
-from datetime import datetime, timedelta
-import random
-import base64
+import math
+import shutil
+import tempfile
+import threading
+from datetime import date, datetime, timezone
+import asyncio
+import logging
+from collections import defaultdict
+from email.utils import formatdate, parsedate_to_datetime
+
+from aggregates import DashboardAggregates
+from alerts import AlertEngine
+from analysis_pool import AnalysisPool, PoolSaturated, ImageDecodeError, analyze_files, register_reference_file
+from batch import BatchArchiveError, discard_items, read_batch_archive
+from exports import (
+    CHUNK_BYTES, EXPORT_FORMATS, ExportUnavailable, arrow_stream, check_format, csv_stream, gzip_stream, parquet_stream,
+)
+from geo import parse_geotransform, polygon_area_sqm, square_boundary
+from cache import LRUCache, ResultCache, digest_key
+from jobs import JobManager
+from lazy import is_loaded, lazy_import
+from mapfeed import MAX_ZOOM, STATUS_SEVERITY, PlotMap, parse_bbox, tiles_for_bbox
+from metrics import MEGAPIXEL_BUCKETS, MetricsMiddleware, MetricsRegistry
+from query import InvalidQuery, PlotIndex, decode_cursor, encode_cursor, page_size, parse_fields, project
+from storage import ALERT_SORTS, DATA_DIR, create_store
 
-from image_processing import read_image_from_bytes, compute_difference
-from report_generator import generate_pdf_report
+# The analysis, report and time-series modules load OpenCV, NumPy and ReportLab;
+# they are executed on first use so read-only endpoints start without them
+area_report = lazy_import("area_report")
+image_processing = lazy_import("image_processing")
+ingest = lazy_import("ingest")
+references = lazy_import("references")
+report_generator = lazy_import("report_generator")
+timeseries = lazy_import("timeseries")
 
 app = FastAPI(
     title="LandWatch - Land Monitoring System API",
@@ -26,9 +55,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory stores
-analyses_store = {}
-alerts_store = []
+# Persistent analysis/alert storage (SQLite + content-addressed blobs by default)
+store = create_store()
+
+# Rendered visualization bytes, keyed by (result_id, kind, format)
+RENDER_CACHE_MB = int(os.environ.get("LANDWATCH_RENDER_CACHE_MB", 128))
+render_cache = LRUCache(max_entries=1024, max_bytes=RENDER_CACHE_MB * 1024 * 1024)
+RENDER_VERSION = 1
+
+# Rendered PDF reports are cached with the analysis and rendered in threads, a few at a time
+REPORT_CONCURRENCY = int(os.environ.get("LANDWATCH_REPORT_CONCURRENCY", 2))
+_report_slots = asyncio.Semaphore(REPORT_CONCURRENCY)
+_inflight_reports = {}  # result_id -> task rendering its report
+
+# Re-submitting identical inputs returns the stored result instead of re-running the pipeline
+RESULT_CACHE_TTL = int(os.environ.get("LANDWATCH_RESULT_CACHE_TTL", 30 * 24 * 3600))
+RESULT_CACHE_ENTRIES = int(os.environ.get("LANDWATCH_RESULT_CACHE_ENTRIES", 4096))
+result_cache = ResultCache(store, max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL)
+_inflight_analyses = {}  # content key -> (job_id, task) of analyses still running
+
+# CPU-bound analysis runs here, off the event loop
+analysis_pool = AnalysisPool()
+# Job state and events are shared through the store, so any worker can report and stream a job
+job_manager = JobManager(store)
+analysis_pool.on_progress = job_manager.update
+_background_tasks = set()
+
+# Sampling profiles of single analyses (POST /api/analyze with profile=true), off unless enabled
+PROFILING = os.environ.get("LANDWATCH_PROFILING", "0") == "1"
+PROFILE_DIR = os.environ.get("LANDWATCH_PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
 
 # ─── COMPREHENSIVE DEMO DATA ───────────────────────────────────────────
 
@@ -63,73 +118,228 @@ DEMO_PLOTS = [
     {"id": "PLOT-015", "name": "Rawabhata Industrial Area - Plot E3", "status": "Unauthorized Construction", "area_sqm": 5200, "lessee": "BCD Packaging", "allotment_date": "2019-06-15", "last_inspection": "2025-08-02", "lease_status": "Active", "lease_amount": 140000, "water_charges": 8000, "dues_pending": 45000, "compliance_score": 30, "coordinates": [21.2110, 81.6110], "industrial_area": "Rawabhata Industrial Area", "land_use": "Packaging", "constructed_area_pct": 98},
 ]
 
-# Generate alerts from plot data
-def generate_alerts():
-    alerts = []
+# Filled by load_registry when the app starts, not at import
+PLOT_BOUNDARIES = []
+plot_index = PlotIndex([])
+plot_map = PlotMap([])
+# Fields changed through PATCH /api/plots/{id} are persisted in the store; each
+# worker applies those it has not seen yet (up to this version) per request
+registry_version = 0
+_registry_lock = threading.Lock()
+# Alerts are raised, updated and resolved by the rule engine: once for every
+# plot at startup, then for the plots each change touches
+alert_engine = AlertEngine()
+# Dashboard counters: plots seeded at startup and updated wherever they change;
+# alert and analysis counts follow the store
+aggregates = DashboardAggregates(store)
+
+# ─── STARTUP ────────────────────────────────────────────────────────────
+
+# Import plus load_registry; exceeding it is logged (or fails startup with LANDWATCH_STARTUP_STRICT=1)
+STARTUP_BUDGET_MS = int(os.environ.get("LANDWATCH_STARTUP_BUDGET_MS", 1500))
+STARTUP_STRICT = os.environ.get("LANDWATCH_STARTUP_STRICT", "0") == "1"
+# Modules read-only endpoints must come up without (see lazy_import)
+HEAVY_MODULES = ("cv2", "numpy", "reportlab", "pyarrow")
+startup = {"import_ms": round((time.perf_counter() - _import_started) * 1000, 1)}
+logger = logging.getLogger("landwatch")
+
+
+def _load_registry():
+    global plot_index, plot_map, registry_version
+    plots = {plot["id"]: plot for plot in DEMO_PLOTS}
+    for update in store.plot_updates():
+        if update["plot_id"] in plots:
+            plots[update["plot_id"]].update(update["changes"])
+        registry_version = update["version"]
+    # Allotment boundaries: until surveyed polygons are loaded, each plot is a
+    # square of its allotted area centred on its coordinates
     for plot in DEMO_PLOTS:
-        if plot["status"] == "Encroachment Detected":
-            alerts.append({
-                "id": f"ALT-{len(alerts)+1:03d}",
-                "type": "Encroachment",
-                "severity": "Critical",
-                "plot_id": plot["id"],
-                "plot_name": plot["name"],
-                "message": f"Encroachment detected beyond allotted boundary at {plot['name']}. Estimated overflow: {(plot.get('constructed_area_pct', 100) - 100) if plot.get('constructed_area_pct', 0) > 100 else random.randint(5,15)}% beyond boundary.",
-                "timestamp": (datetime.now() - timedelta(days=random.randint(1, 30))).isoformat(),
-                "action_required": "Issue notice for immediate ground-truthing and rectification",
-                "status": "Open",
-            })
-        elif plot["status"] == "Unauthorized Construction":
-            alerts.append({
-                "id": f"ALT-{len(alerts)+1:03d}",
-                "type": "Unauthorized Construction",
-                "severity": "Critical",
-                "plot_id": plot["id"],
-                "plot_name": plot["name"],
-                "message": f"Unauthorized construction detected at {plot['name']}. Construction observed outside approved plan.",
-                "timestamp": (datetime.now() - timedelta(days=random.randint(1, 20))).isoformat(),
-                "action_required": "Issue stop-work order and initiate legal proceedings",
-                "status": "Open",
-            })
-        elif plot["status"] == "Vacant/Unused":
-            alerts.append({
-                "id": f"ALT-{len(alerts)+1:03d}",
-                "type": "Vacant Plot",
-                "severity": "High",
-                "plot_id": plot["id"],
-                "plot_name": plot["name"],
-                "message": f"Plot {plot['id']} remains vacant despite allotment on {plot['allotment_date']}. No construction activity detected.",
-                "timestamp": (datetime.now() - timedelta(days=random.randint(5, 60))).isoformat(),
-                "action_required": "Review allotment conditions and issue show-cause notice",
-                "status": "Open",
-            })
-        elif plot["status"] == "Boundary Deviation":
-            alerts.append({
-                "id": f"ALT-{len(alerts)+1:03d}",
-                "type": "Boundary Deviation",
-                "severity": "Medium",
-                "plot_id": plot["id"],
-                "plot_name": plot["name"],
-                "message": f"Boundary mismatch detected at {plot['name']}. Current land-use boundary does not align with original allotment map.",
-                "timestamp": (datetime.now() - timedelta(days=random.randint(10, 45))).isoformat(),
-                "action_required": "Update base maps and verify on ground",
-                "status": "Under Review",
-            })
-        if plot["dues_pending"] > 0:
-            alerts.append({
-                "id": f"ALT-{len(alerts)+1:03d}",
-                "type": "Payment Due",
-                "severity": "High" if plot["dues_pending"] > 100000 else "Medium",
-                "plot_id": plot["id"],
-                "plot_name": plot["name"],
-                "message": f"Outstanding dues of ₹{plot['dues_pending']:,} for {plot['name']}. Includes lease payments and/or water charges.",
-                "timestamp": (datetime.now() - timedelta(days=random.randint(1, 15))).isoformat(),
-                "action_required": f"Issue demand notice for ₹{plot['dues_pending']:,}",
-                "status": "Open",
-            })
-    return alerts
+        plot.setdefault("boundary", square_boundary(plot["coordinates"], plot["area_sqm"]))
+        plot["boundary_area_sqm"] = round(polygon_area_sqm(plot["boundary"]), 1)
+    PLOT_BOUNDARIES[:] = [{"id": p["id"], "boundary": p["boundary"]} for p in DEMO_PLOTS]
+    plot_index = PlotIndex(DEMO_PLOTS)
+    plot_map = PlotMap(DEMO_PLOTS)
+
+    for latest in store.latest_plot_analyses():
+        alert_engine.set_analysis(latest["plot_id"], latest)
+    _evaluate_alerts(DEMO_PLOTS)
+
+    aggregates.load_plots(DEMO_PLOTS)
+    aggregates.refresh()
+
+
+@app.on_event("startup")
+async def load_registry():
+    """
+    Index the plot registry, replay stored alerts and analyses into the alert
+    engine and seed the dashboard counters, then check the startup budget.
+    """
+    started = time.perf_counter()
+    _load_registry()
+    startup["registry_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    startup["total_ms"] = round(startup["import_ms"] + startup["registry_ms"], 1)
+    startup["budget_ms"] = STARTUP_BUDGET_MS
+    startup["heavy_modules_loaded"] = [name for name in HEAVY_MODULES if is_loaded(name)]
+    if startup["total_ms"] > STARTUP_BUDGET_MS:
+        message = (f"Startup took {startup['total_ms']} ms (budget {STARTUP_BUDGET_MS} ms); "
+                   f"heavy modules loaded: {', '.join(startup['heavy_modules_loaded']) or 'none'}")
+        if STARTUP_STRICT:
+            raise RuntimeError(message)
+        logger.warning(message)
+
+
+def _sync_registry():
+    """Apply plot updates persisted by other workers since this one last looked (blocking)."""
+    global registry_version
+    if store.registry_version() <= registry_version:
+        return
+    with _registry_lock:
+        updates = store.plot_updates(after=registry_version)
+        changed = []
+        for update in updates:
+            plot = plot_index.get(update["plot_id"])
+            if plot is not None:
+                changed.append({**plot, **update["changes"]})
+        for plot in changed:
+            plot_index.update(plot)
+            plot_map.update(plot)
+        aggregates.update_plots(changed)
+        if updates:
+            registry_version = updates[-1]["version"]
+
+
+def _registry_synced(app):
+    """ASGI middleware applying other workers' plot updates before each HTTP request is served."""
+    async def middleware(scope, receive, send):
+        if scope["type"] == "http":
+            await asyncio.to_thread(_sync_registry)
+        await app(scope, receive, send)
+    return middleware
+
+
+app.add_middleware(_registry_synced)
+
+# ─── METRICS ────────────────────────────────────────────────────────────
+
+metrics = MetricsRegistry()
+request_latency = metrics.histogram(
+    "landwatch_http_request_duration_seconds", "HTTP request latency until the last byte is sent",
+    ("method", "route", "status"),
+)
+stage_latency = metrics.histogram("landwatch_analysis_stage_duration_seconds", "Analysis time per stage", ("stage",))
+analysis_latency = metrics.histogram(
+    "landwatch_analysis_duration_seconds", "Analysis time from submission until the result is stored",
+)
+analysis_size = metrics.histogram(
+    "landwatch_analysis_megapixels", "Size of analysed scenes in megapixels", buckets=MEGAPIXEL_BUCKETS,
+)
+analysis_outcomes = metrics.counter("landwatch_analyses_total", "Analysis requests by outcome", ("outcome",))
+report_latency = metrics.histogram("landwatch_report_render_seconds", "PDF report render time", ("report",))
+
+# Read from application state at scrape time
+metrics.gauge("landwatch_analyses_in_flight", "Analyses running or waiting in the worker pool",
+              lambda: analysis_pool.in_flight)
+metrics.gauge("landwatch_pool_tasks_total", "Worker pool tasks by outcome", lambda: {
+    ("submitted",): analysis_pool.submitted, ("completed",): analysis_pool.completed,
+    ("failed",): analysis_pool.failed, ("rejected",): analysis_pool.rejected,
+}, ("outcome",), kind="counter")
+metrics.gauge("landwatch_startup_seconds", "Time to import the API and to load the registry at startup",
+              lambda: {("import",): startup["import_ms"] / 1000, ("registry",): startup.get("registry_ms", 0) / 1000},
+              ("phase",))
+metrics.gauge("landwatch_reports_in_flight", "PDF reports being rendered", lambda: len(_inflight_reports))
+metrics.gauge("landwatch_store_records", "Records held by the API", lambda: {
+    ("plots",): len(plot_index), ("analyses",): aggregates.refresh().analyses,
+    ("alerts",): sum(aggregates.alert_status.values()), ("jobs",): len(job_manager.jobs),
+}, ("kind",))
+metrics.gauge("landwatch_alerts", "Alerts by severity and status", lambda: dict(aggregates.refresh().alert_status),
+              ("severity", "status"))
+metrics.gauge("landwatch_cache_entries", "Entries per in-process cache", lambda: {
+    ("render",): len(render_cache), ("results",): len(result_cache.index), ("map",): len(plot_map.tiles),
+}, ("cache",))
+metrics.gauge("landwatch_cache_bytes", "Bytes held by the rendered-visualization cache",
+              lambda: render_cache.current_bytes)
+metrics.gauge("landwatch_cache_lookups_total", "Cache lookups by result", lambda: {
+    ("render", "hit"): render_cache.hits, ("render", "miss"): render_cache.misses,
+    ("results", "hit"): result_cache.hits, ("results", "miss"): result_cache.misses,
+    ("results", "coalesced"): result_cache.coalesced,
+    ("map", "hit"): plot_map.tiles.hits, ("map", "miss"): plot_map.tiles.misses,
+}, ("cache", "result"), kind="counter")
+
+_route_paths = {}
+
+
+def _route_of(scope: dict) -> str:
+    """Path template of the route that served a request, so labels stay bounded ("unmatched" for 404s)."""
+    if not _route_paths:
+        _route_paths.update({getattr(route, "endpoint", None): route.path for route in app.routes})
+    return _route_paths.get(scope.get("endpoint"), "unmatched")
 
-alerts_store = generate_alerts()
+
+app.add_middleware(MetricsMiddleware, histogram=request_latency, route_of=_route_of)
+
+
+def _observe_analysis(results: dict, store_seconds: float = None, seconds: float = None):
+    """Record the stage timings (see analysis_pool._analyze) and size of a finished analysis."""
+    metadata = results["metadata"]
+    timings = metadata.get("timings_ms", {})
+    for stage, ms in timings.items():
+        if stage != "total":
+            stage_latency.observe(ms / 1000, stage)
+    if store_seconds is not None:
+        stage_latency.observe(store_seconds, "store")
+    if seconds is not None:
+        analysis_latency.observe(seconds)
+        # Waiting for a worker and moving the result between processes
+        stage_latency.observe(max(0.0, seconds - timings.get("total", 0) / 1000 - (store_seconds or 0)), "queue")
+    if "megapixels" in metadata:
+        analysis_size.observe(metadata["megapixels"])
+    analysis_outcomes.inc("completed")
+
+
+def _save_analysis(results: dict, render_sources: dict, cache_key: str) -> list:
+    """
+    Persist an analysis (blocking) and re-evaluate the alerts of its plot.
+    Returns the alerts raised, updated or resolved.
+    """
+    store.save_analysis(results, render_sources, cache_key)
+    plot = plot_index.get(results["metadata"].get("plot_id"))
+    if plot is None:
+        return []
+    alert_engine.set_analysis(plot["id"], results)
+    return _evaluate_alerts([plot])
+
+
+def _evaluate_alerts(plots: list) -> list:
+    """
+    Run the alert rules for `plots` against their open alerts as stored (other
+    workers may have raised or resolved some) and persist whatever changed
+    (blocking). Returns the changed alerts as stored.
+    """
+    plot_ids = [plot["id"] for plot in plots]
+    alert_engine.load(store.open_alerts(plot_ids), plot_ids)
+    changed = alert_engine.evaluate(plots)
+    return store.add_alerts(changed) if changed else []
+
+
+async def _aggregate_response(request: Request, name: str, build) -> Response:
+    """Serve an aggregate view, or 304 when the client's copy is still current."""
+    await asyncio.to_thread(aggregates.refresh)
+    headers = {
+        "ETag": aggregates.etag,
+        "Last-Modified": formatdate(aggregates.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if request.headers.get("if-none-match"):
+        if _etag_matches(request, aggregates.etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and int(aggregates.last_modified) <= since:
+            return Response(status_code=304, headers=headers)
+    return JSONResponse(content=aggregates.view(name, build), headers=headers)
 
 # ─── API ENDPOINTS ──────────────────────────────────────────────────────
 
@@ -138,31 +348,31 @@ async def root():
     return {"message": "LandWatch - Land Monitoring System API", "version": "2.0.0"}
 
 
-@app.get("/api/dashboard/stats")
-async def get_dashboard_stats():
-    """Comprehensive dashboard statistics."""
-    statuses = [p["status"] for p in DEMO_PLOTS]
-    total_dues = sum(p["dues_pending"] for p in DEMO_PLOTS)
-    avg_compliance = sum(p["compliance_score"] for p in DEMO_PLOTS) / len(DEMO_PLOTS)
-    total_area = sum(p["area_sqm"] for p in DEMO_PLOTS)
+def _dashboard_stats(agg: DashboardAggregates) -> dict:
+    statuses = agg.status_counts()
+    totals = agg.totals()
+
+    def matching(*words):
+        return sum(n for status, n in statuses.items() if any(w in status for w in words))
 
     return {
-        "total_plots": len(DEMO_PLOTS),
-        "compliant": len([s for s in statuses if s == "Compliant"]),
-        "violations_detected": len([s for s in statuses if s != "Compliant"]),
-        "encroachments": len([s for s in statuses if "Encroachment" in s]),
-        "vacant_plots": len([s for s in statuses if "Vacant" in s]),
-        "boundary_deviations": len([s for s in statuses if "Boundary" in s]),
-        "unauthorized_construction": len([s for s in statuses if "Unauthorized" in s]),
-        "non_compliant_construction": len([s for s in statuses if "Non-Compliant" in s or "Partial" in s]),
-        "pending_dues": len([p for p in DEMO_PLOTS if p["dues_pending"] > 0]),
-        "total_dues_amount": total_dues,
-        "average_compliance_score": round(avg_compliance, 1),
-        "total_monitored_area_sqm": total_area,
+        "total_plots": totals["plots"],
+        "compliant": statuses["Compliant"],
+        "violations_detected": totals["plots"] - statuses["Compliant"],
+        "encroachments": matching("Encroachment"),
+        "vacant_plots": matching("Vacant"),
+        "boundary_deviations": matching("Boundary"),
+        "unauthorized_construction": matching("Unauthorized"),
+        "non_compliant_construction": matching("Non-Compliant", "Partial"),
+        "pending_dues": totals["plots_with_dues"],
+        "total_dues_amount": totals["dues_pending"],
+        "average_compliance_score": round(totals["compliance_score"] / totals["plots"], 1) if totals["plots"] else 0,
+        "total_monitored_area_sqm": totals["area_sqm"],
+        "compliance_bands": {band: totals[f"compliance_{band}"] for band in ("high", "medium", "low")},
         "industrial_areas_count": len(INDUSTRIAL_AREAS),
-        "active_alerts": len([a for a in alerts_store if a["status"] == "Open"]),
-        "total_analyses": len(analyses_store),
-        "last_updated": datetime.now().isoformat(),
+        "active_alerts": agg.alerts_with(status="Open"),
+        "total_analyses": agg.analyses,
+        "last_updated": datetime.fromtimestamp(agg.last_modified, timezone.utc).isoformat(),
         # Cost savings data
         "cost_comparison": {
             "drone_survey_cost_per_visit": 250000,
@@ -175,174 +385,1365 @@ async def get_dashboard_stats():
     }
 
 
-@app.get("/api/industrial-areas")
-async def get_industrial_areas():
-    """Get all industrial areas."""
+def _industrial_areas(agg: DashboardAggregates) -> dict:
     areas = []
     for area in INDUSTRIAL_AREAS:
-        area_plots = [p for p in DEMO_PLOTS if p["industrial_area"] == area["name"]]
-        compliant = len([p for p in area_plots if p["status"] == "Compliant"])
-        violations = len(area_plots) - compliant
-        avg_score = sum(p["compliance_score"] for p in area_plots) / len(area_plots) if area_plots else 0
+        totals = agg.areas.get(area["name"]) or {"plots": 0, "compliant": 0, "compliance_score": 0}
         areas.append({
             **area,
-            "monitored_plots": len(area_plots),
-            "compliant": compliant,
-            "violations": violations,
-            "avg_compliance_score": round(avg_score, 1),
+            "monitored_plots": totals["plots"],
+            "compliant": totals["compliant"],
+            "violations": totals["plots"] - totals["compliant"],
+            "avg_compliance_score": round(totals["compliance_score"] / totals["plots"], 1) if totals["plots"] else 0,
         })
     return {"areas": areas}
 
 
+@app.get("/api/dashboard/stats")
+async def get_dashboard_stats(request: Request):
+    """Comprehensive dashboard statistics, served from the incrementally maintained aggregates."""
+    return await _aggregate_response(request, "dashboard", _dashboard_stats)
+
+
+@app.get("/api/industrial-areas")
+async def get_industrial_areas(request: Request):
+    """Get all industrial areas."""
+    return await _aggregate_response(request, "industrial-areas", _industrial_areas)
+
+
+ALERT_FIELDS = ("id", "type", "severity", "plot_id", "plot_name", "message", "timestamp", "action_required",
+                "status", "result_id")
+
+
+def _csv_param(value: str) -> list:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def _area_names(values: list) -> list:
+    """Industrial area filter values given as area ids or names, as names."""
+    if values is None:
+        return None
+    ids = {a["id"]: a["name"] for a in INDUSTRIAL_AREAS}
+    return [ids.get(v, v) for v in values]
+
+
 @app.get("/api/plots")
-async def get_plots():
-    return {"plots": DEMO_PLOTS}
+async def get_plots(area: str = None, status: str = None, compliant: bool = None, has_dues: bool = None,
+                    q: str = None, sort: str = "id", order: str = "asc", fields: str = None,
+                    cursor: str = None, limit: int = 100):
+    """
+    Plot registry page. Filters: `area` (ids or names) and `status`, both
+    comma-separated; `compliant`; `has_dues`; `q` searches id, name and
+    lessee. `fields` projects each plot onto a comma-separated field list.
+    Pass the returned `next_cursor` as `cursor` for the next page.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    limit = page_size(limit)
+    try:
+        projection = parse_fields(fields, plot_index.fields)
+        plots, next_cursor, total = plot_index.query(
+            areas=_area_names(_csv_param(area)), statuses=_csv_param(status), compliant=compliant, has_dues=has_dues,
+            q=q, sort=sort, descending=order == "desc", cursor=cursor, limit=limit,
+        )
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "plots": [project(p, projection) for p in plots],
+        "total": total,
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
 
 
 @app.get("/api/plots/{plot_id}")
 async def get_plot(plot_id: str):
-    for plot in DEMO_PLOTS:
-        if plot["id"] == plot_id:
-            return plot
-    raise HTTPException(status_code=404, detail="Plot not found")
+    return _plot_or_404(plot_id)
+
+
+def _geojson_response(request: Request, data: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="application/geo+json", headers=headers)
+
+
+@app.get("/api/map/plots")
+async def get_map_plots(request: Request, bbox: str, zoom: int):
+    """
+    Plots inside a map viewport as GeoJSON. `bbox` is west,south,east,north in
+    degrees and `zoom` the map zoom: below LANDWATCH_MAP_CLUSTER_MAX_ZOOM
+    nearby plots come back as clusters with their count and worst status.
+    Answered from per-tile caches; revalidate with the ETag.
+    """
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise HTTPException(status_code=400, detail=f"zoom must be between 0 and {MAX_ZOOM}")
+    try:
+        tiles = tiles_for_bbox(parse_bbox(bbox), zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _geojson_response(request, *plot_map.feature_collection(tiles, zoom))
+
+
+@app.get("/api/map/tiles/{z}/{x}/{y}")
+async def get_map_tile(z: int, x: int, y: int, request: Request):
+    """The map feed of one slippy-map tile (see /api/map/plots)."""
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile not found")
+    return _geojson_response(request, *plot_map.feature_collection([(x, y)], z))
+
+
+# Registry fields a PATCH may change, with the type each must have
+PLOT_UPDATABLE_FIELDS = {
+    "status": str, "lessee": str, "land_use": str, "lease_status": str, "last_inspection": str,
+    "lease_amount": (int, float), "water_charges": (int, float), "dues_pending": (int, float),
+    "compliance_score": (int, float), "constructed_area_pct": (int, float),
+}
+# (min, max) of the numeric ones; built-up area may exceed the allotment, so it has no maximum
+PLOT_FIELD_RANGES = {
+    "lease_amount": (0, None), "water_charges": (0, None), "dues_pending": (0, None),
+    "compliance_score": (0, 100), "constructed_area_pct": (0, None),
+}
+
+
+@app.patch("/api/plots/{plot_id}")
+async def update_plot(plot_id: str, changes: dict = Body(...)):
+    """
+    Update registry fields of a plot. The change is persisted, so every worker
+    and later restarts see it; indexes and dashboard aggregates follow, and the
+    plot's alerts are re-evaluated. Returns the plot and the alerts raised,
+    updated or resolved.
+    """
+    _plot_or_404(plot_id)
+    for field, value in changes.items():
+        kind = PLOT_UPDATABLE_FIELDS.get(field)
+        if kind is None:
+            raise HTTPException(status_code=400, detail=f"{field} cannot be updated")
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise HTTPException(status_code=400, detail=f"Invalid value for {field}")
+        if field in PLOT_FIELD_RANGES:
+            low, high = PLOT_FIELD_RANGES[field]
+            if not math.isfinite(value) or value < low or (high is not None and value > high):
+                bounds = f"between {low} and {high}" if high is not None else f"at least {low}"
+                raise HTTPException(status_code=400, detail=f"{field} must be {bounds}")
+    if "status" in changes and changes["status"] not in STATUS_SEVERITY:
+        raise HTTPException(status_code=400, detail=f"status must be one of: {', '.join(STATUS_SEVERITY)}")
+    if "last_inspection" in changes:
+        try:
+            date.fromisoformat(changes["last_inspection"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="last_inspection must be an ISO date")
+
+    await asyncio.to_thread(store.update_plot, plot_id, changes)
+    await asyncio.to_thread(_sync_registry)
+    updated = plot_index.get(plot_id)
+    alerts = await asyncio.to_thread(_evaluate_alerts, [updated])
+    return {"plot": updated, "alerts": alerts}
 
 
 @app.get("/api/alerts")
-async def get_alerts():
-    """Get all alerts sorted by severity."""
-    severity_order = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
-    sorted_alerts = sorted(alerts_store, key=lambda a: severity_order.get(a["severity"], 4))
+async def get_alerts(severity: str = None, status: str = None, plot_id: str = None, sort: str = "severity",
+                     fields: str = None, cursor: str = None, limit: int = 100):
+    """
+    Alerts page, most severe first by default (`sort` = severity, newest or
+    oldest). `severity` and `status` take comma-separated values. The summary
+    always covers every alert.
+    """
+    if sort not in ALERT_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort. Available: {', '.join(ALERT_SORTS)}")
+    limit = page_size(limit)
+    try:
+        projection = parse_fields(fields, ALERT_FIELDS)
+        after = None
+        if cursor:
+            after = decode_cursor(cursor)
+            if len(after) != 3 or after[0] != sort:
+                raise InvalidQuery("Cursor does not belong to this sort order")
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    alerts, last, total = await asyncio.to_thread(
+        store.query_alerts, severities=_csv_param(severity), statuses=_csv_param(status), plot_id=plot_id,
+        sort=sort, after=after[1:] if after else None, limit=limit,
+    )
+    await asyncio.to_thread(aggregates.refresh)
     return {
-        "alerts": sorted_alerts,
+        "alerts": [project(a, projection) for a in alerts],
+        "total": total,
+        "limit": limit,
+        "next_cursor": encode_cursor([sort, *last]) if last else None,
         "summary": {
-            "total": len(sorted_alerts),
-            "critical": len([a for a in sorted_alerts if a["severity"] == "Critical"]),
-            "high": len([a for a in sorted_alerts if a["severity"] == "High"]),
-            "medium": len([a for a in sorted_alerts if a["severity"] == "Medium"]),
-            "open": len([a for a in sorted_alerts if a["status"] == "Open"]),
+            "total": aggregates.alerts_with(),
+            "critical": aggregates.alerts_with(severity="Critical"),
+            "high": aggregates.alerts_with(severity="High"),
+            "medium": aggregates.alerts_with(severity="Medium"),
+            "open": aggregates.alerts_with(status="Open"),
         }
     }
 
 
+@app.post("/api/alerts/evaluate")
+async def evaluate_alerts(plot_ids: list = Body(None, embed=True)):
+    """
+    Re-run the alert rules for the given plots, or for the whole registry
+    (e.g. daily, for rules that depend on elapsed time).
+    """
+    if plot_ids is None:
+        plots = list(plot_index.by_id.values())
+    else:
+        plots = [_plot_or_404(plot_id) for plot_id in plot_ids]
+    started = time.perf_counter()
+    changed = await asyncio.to_thread(_evaluate_alerts, plots)
+    return {
+        "evaluated_plots": len(plots),
+        "raised": sum(1 for a in changed if "updated_at" not in a and a["status"] != "Resolved"),
+        "resolved": sum(1 for a in changed if a["status"] == "Resolved"),
+        "changed": len(changed),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _spool_upload(upload: UploadFile):
+    """
+    Stream an upload to the spool directory in chunks (see ingest.spool_file)
+    instead of reading it into memory. The format is checked from its content.
+    """
+    if upload is None:
+        return None
+    await upload.seek(0)
+    try:
+        return await asyncio.to_thread(ingest.spool_file, upload.file, upload.filename)
+    except ingest.UnsupportedImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ingest.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+async def _spool_uploads(*uploads: UploadFile) -> list:
+    spooled = []
+    try:
+        for upload in uploads:
+            spooled.append(await _spool_upload(upload))
+    except BaseException:
+        ingest.discard(*spooled)
+        raise
+    return spooled
+
+
+def _discard_when_done(task, *spooled):
+    """Remove spooled uploads once `task` (if any) no longer needs them."""
+    if task is None:
+        ingest.discard(*spooled)
+    else:
+        task.add_done_callback(lambda _: ingest.discard(*spooled))
+
+
+def _saturated(e: PoolSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Analysis capacity exhausted, please retry shortly",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _submit_or_503(fn, *args):
+    try:
+        return analysis_pool.submit(fn, *args)
+    except PoolSaturated as e:
+        raise _saturated(e)
+
+
+def _registered_reference(reference_id: str) -> dict:
+    registered = store.get_reference(reference_id)
+    if registered is None:
+        raise HTTPException(status_code=404, detail=f"Reference map not found: {reference_id}")
+    return registered
+
+
+def _analysis_key(cur_digest: str, ref_digest: str, plot_id: str = None, geotransform: list = None,
+                  mode: str = None) -> str:
+    # Keyed on the reference digest, so a registered map and the same raw upload share results
+    params = {**image_processing.ANALYSIS_PARAMS, "plot_id": plot_id, "reference": ref_digest,
+              "geotransform": geotransform}
+    if mode is not None:
+        params["detection_mode"] = mode
+    return digest_key(cur_digest, params=params)
+
+
+def _parse_geotransform_or_400(value):
+    if value is None:
+        return None
+    try:
+        return parse_geotransform(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _start_analysis(reference: dict, current: dict, plot_id: str = None,
+                          reference_id: str = None, geotransform: str = None, mode: str = None,
+                          profile: bool = False) -> tuple:
+    """
+    Queue spooled uploads (see _spool_upload) on the analysis pool and register
+    a job; the caller keeps ownership of the spooled files.
+    The reference is either an uploaded image or a registered reference map.
+    With a geotransform (given here, stored with the reference map or embedded
+    in a GeoTIFF reference) the scene is clipped against every plot boundary it covers.
+    `mode` overrides the configured detection mode (full or pyramid).
+    `profile` samples the run (see _save_profile) and bypasses the result cache.
+    Returns (job_id, task, cache_status). For a cache "hit" the task is None and
+    job_id names the stored result; "coalesced" joins an identical running job.
+    """
+    if (reference is None) == (reference_id is None):
+        raise HTTPException(status_code=400, detail="Provide either a reference image or a reference_id")
+
+    modes = image_processing.DETECTION_MODES
+    if mode is not None and mode not in modes:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(modes)}")
+    if profile and not PROFILING:
+        raise HTTPException(status_code=400, detail="Profiling is disabled; set LANDWATCH_PROFILING=1 to enable it")
+    geotransform = _parse_geotransform_or_400(geotransform)
+    reference_dir = None
+    if reference_id is not None:
+        registered = _registered_reference(reference_id)
+        geotransform = geotransform or registered.get("geotransform")
+        ref_path = ""
+        ref_digest = registered["sha256"]
+        reference_filename = registered["filename"]
+        reference_dir = store.reference_dir(reference_id)
+        plot_id = plot_id or registered.get("plot_id")
+    else:
+        geotransform = geotransform or await asyncio.to_thread(ingest.read_geotransform, reference["path"])
+        ref_path = reference["path"]
+        ref_digest = reference["sha256"]
+        reference_filename = reference["filename"]
+
+    if plot_id is not None and plot_index.get(plot_id) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown plot_id: {plot_id}")
+
+    cache_key = _analysis_key(current["sha256"], ref_digest, plot_id, geotransform, mode)
+    if not profile:
+        cached_id = result_cache.lookup(cache_key)
+        if cached_id is not None:
+            analysis_outcomes.inc("cached")
+            return cached_id, None, "hit"
+        if cache_key in _inflight_analyses:
+            result_cache.coalesced += 1
+            return (*_inflight_analyses[cache_key], "coalesced")
+
+    job_id = image_processing.new_result_id()
+    future = _submit_or_503(
+        analyze_files, ref_path, current["path"], job_id, reference_dir,
+        geotransform, PLOT_BOUNDARIES if geotransform else None, mode, profile,
+    )
+
+    metadata = {
+        "reference_filename": reference_filename,
+        "current_filename": current["filename"],
+        "plot_id": plot_id,
+        "reference_id": reference_id,
+    }
+    job_manager.create(job_id, **metadata)
+    task = asyncio.ensure_future(_finish_analysis(job_id, future, metadata, cache_key))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    _inflight_analyses[cache_key] = (job_id, task)
+    task.add_done_callback(lambda _: _inflight_analyses.pop(cache_key, None))
+    return job_id, task, "miss"
+
+
+def _finalize_result(results: dict, metadata: dict) -> dict:
+    """Attach metadata, recommendations and image URLs to a pooled result. Returns its render sources."""
+    results["metadata"] = {
+        **metadata,
+        "analyzed_at": datetime.now(timezone.utc).isoformat(),
+        **results.get("metadata", {}),
+    }
+
+    # Generate recommendations based on results
+    results["recommendations"] = generate_recommendations(results)
+
+    result_id = results["result_id"]
+    results["image_urls"] = {kind: f"/api/analyses/{result_id}/images/{kind}" for kind in image_processing.RENDER_KINDS}
+    return results.pop("render_sources")
+
+
+def _save_profile(result_id: str, collapsed: str):
+    """Keep the collapsed stacks of a profiled analysis for GET /api/analyses/{id}/profile."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{result_id}.folded"), "w") as f:
+        f.write(collapsed)
+
+
+async def _finish_analysis(job_id: str, future, metadata: dict, cache_key: str):
+    """Await a pooled analysis, store its result and settle the job. Returns the result or None on failure."""
+    started = time.perf_counter()
+    try:
+        results = await future
+        profile = results.pop("profile", None)
+        render_sources = _finalize_result(results, metadata)
+        stored = time.perf_counter()
+        await asyncio.to_thread(_save_analysis, results, render_sources, cache_key)
+        finished = time.perf_counter()
+        if profile is not None:
+            await asyncio.to_thread(_save_profile, results["result_id"], profile)
+        result_cache.remember(cache_key, results["result_id"])
+        job_manager.complete(job_id, results["summary"])
+        _observe_analysis(results, finished - stored, finished - started)
+        return results
+
+    except ImageDecodeError as e:
+        analysis_outcomes.inc("invalid_image")
+        job_manager.fail(job_id, str(e), status_code=400)
+    except Exception as e:
+        analysis_outcomes.inc("failed")
+        job_manager.fail(job_id, f"Analysis failed: {str(e)}")
+    return None
+
+
 @app.post("/api/analyze")
 async def analyze_images(
-    reference: UploadFile = File(..., description="Reference/allotment map image (JPG/PNG)"),
-    current: UploadFile = File(..., description="Current satellite/drone image (JPG/PNG)")
+    reference: UploadFile = File(None, description="Reference/allotment map image (JPG/PNG/GeoTIFF/JP2)"),
+    current: UploadFile = File(..., description="Current satellite/drone image (JPG/PNG/GeoTIFF/JP2)"),
+    plot_id: str = Form(None, description="Plot the images cover (optional)"),
+    reference_id: str = Form(None, description="Registered reference map to use instead of uploading one"),
+    geotransform: str = Form(None, description="GDAL-style geotransform of the reference image as a JSON list of 6 numbers"),
+    mode: str = Form(None, description="Detection mode: full, or pyramid for coarse-to-fine detection"),
+    profile: bool = Form(False, description="Record a sampling profile of the run (needs LANDWATCH_PROFILING=1)"),
 ):
-    allowed = ["image/jpeg", "image/png", "image/jpg"]
-    if reference.content_type not in allowed or current.content_type not in allowed:
-        raise HTTPException(status_code=400, detail="Only JPG/PNG images are supported (matching CSIDC GIS portal export formats)")
+    spooled = await _spool_uploads(reference, current)
+    try:
+        job_id, task, cache_status = await _start_analysis(*spooled, plot_id, reference_id, geotransform, mode,
+                                                           profile)
+    except BaseException:
+        ingest.discard(*spooled)
+        raise
+    _discard_when_done(task, *spooled)
+    results = await task if task is not None else store.get_analysis(job_id)
+    if results is None:
+        job = job_manager.get(job_id)
+        raise HTTPException(status_code=job["error_status"], detail=job["error"])
+    return JSONResponse(content=results, headers={"X-Cache": cache_status.upper()})
 
+
+@app.post("/api/analyses", status_code=202)
+async def submit_analysis(
+    reference: UploadFile = File(None, description="Reference/allotment map image (JPG/PNG/GeoTIFF/JP2)"),
+    current: UploadFile = File(..., description="Current satellite/drone image (JPG/PNG/GeoTIFF/JP2)"),
+    plot_id: str = Form(None, description="Plot the images cover (optional)"),
+    reference_id: str = Form(None, description="Registered reference map to use instead of uploading one"),
+    geotransform: str = Form(None, description="GDAL-style geotransform of the reference image as a JSON list of 6 numbers"),
+    mode: str = Form(None, description="Detection mode: full, or pyramid for coarse-to-fine detection"),
+    profile: bool = Form(False, description="Record a sampling profile of the run (needs LANDWATCH_PROFILING=1)"),
+):
+    """Queue an analysis and return immediately; poll the status URL or stream the events URL."""
+    spooled = await _spool_uploads(reference, current)
     try:
-        ref_bytes = await reference.read()
-        cur_bytes = await current.read()
+        job_id, task, cache_status = await _start_analysis(*spooled, plot_id, reference_id, geotransform, mode,
+                                                           profile)
+    except BaseException:
+        ingest.discard(*spooled)
+        raise
+    _discard_when_done(task, *spooled)
+    if task is not None:
+        await job_manager.flushed()  # the status and events URLs must work on every worker
+    body = {
+        "job_id": job_id,
+        "status": "completed" if cache_status == "hit" else "queued",
+        "cache": cache_status,
+        "status_url": f"/api/analyses/{job_id}",
+        "events_url": f"/api/analyses/{job_id}/events",
+    }
+    return JSONResponse(content=body, status_code=200 if cache_status == "hit" else 202)
 
-        ref_img = read_image_from_bytes(ref_bytes)
-        cur_img = read_image_from_bytes(cur_bytes)
 
-        if ref_img is None or cur_img is None:
-            raise HTTPException(status_code=400, detail="Could not decode one or both images")
+# ─── BATCH ANALYSIS ─────────────────────────────────────────────────────
 
-        results = compute_difference(ref_img, cur_img)
+@app.post("/api/industrial-areas/{area_id}/analyze")
+async def analyze_industrial_area(
+    area_id: str,
+    archive: UploadFile = File(..., description="ZIP of plot image pairs (manifest.json or <plot_id>/reference|current.png)"),
+):
+    """
+    Analyze every plot of an industrial area in one request. Pairs are fanned
+    out across the worker pool, identical inputs are served from the result
+    cache, and plots that come back Medium risk or worse raise alerts.
+    """
+    area = next((a for a in INDUSTRIAL_AREAS if a["id"] == area_id), None)
+    if area is None:
+        raise HTTPException(status_code=404, detail="Industrial area not found")
+    started = time.perf_counter()
+
+    # Starlette has already spooled the upload to a temporary file; the ZIP is read from there
+    await archive.seek(0)
+    try:
+        items = await asyncio.to_thread(read_batch_archive, archive.file)
+    except BatchArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await _run_batch(area, items, started)
+    finally:
+        discard_items(items)
 
-        results["metadata"] = {
-            "reference_filename": reference.filename,
-            "current_filename": current.filename,
-            "analyzed_at": datetime.now().isoformat(),
-            "reference_dimensions": f"{ref_img.shape[1]}x{ref_img.shape[0]}",
-            "current_dimensions": f"{cur_img.shape[1]}x{cur_img.shape[0]}",
+
+async def _run_batch(area: dict, items: list, started: float) -> dict:
+    area_id = area["id"]
+    area_plots = {i: plot_index.get(i) for i in plot_index.by_area.get(area["name"], ())}
+    for item in items:
+        if item["plot_id"] not in area_plots:
+            raise HTTPException(status_code=400, detail=f"{item['plot_id']} is not a plot of {area['name']}")
+        if item["reference_id"] is not None:
+            registered = _registered_reference(item["reference_id"])
+            item["reference_digest"] = registered["sha256"]
+            item["reference_filename"] = registered["filename"]
+        else:
+            item["reference_digest"] = item["reference"]["sha256"]
+        item["cache_key"] = _analysis_key(item["current"]["sha256"], item["reference_digest"], item["plot_id"])
+
+    batch_id = f"BATCH-{image_processing.new_result_id()}"
+    to_run, coalesced = [], []
+    for item in items:
+        item["cache"] = "miss"
+        item["result_id"] = result_cache.lookup(item["cache_key"])
+        if item["result_id"] is not None:
+            item["cache"] = "hit"
+            analysis_outcomes.inc("cached")
+        elif item["cache_key"] in _inflight_analyses:
+            result_cache.coalesced += 1
+            item["cache"] = "coalesced"
+            _, item["task"] = _inflight_analyses[item["cache_key"]]
+            coalesced.append(item)
+        else:
+            to_run.append(item)
+
+    # Each pair is a job like any other: identical analyses started meanwhile coalesce onto it
+    loop = asyncio.get_running_loop()
+    for item in to_run:
+        item["job_id"] = image_processing.new_result_id()
+        item["metadata"] = {
+            "reference_filename": item["reference_filename"],
+            "current_filename": item["current_filename"],
+            "plot_id": item["plot_id"],
+            "reference_id": item["reference_id"],
+            "batch_id": batch_id,
+            "industrial_area": area_id,
         }
+        item["settled"] = loop.create_future()
+        job_manager.create(item["job_id"], **item["metadata"])
+        _inflight_analyses[item["cache_key"]] = (item["job_id"], item["settled"])
 
-        # Generate recommendations based on results
-        results["recommendations"] = generate_recommendations(results)
+    to_save, new_alerts = [], []
+    try:
+        args = [
+            (
+                item["reference"]["path"] if item["reference"] else "",
+                item["current"]["path"],
+                item["job_id"],
+                store.reference_dir(item["reference_id"]) if item["reference_id"] else None,
+            )
+            for item in to_run
+        ]
+        try:
+            outcomes = await analysis_pool.map(analyze_files, args) if args else []
+        except PoolSaturated as e:
+            raise _saturated(e)
 
-        analyses_store[results["result_id"]] = results
-        return JSONResponse(content=results)
+        for item, outcome in zip(to_run, outcomes):
+            if isinstance(outcome, Exception):
+                invalid = isinstance(outcome, ImageDecodeError)
+                item["error"] = str(outcome) if invalid else f"Analysis failed: {outcome}"
+                analysis_outcomes.inc("invalid_image" if invalid else "failed")
+                job_manager.fail(item["job_id"], item["error"], status_code=400 if invalid else 500)
+                continue
+            render_sources = _finalize_result(outcome, item["metadata"])
+            to_save.append((outcome, render_sources, item["cache_key"]))
+            _observe_analysis(outcome)
+            item["result_id"] = outcome["result_id"]
+            item["results"] = outcome
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        def persist():
+            for results, render_sources, cache_key in to_save:
+                new_alerts.extend(_save_analysis(results, render_sources, cache_key))
+        await asyncio.to_thread(persist)
+        for results, _, cache_key in to_save:
+            result_cache.remember(cache_key, results["result_id"])
+        for item in to_run:
+            if "results" in item:
+                job_manager.complete(item["job_id"], item["results"]["summary"])
+                item["stored"] = True
+    finally:
+        for item in to_run:
+            _inflight_analyses.pop(item["cache_key"], None)
+            if not item.get("stored") and "error" not in item:
+                job_manager.fail(item["job_id"], "Analysis failed")
+            item["settled"].set_result(item["results"] if item.get("stored") else None)
 
+    for item in coalesced:
+        results = await item["task"]
+        if results is None:
+            item["error"] = "Analysis failed"
+        else:
+            item["result_id"] = results["result_id"]
+            item["results"] = results
+    for item in items:
+        if item["cache"] == "hit":
+            item["results"] = await asyncio.to_thread(store.get_analysis, item["result_id"])
 
-@app.get("/api/analyses")
-async def list_analyses():
-    summaries = []
-    for rid, data in analyses_store.items():
-        summaries.append({
-            "result_id": rid,
-            "analyzed_at": data.get("metadata", {}).get("analyzed_at"),
-            "summary": data.get("summary"),
-            "reference_file": data.get("metadata", {}).get("reference_filename"),
-            "current_file": data.get("metadata", {}).get("current_filename"),
+    plots = []
+    risk_levels = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
+    for item in items:
+        results = item.get("results")
+        if results is None:
+            plots.append({"plot_id": item["plot_id"], "status": "failed", "cache": item["cache"], "error": item.get("error")})
+            continue
+        risk_levels[results["summary"]["risk_level"]] += 1
+        plots.append({
+            "plot_id": item["plot_id"],
+            "status": "completed",
+            "cache": item["cache"],
+            "result_id": results["result_id"],
+            "summary": results["summary"],
+            "deviations": results["deviations"],
+            "image_urls": results["image_urls"],
         })
-    return {"analyses": summaries}
+
+    completed = [p for p in plots if p["status"] == "completed"]
+    return {
+        "batch_id": batch_id,
+        "area_id": area_id,
+        "area_name": area["name"],
+        "analyzed_at": datetime.now(timezone.utc).isoformat(),
+        "summary": {
+            "plots": len(plots),
+            "completed": len(completed),
+            "failed": len(plots) - len(completed),
+            "cached": sum(1 for p in plots if p["cache"] != "miss"),
+            "total_deviations": sum(p["summary"]["total_deviations"] for p in completed),
+            "risk_levels": risk_levels,
+            "highest_risk": next((level for level, n in risk_levels.items() if n), None),
+            "alerts_raised": len(new_alerts),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+        "plots": plots,
+        "alerts": new_alerts,
+    }
+
+
+# ─── REFERENCE MAPS ─────────────────────────────────────────────────────
+
+@app.post("/api/references", status_code=201)
+async def register_reference(
+    file: UploadFile = File(..., description="Reference/allotment map image (JPG/PNG/GeoTIFF/JP2)"),
+    name: str = Form(None, description="Display name"),
+    plot_id: str = Form(None, description="Plot the map covers (optional)"),
+    geotransform: str = Form(None, description="GDAL-style geotransform of the map as a JSON list of 6 numbers"),
+):
+    """
+    Register a reference map once: it is decoded, blurred, pyramided and
+    keypointed up front, so analyses against it skip that work.
+    """
+    geotransform = _parse_geotransform_or_400(geotransform)
+    if plot_id is not None and plot_index.get(plot_id) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown plot_id: {plot_id}")
+
+    spooled = await _spool_upload(file)
+    try:
+        geotransform = geotransform or await asyncio.to_thread(ingest.read_geotransform, spooled["path"])
+        reference, created = await _register_reference_file(
+            spooled["path"], spooled["sha256"], file.filename, name, plot_id, geotransform,
+        )
+    finally:
+        ingest.discard(spooled)
+    return JSONResponse(content=reference, status_code=201 if created else 200)
+
+
+async def _register_reference_file(path: str, sha256: str, filename: str, name: str = None, plot_id: str = None,
+                                   geotransform: list = None) -> tuple:
+    """Preprocess and store a reference map unless it is already registered. Returns (reference, created)."""
+    reference_id = f"REF-{sha256[:12].upper()}"
+    existing = store.get_reference(reference_id)
+    if existing is not None:
+        return existing, False
+
+    future = _submit_or_503(register_reference_file, path, store.reference_dir(reference_id))
+    try:
+        info = await future
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    reference = {
+        "reference_id": reference_id,
+        "sha256": sha256,
+        "name": name or filename,
+        "filename": filename,
+        "plot_id": plot_id,
+        "geotransform": geotransform,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **info,
+    }
+    await asyncio.to_thread(store.save_reference, reference)
+    return reference, True
+
+
+@app.get("/api/references")
+async def list_references():
+    registered = store.list_references()
+    return {"references": registered, "total": len(registered)}
+
+
+@app.get("/api/references/{reference_id}")
+async def get_reference(reference_id: str):
+    reference = store.get_reference(reference_id)
+    if reference is None:
+        raise HTTPException(status_code=404, detail="Reference map not found")
+    return reference
+
+
+@app.delete("/api/references/{reference_id}")
+async def delete_reference(reference_id: str):
+    if store.get_reference(reference_id) is None:
+        raise HTTPException(status_code=404, detail="Reference map not found")
+    in_use = await asyncio.to_thread(store.delete_reference, reference_id)
+    if in_use:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Reference map is the accepted baseline of {', '.join(in_use)}; accept another baseline first",
+        )
+    await asyncio.to_thread(references.delete_prepared_reference, store.reference_dir(reference_id))
+    return {"deleted": reference_id}
+
+
+# ─── PLOT TIME SERIES ───────────────────────────────────────────────────
+
+_plot_locks = defaultdict(asyncio.Lock)  # passes of one plot are recorded one at a time
+
+
+def _plot_or_404(plot_id: str) -> dict:
+    plot = plot_index.get(plot_id)
+    if plot is None:
+        raise HTTPException(status_code=404, detail="Plot not found")
+    return plot
+
+
+def _plot_baseline(plot_id: str):
+    """The accepted baseline of a plot, defaulting to the newest reference map registered for it."""
+    baseline = store.get_baseline(plot_id)
+    if baseline is not None:
+        return baseline
+    reference = next((r for r in store.list_references() if r.get("plot_id") == plot_id), None)
+    if reference is None:
+        return None
+    return {"plot_id": plot_id, "reference_id": reference["reference_id"],
+            "accepted_at": reference["created_at"], "source_pass_id": None}
+
+
+def _parse_timestamp(value: str, name: str) -> str:
+    """
+    An ISO 8601 date or datetime as a UTC ISO timestamp, the form every stored
+    timestamp takes, so they compare and subtract consistently. A value
+    without an offset is taken as UTC.
+    """
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 date or datetime")
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc).isoformat()
+    return moment.astimezone(timezone.utc).isoformat()
+
+
+def _parse_captured_at(value: str) -> str:
+    """Capture time of a pass (see _parse_timestamp); now if not given."""
+    if value is None:
+        return datetime.now(timezone.utc).isoformat()
+    return _parse_timestamp(value, "captured_at")
+
+
+def _pass_point(monitoring_pass: dict) -> dict:
+    return {
+        "pass_id": monitoring_pass["pass_id"],
+        "captured_at": monitoring_pass["captured_at"],
+        "result_id": monitoring_pass["result_id"],
+        "reference_id": monitoring_pass["reference_id"],
+        "new_tracks": monitoring_pass["new_tracks"],
+        **monitoring_pass["summary"],
+    }
+
+
+def _record_pass(plot_id: str, captured_at: str, baseline: dict, results: dict, image: dict) -> tuple:
+    """
+    Link a finished analysis to the plot's previous pass under the same
+    baseline and store it. Returns (pass, {deviation id: track}).
+    A pass lists its tracks by label, i.e. in outline order: deviation Dk is label k.
+    """
+    sources = store.get_render_sources(results["result_id"])
+    mask = image_processing.load_mask(sources["mask"])
+    labels = timeseries.deviation_labels(sources["outlines"], mask.shape)
+    deviations = sorted(results["deviations"], key=lambda d: int(d["id"][1:]))
+
+    previous = store.latest_pass(plot_id, baseline["reference_id"])
+    prev_labels, prev_mask, prev_ids, prev_tracks = None, None, [], {}
+    if previous is not None:
+        prev_labels = timeseries.decode_labels(store.get_pass_blob(previous["pass_id"], "labels"))
+        prev_ids = previous["tracks"]
+        prev_tracks = store.get_tracks(prev_ids)
+        prev_sources = store.get_render_sources(previous["result_id"], paths=True)
+        if prev_sources is not None:
+            with open(prev_sources["mask"], "rb") as f:
+                prev_mask = image_processing.load_mask(f.read())
+    links = timeseries.link_deviations(prev_labels, labels, len(deviations))
+
+    pass_id = f"PASS-{image_processing.new_result_id()}"
+    continued = {prev_ids[link["continues"] - 1] for link in links if link["continues"] is not None}
+    changed = {}
+    pass_tracks = []
+    for dev, link in zip(deviations, links):
+        related = [prev_tracks[prev_ids[label - 1]] for label in link["overlaps"]]
+        if link["continues"] is not None:
+            track = prev_tracks[prev_ids[link["continues"] - 1]]
+        else:
+            track = {
+                "track_id": f"TRK-{image_processing.new_result_id()}",
+                "plot_id": plot_id,
+                "first_detected": captured_at,
+                "first_pass_id": pass_id,
+                "parents": [t["track_id"] for t in related],
+                "history": [],
+            }
+        # A region that split off from, or absorbed, older regions dates from the oldest of them
+        track["first_detected"] = min([track["first_detected"]] + [t["first_detected"] for t in related])
+        track.update({
+            "status": "active",
+            "last_detected": captured_at,
+            "type": dev["type"],
+            "severity": dev["severity"],
+            "area_pixels": dev["area_pixels"],
+            "area_sqm": dev.get("area_sqm"),
+        })
+        track["history"].append({
+            "pass_id": pass_id, "captured_at": captured_at, "result_id": results["result_id"],
+            "deviation_id": dev["id"], "type": dev["type"], "severity": dev["severity"],
+            "area_pixels": dev["area_pixels"], "area_sqm": dev.get("area_sqm"),
+        })
+        changed[track["track_id"]] = track
+        pass_tracks.append(track)
+        for other in related:
+            if other["track_id"] not in continued and other["track_id"] not in changed:
+                changed[other["track_id"]] = other
+                other.update({"status": "merged", "merged_into": track["track_id"]})
+
+    # Tracks of the previous pass with no overlapping deviation have disappeared
+    for track_id in prev_ids:
+        if track_id not in changed and track_id in prev_tracks:
+            changed[track_id] = prev_tracks[track_id]
+            prev_tracks[track_id].update({"status": "resolved", "resolved_at": captured_at})
+
+    summary = results["summary"]
+    monitoring_pass = {
+        "pass_id": pass_id,
+        "plot_id": plot_id,
+        "captured_at": captured_at,
+        "reference_id": baseline["reference_id"],
+        "result_id": results["result_id"],
+        "previous_pass_id": previous["pass_id"] if previous else None,
+        "summary": {
+            "changed_area_pixels": summary["changed_area_pixels"],
+            "changed_area_sqm": summary.get("changed_area_sqm"),
+            "change_percentage": summary["change_percentage"],
+            "total_deviations": summary["total_deviations"],
+            "risk_level": summary["risk_level"],
+            **timeseries.change_turnover(prev_mask, mask, sources["scale"]),
+        },
+        "tracks": [t["track_id"] for t in pass_tracks],
+        "new_tracks": sum(1 for t in pass_tracks if t["first_pass_id"] == pass_id),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+    }
+    store.save_pass(monitoring_pass, list(changed.values()), image_path=image["path"],
+                    labels=timeseries.encode_labels(labels))
+    return monitoring_pass, {dev["id"]: track for dev, track in zip(deviations, pass_tracks)}
+
+
+@app.post("/api/plots/{plot_id}/passes", status_code=201)
+async def add_monitoring_pass(
+    plot_id: str,
+    current: UploadFile = File(..., description="Current satellite/drone image of the plot (JPG/PNG/GeoTIFF/JP2)"),
+    captured_at: str = Form(None, description="Capture date of the image (ISO 8601, UTC unless an offset is given; default: now)"),
+    mode: str = Form(None, description="Detection mode: full, or pyramid for coarse-to-fine detection"),
+):
+    """
+    Add an image to a plot's time series. It is compared against the plot's
+    accepted baseline only, and its deviations are linked to the previous
+    pass to carry their first-detected dates forward.
+    """
+    _plot_or_404(plot_id)
+    captured_at = _parse_captured_at(captured_at)
+    baseline = _plot_baseline(plot_id)
+    if baseline is None:
+        raise HTTPException(status_code=409, detail="Plot has no baseline; register a reference map for it first")
+
+    spooled = await _spool_upload(current)
+    try:
+        async with _plot_locks[plot_id]:
+            latest = store.latest_pass(plot_id)
+            if latest is not None and captured_at <= latest["captured_at"]:
+                raise HTTPException(
+                    status_code=409, detail=f"Passes must be added in capture order; latest is {latest['captured_at']}",
+                )
+            job_id, task, _ = await _start_analysis(None, spooled, plot_id, baseline["reference_id"], None, mode)
+            results = await task if task is not None else store.get_analysis(job_id)
+            if results is None:
+                job = job_manager.get(job_id)
+                raise HTTPException(status_code=job["error_status"], detail=job["error"])
+            monitoring_pass, tracks = await asyncio.to_thread(
+                _record_pass, plot_id, captured_at, baseline, results, spooled,
+            )
+    finally:
+        ingest.discard(spooled)
+
+    for dev in results["deviations"]:
+        dev["track_id"] = tracks[dev["id"]]["track_id"]
+        dev["first_detected"] = tracks[dev["id"]]["first_detected"]
+    return {"pass": monitoring_pass, "baseline": baseline, "analysis": results}
+
+
+@app.get("/api/plots/{plot_id}/baseline")
+async def get_plot_baseline(plot_id: str):
+    _plot_or_404(plot_id)
+    baseline = _plot_baseline(plot_id)
+    if baseline is None:
+        raise HTTPException(status_code=404, detail="Plot has no baseline")
+    return baseline
+
+
+@app.put("/api/plots/{plot_id}/baseline")
+async def accept_plot_baseline(
+    plot_id: str,
+    reference_id: str = Form(None, description="Registered reference map to use as the baseline"),
+    pass_id: str = Form(None, description="Monitoring pass whose image becomes the baseline"),
+):
+    """
+    Accept a new baseline for a plot. Deviations still open are marked
+    accepted, and later passes are compared against the new baseline.
+    """
+    _plot_or_404(plot_id)
+    if (reference_id is None) == (pass_id is None):
+        raise HTTPException(status_code=400, detail="Provide either a reference_id or a pass_id")
+
+    if pass_id is not None:
+        monitoring_pass = store.get_pass(pass_id)
+        if monitoring_pass is None or monitoring_pass["plot_id"] != plot_id:
+            raise HTTPException(status_code=404, detail=f"Monitoring pass not found: {pass_id}")
+        previous = store.get_reference(monitoring_pass["reference_id"]) or {}
+        reference, _ = await _register_reference_file(
+            store.get_pass_blob_path(pass_id, "image"), monitoring_pass["image_digest"], pass_id,
+            f"{plot_id} baseline ({monitoring_pass['captured_at'][:10]})", plot_id, previous.get("geotransform"),
+        )
+        reference_id = reference["reference_id"]
+    else:
+        _registered_reference(reference_id)
+
+    baseline = {
+        "plot_id": plot_id,
+        "reference_id": reference_id,
+        "accepted_at": datetime.now(timezone.utc).isoformat(),
+        "source_pass_id": pass_id,
+    }
+    if not await asyncio.to_thread(store.set_baseline, baseline):
+        raise HTTPException(status_code=404, detail=f"Reference map not found: {reference_id}")
+    return baseline
+
+
+@app.get("/api/plots/{plot_id}/trend")
+async def get_plot_trend(plot_id: str):
+    """Changed area over time for a plot, with growth rates since its current baseline."""
+    _plot_or_404(plot_id)
+    baseline = _plot_baseline(plot_id)
+    points = [_pass_point(p) for p in store.list_passes(plot_id)]
+    current = [p for p in points if baseline is not None and p["reference_id"] == baseline["reference_id"]]
+    tracks = store.list_tracks(plot_id, status="active")
+    return {
+        "plot_id": plot_id,
+        "baseline": baseline,
+        "points": points,
+        "statistics": timeseries.trend_statistics(current),
+        "active_deviations": len(tracks),
+        "earliest_active_detection": tracks[0]["first_detected"] if tracks else None,
+        "deviations_url": f"/api/plots/{plot_id}/deviations",
+    }
+
+
+@app.get("/api/plots/{plot_id}/deviations")
+async def get_plot_deviations(plot_id: str, status: str = None):
+    """
+    Deviation tracks of a plot with their first- and last-detected dates and
+    area history. `status` filters by active, merged, resolved or accepted.
+    """
+    _plot_or_404(plot_id)
+    tracks = store.list_tracks(plot_id, status=status)
+    return {"plot_id": plot_id, "deviations": tracks, "total": len(tracks)}
+
+
+@app.get("/api/system/pool")
+async def get_pool_stats():
+    """Analysis worker pool utilisation."""
+    return analysis_pool.stats()
+
+
+@app.get("/api/system/caches")
+async def get_cache_stats():
+    """Hit/miss counters and sizes of the in-process caches."""
+    return {"render": render_cache.stats(), "results": result_cache.stats(), "map": plot_map.tiles.stats()}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request, stage and report latency histograms plus pool, store and cache gauges (Prometheus text format)."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/analyses")
+async def list_analyses(limit: int = 50, offset: int = 0, since: str = None, until: str = None,
+                        risk_level: str = None, plot_id: str = None):
+    """Analysis history, newest first. `since`/`until` are ISO timestamps (UTC unless they carry an offset)."""
+    limit = max(1, min(limit, 500))
+    since = _parse_timestamp(since, "since") if since else None
+    until = _parse_timestamp(until, "until") if until else None
+    summaries, total = store.list_analyses(
+        limit=limit, offset=max(0, offset), since=since, until=until, risk_level=risk_level, plot_id=plot_id
+    )
+    return {"analyses": summaries, "total": total, "limit": limit, "offset": offset}
 
 
 @app.get("/api/analyses/{result_id}")
 async def get_analysis(result_id: str):
-    if result_id not in analyses_store:
+    """Completed analysis result, or the job status while it is still running."""
+    analysis = store.get_analysis(result_id)
+    if analysis is not None:
+        return analysis
+    job = job_manager.get(result_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Analysis not found")
-    return analyses_store[result_id]
+    return JSONResponse(content=job_manager.view(job), status_code=200 if job["status"] == "failed" else 202)
+
+
+@app.get("/api/analyses/{result_id}/profile")
+async def get_analysis_profile(result_id: str):
+    """
+    Sampling profile of an analysis submitted with profile=true, as collapsed
+    stacks: render with flamegraph.pl, or open in speedscope or inferno.
+    """
+    path = os.path.join(PROFILE_DIR, f"{os.path.basename(result_id)}.folded")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No profile recorded for this analysis")
+    return FileResponse(path, media_type="text/plain", filename=f"LandWatch_{result_id}.folded")
+
+
+@app.get("/api/analyses/{result_id}/events")
+async def stream_analysis_events(result_id: str):
+    """Server-Sent Events stream of stage changes, early deviations and the final outcome."""
+    if job_manager.get(result_id) is None:
+        analysis = store.get_analysis(result_id)
+        if analysis is None:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        done = json.dumps({"result_id": result_id, "summary": analysis["summary"]})
+        return StreamingResponse(iter([f"event: completed\ndata: {done}\n\n"]), media_type="text/event-stream")
+
+    return StreamingResponse(
+        job_manager.stream(result_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@app.get("/api/analyses/{result_id}/images/{kind}")
+async def get_analysis_image(result_id: str, kind: str, request: Request, format: str = None):
+    """Render (or serve from cache) one visualization of an analysis as a binary image."""
+    kinds, formats = image_processing.RENDER_KINDS, image_processing.RENDER_FORMATS
+    if kind not in kinds:
+        raise HTTPException(status_code=404, detail=f"Unknown image kind. Available: {', '.join(kinds)}")
+    if not store.has_analysis(result_id):
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if format is None:
+        format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    if format not in formats:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Available: {', '.join(formats)}")
+
+    etag = f'"{result_id}-{kind}-{format}-v{RENDER_VERSION}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400", "Vary": "Accept"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (result_id, kind, format)
+    data = render_cache.get(key)
+    if data is None:
+        sources = store.get_render_sources(result_id)
+        if sources is None:
+            raise HTTPException(status_code=404, detail="No imagery stored for this analysis")
+        data = await asyncio.to_thread(image_processing.render_visualization, kind, sources, format)
+        render_cache.put(key, data)
+    return Response(content=data, media_type=formats[format][2], headers=headers)
+
+
+def _byte_range(header: str, size: int):
+    """
+    (first, last) byte of a single "bytes=" range, or None to serve the whole
+    file; an unsatisfiable range comes back with first >= size.
+    """
+    unit, _, spec = header.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or not sep or not (first + last).isdigit():
+        return None
+    if not first:  # suffix range: the last N bytes
+        return (max(0, size - int(last)), size - 1) if int(last) else (size, size)
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def _file_response(request: Request, path: str, media_type: str, etag: str, headers: dict) -> Response:
+    """Serve a file with conditional GET and single byte-range (If-Range by ETag) support."""
+    headers = {**headers, "ETag": etag, "Accept-Ranges": "bytes"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    size = os.path.getsize(path)
+    header = request.headers.get("range")
+    byte_range = _byte_range(header, size) if header and request.headers.get("if-range", etag) == etag else None
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    first, last = byte_range
+    if first >= size:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    def read():
+        with open(path, "rb") as f:
+            f.seek(first)
+            remaining = last - first + 1
+            while remaining:
+                chunk = f.read(min(CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    headers.update({"Content-Range": f"bytes {first}-{last}/{size}", "Content-Length": str(last - first + 1)})
+    return StreamingResponse(read(), status_code=206, media_type=media_type, headers=headers)
+
+
+def _report_name() -> str:
+    """Cached reports are stored under the report layout version, so a new layout re-renders them."""
+    return f"v{report_generator.REPORT_VERSION}"
+
+
+def _render_report(result_id: str):
+    """Render and cache the PDF report of an analysis (blocking); None if the analysis is gone."""
+    analysis = store.get_analysis(result_id)
+    if analysis is None:
+        return None
+    started = time.perf_counter()
+    data = report_generator.generate_pdf_report(analysis).getvalue()
+    report_latency.observe(time.perf_counter() - started, "analysis")
+    store.save_report(result_id, _report_name(), data)
+    return store.get_report_path(result_id, _report_name())
+
+
+async def _report_file(result_id: str):
+    """(path, digest) of the analysis' cached report, rendering it first if needed. Concurrent
+    requests for the same report share one rendering."""
+    cached = store.get_report_path(result_id, _report_name())
+    if cached is not None:
+        return cached
+    task = _inflight_reports.get(result_id)
+    if task is None:
+        async def render():
+            async with _report_slots:
+                return await asyncio.to_thread(_render_report, result_id)
+
+        task = _inflight_reports[result_id] = asyncio.ensure_future(render())
+        task.add_done_callback(lambda _: _inflight_reports.pop(result_id, None))
+    return await asyncio.shield(task)
 
 
 @app.get("/api/analyses/{result_id}/report")
-async def download_report(result_id: str):
-    """Generate and download a PDF compliance report for an analysis."""
-    if result_id not in analyses_store:
+async def download_report(result_id: str, request: Request):
+    """Download the PDF compliance report of an analysis (rendered once, then served from the cache)."""
+    if not store.has_analysis(result_id):
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    report = await _report_file(result_id)
+    if report is None:
         raise HTTPException(status_code=404, detail="Analysis not found")
+    path, digest = report
+    headers = {
+        "Content-Disposition": f"attachment; filename=LandWatch_Report_{result_id}.pdf",
+        "Cache-Control": "private, no-cache",
+    }
+    return _file_response(request, path, "application/pdf", f'"report-{digest[:16]}"', headers)
+
+
+@app.get("/api/industrial-areas/{area_id}/report")
+async def download_area_report(area_id: str):
+    """
+    Consolidated PDF report of an industrial area: a cover summarising every
+    plot, then one section per plot with its latest analysis and imagery. Plot
+    sections are rendered in parallel across the worker pool and streamed out
+    in order as they are done, so the report is never held in memory whole.
+    """
+    area = next((a for a in INDUSTRIAL_AREAS if a["id"] == area_id), None)
+    if area is None:
+        raise HTTPException(status_code=404, detail="Industrial area not found")
+    plots = sorted((plot_index.get(i) for i in plot_index.by_area.get(area["name"], ())), key=lambda p: p["id"])
+    latest = {row["plot_id"]: row for row in await asyncio.to_thread(store.latest_plot_analyses)}
+    scratch = tempfile.mkdtemp(prefix="area-report-", dir=image_processing.SCRATCH_DIR)
+
+    def sections():
+        # Fetched as each section is submitted, not all up front
+        for plot in plots:
+            result_id = latest[plot["id"]]["result_id"] if plot["id"] in latest else None
+            analysis = store.get_analysis(result_id) if result_id else None
+            sources = store.get_render_sources(result_id, paths=True) if analysis else None
+            yield os.path.join(scratch, f"{plot['id']}.pdf"), plot, analysis, sources
 
-    analysis = analyses_store[result_id]
-    pdf_buffer = generate_pdf_report(analysis)
+    try:
+        rendered = analysis_pool.imap(area_report.render_plot_section, sections())
+    except PoolSaturated as e:
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise _saturated(e)
+
+    def merge(merger: area_report.PDFConcatenator, path: str) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        return merger.add(data)
+
+    async def body():
+        merger = area_report.PDFConcatenator(title=f"LandWatch - {area['name']}")
+        started = time.perf_counter()
+        try:
+            yield merger.header()
+            cover = await asyncio.to_thread(
+                area_report.render_area_cover, os.path.join(scratch, "cover.pdf"), area, plots, latest,
+            )
+            yield await asyncio.to_thread(merge, merger, cover)
+            async for outcome in rendered:
+                if isinstance(outcome, Exception):
+                    raise outcome
+                yield await asyncio.to_thread(merge, merger, outcome)
+            yield merger.finish()
+            report_latency.observe(time.perf_counter() - started, "area")
+        finally:
+            await rendered.aclose()
+            shutil.rmtree(scratch, ignore_errors=True)
 
     return StreamingResponse(
-        pdf_buffer,
+        body(),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=LandWatch_Report_{result_id}.pdf"}
+        headers={"Content-Disposition": f"attachment; filename=LandWatch_{area_id}_Report.pdf"},
     )
 
 
+# ─── EXPORTS ────────────────────────────────────────────────────────────
+
+# (column, Arrow/Parquet type) in export order
+PLOT_EXPORT_COLUMNS = [
+    ("id", "string"), ("name", "string"), ("industrial_area", "string"), ("status", "string"),
+    ("area_sqm", "double"), ("lessee", "string"), ("allotment_date", "string"), ("last_inspection", "string"),
+    ("lease_status", "string"), ("lease_amount", "double"), ("water_charges", "double"), ("dues_pending", "double"),
+    ("compliance_score", "double"), ("land_use", "string"), ("constructed_area_pct", "double"),
+]
+ALERT_EXPORT_COLUMNS = [
+    ("id", "string"), ("type", "string"), ("severity", "string"), ("plot_id", "string"), ("plot_name", "string"),
+    ("message", "string"), ("action_required", "string"), ("status", "string"), ("timestamp", "string"),
+]
+EXPORT_PAGE_SIZE = 1000
+
+
+def _iter_pages(fetch):
+    """Records of every page of `fetch(cursor) -> (records, next_cursor)`."""
+    cursor = None
+    while True:
+        records, cursor = fetch(cursor)
+        yield from records
+        if cursor is None:
+            return
+
+
+def _export_columns(columns: list, fields: str) -> list:
+    try:
+        selected = parse_fields(fields, [name for name, _ in columns])
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return columns if selected is None else [c for c in columns if c[0] in selected]
+
+
+def _export_response(records, columns: list, fmt: str, gzip: bool, filename: str) -> StreamingResponse:
+    """Stream `records` in `fmt`; nothing is buffered beyond one chunk / record batch."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Available: {', '.join(EXPORT_FORMATS)}")
+    try:
+        check_format(fmt)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[fmt]
+    if fmt == "csv":
+        body = csv_stream([name for name, _ in columns], records)
+    elif fmt == "arrow":
+        body = arrow_stream(columns, records)
+    else:
+        body = parquet_stream(columns, records, image_processing.SCRATCH_DIR)
+    filename = f"{filename}.{extension}"
+    if gzip and fmt != "parquet":  # Parquet pages are already compressed
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
 @app.get("/api/export/plots")
-async def export_plots_csv():
-    """Export all plot data as CSV."""
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        "id", "name", "industrial_area", "status", "area_sqm", "lessee",
-        "allotment_date", "last_inspection", "lease_status", "lease_amount",
-        "water_charges", "dues_pending", "compliance_score", "land_use",
-        "constructed_area_pct"
-    ])
-    writer.writeheader()
-    for plot in DEMO_PLOTS:
-        row = {k: plot.get(k, "") for k in writer.fieldnames}
-        writer.writerow(row)
+async def export_plots(area: str = None, status: str = None, compliant: bool = None, has_dues: bool = None,
+                       q: str = None, sort: str = "id", order: str = "asc", fields: str = None,
+                       format: str = "csv", gzip: bool = False):
+    """Export plot data (CSV, Arrow or Parquet). Takes the filters of /api/plots."""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    columns = _export_columns(PLOT_EXPORT_COLUMNS, fields)
+    filters = dict(areas=_area_names(_csv_param(area)), statuses=_csv_param(status), compliant=compliant,
+                   has_dues=has_dues, q=q, sort=sort, descending=order == "desc")
+    try:
+        plot_index.query(limit=1, **filters)  # validate before the response starts
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    output.seek(0)
-    return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=CSIDC_Plot_Registry.csv"}
-    )
+    def fetch(cursor):
+        plots, next_cursor, _ = plot_index.query(cursor=cursor, limit=EXPORT_PAGE_SIZE, **filters)
+        return plots, next_cursor
+    return _export_response(_iter_pages(fetch), columns, format, gzip, "CSIDC_Plot_Registry")
 
 
 @app.get("/api/export/alerts")
-async def export_alerts_csv():
-    """Export alerts as CSV."""
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=[
-        "id", "type", "severity", "plot_id", "plot_name", "message",
-        "action_required", "status", "timestamp"
-    ])
-    writer.writeheader()
-    for alert in alerts_store:
-        writer.writerow(alert)
-
-    output.seek(0)
-    return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=CSIDC_Alerts.csv"}
-    )
+async def export_alerts(severity: str = None, status: str = None, plot_id: str = None, sort: str = "severity",
+                        fields: str = None, format: str = "csv", gzip: bool = False):
+    """Export alerts (CSV, Arrow or Parquet). Takes the filters of /api/alerts."""
+    if sort not in ALERT_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort. Available: {', '.join(ALERT_SORTS)}")
+    columns = _export_columns(ALERT_EXPORT_COLUMNS, fields)
+    filters = dict(severities=_csv_param(severity), statuses=_csv_param(status), plot_id=plot_id, sort=sort)
+
+    def fetch(after):
+        alerts, last, _ = store.query_alerts(after=after, limit=EXPORT_PAGE_SIZE, with_total=False, **filters)
+        return alerts, last
+    return _export_response(_iter_pages(fetch), columns, format, gzip, "CSIDC_Alerts")
+
+
+@app.on_event("shutdown")
+async def shutdown_pool():
+    analysis_pool.shutdown()
 
 
 def generate_recommendations(results):
@@ -385,11 +1786,15 @@ def generate_recommendations(results):
             "reason": f"{summary['change_percentage']}% change detected — base map may be outdated"
         })
 
-    recs.append({
+    review = {
         "priority": "Low",
         "action": "Schedule next satellite monitoring review in 30 days",
         "reason": "Continue periodic monitoring to track deviation trends"
-    })
+    }
+    plot_id = results.get("metadata", {}).get("plot_id")
+    if plot_id:
+        review["trend_url"] = f"/api/plots/{plot_id}/trend"
+    recs.append(review)
 
     return recs
 
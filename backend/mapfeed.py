@@ -0,0 +1,191 @@
+"""
+LandWatch - Map Feed
+Viewport-bounded, clustered GeoJSON for the plot map. Plot `coordinates` are
+projected to Web Mercator and held in a GridIndex; a viewport is answered as
+the slippy-map tiles (z/x/y) covering it. Below CLUSTER_MAX_ZOOM the plots of
+a tile are grouped into CLUSTER_GRID x CLUSTER_GRID cells, each reported as one
+cluster with its plot count and worst status. Cells never straddle a tile, so
+the features of a tile depend on that tile alone: each is encoded once,
+cached under its tile key and only re-encoded when a plot inside it changes.
+"""
+import hashlib
+import json
+import math
+import os
+
+from cache import LRUCache
+from geo import GridIndex
+
+MAX_ZOOM = 22
+CLUSTER_MAX_ZOOM = int(os.environ.get("LANDWATCH_MAP_CLUSTER_MAX_ZOOM", 15))  # from here on, one feature per plot
+CLUSTER_GRID = 4  # cluster cells per tile side: 64 px clusters on 256 px tiles
+BOUNDARY_MIN_ZOOM = 14  # plot features carry their boundary polygon from this zoom on
+MAX_TILES = 256  # per viewport request
+INDEX_ZOOM = 12  # spatial index cells are tiles of this zoom
+TILE_CACHE_ENTRIES = int(os.environ.get("LANDWATCH_MAP_TILE_CACHE", 4096))
+MAX_LAT = 85.05112878  # Web Mercator limit
+
+PLOT_PROPERTIES = ("id", "name", "status", "industrial_area", "lessee", "area_sqm", "compliance_score",
+                   "dues_pending")
+# Worst first: a cluster reports the worst status among its plots
+STATUS_SEVERITY = ("Encroachment Detected", "Unauthorized Construction", "Non-Compliant Construction",
+                   "Boundary Deviation", "Vacant/Unused", "Partial Construction", "Compliant")
+_STATUS_RANK = {status: rank for rank, status in enumerate(STATUS_SEVERITY)}
+
+
+def status_rank(status: str) -> float:
+    """Unknown statuses rank just above Compliant."""
+    return _STATUS_RANK.get(status, len(STATUS_SEVERITY) - 1.5)
+
+
+def project(lat: float, lon: float) -> tuple:
+    """Web Mercator position of a point, as fractions of the world (x east, y south)."""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    return (lon + 180) / 360, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+def unproject(x: float, y: float) -> tuple:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y)))), x * 360 - 180
+
+
+def parse_bbox(value: str) -> tuple:
+    """"west,south,east,north" in degrees. Raises ValueError."""
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be west,south,east,north in degrees")
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise ValueError("bbox must satisfy -180 <= west < east <= 180 and -90 <= south < north <= 90")
+    return west, south, east, north
+
+
+def tiles_for_bbox(bbox: tuple, zoom: int, limit: int = MAX_TILES) -> list:
+    """(x, y) of the tiles at `zoom` covering `bbox`. Raises ValueError beyond `limit` tiles."""
+    west, south, east, north = bbox
+    n = 2 ** zoom
+    x0, y0 = project(north, west)
+    x1, y1 = project(south, east)
+    xs = range(int(x0 * n), min(n - 1, int(x1 * n)) + 1)
+    ys = range(int(y0 * n), min(n - 1, int(y1 * n)) + 1)
+    if len(xs) * len(ys) > limit:
+        raise ValueError(f"bbox covers {len(xs) * len(ys)} tiles at zoom {zoom} (max {limit})")
+    return [(x, y) for y in ys for x in xs]
+
+
+def _point(lat: float, lon: float) -> dict:
+    return {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]}
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class PlotMap:
+    """
+    The plot registry as map features. `update` keeps it in step with
+    registry changes, dropping the cached tiles that held the plot.
+    """
+
+    def __init__(self, plots: list):
+        self.index = GridIndex(cell=1 / 2 ** INDEX_ZOOM)
+        self.entries = {}  # plot_id -> {"x", "y", "plot"}
+        # (z, x, y) -> (encoded features, count of plots, ETag); sized by encoded bytes
+        self.tiles = LRUCache(max_entries=TILE_CACHE_ENTRIES, max_bytes=256 * 1024 * 1024,
+                              sizeof=lambda tile: len(tile[0]))
+        for plot in plots:
+            self.update(plot)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, plot: dict):
+        """Insert a plot or replace one whose fields changed."""
+        entry = self.entries.get(plot["id"])
+        x, y = project(*plot["coordinates"])
+        if entry is not None and (entry["x"], entry["y"]) != (x, y):
+            self._invalidate(entry)
+            self.index.remove((entry["x"], entry["y"], entry["x"], entry["y"]), entry)
+            entry = None
+        if entry is None:
+            entry = self.entries[plot["id"]] = {"x": x, "y": y}
+            self.index.insert((x, y, x, y), entry)
+        entry["plot"] = plot
+        self._invalidate(entry)
+
+    def _invalidate(self, entry: dict):
+        for z in range(MAX_ZOOM + 1):
+            n = 2 ** z
+            self.tiles.discard((z, int(entry["x"] * n), int(entry["y"] * n)))
+
+    # ── Features ──
+
+    def _plot_feature(self, plot: dict, z: int) -> dict:
+        properties = {field: plot.get(field) for field in PLOT_PROPERTIES}
+        if z >= BOUNDARY_MIN_ZOOM and plot.get("boundary"):
+            properties["boundary"] = plot["boundary"]
+        return {"type": "Feature", "geometry": _point(*plot["coordinates"]), "properties": properties}
+
+    def _cluster_feature(self, key: str, plots: list) -> dict:
+        lats = [p["coordinates"][0] for p in plots]
+        lons = [p["coordinates"][1] for p in plots]
+        statuses = {}
+        for plot in plots:
+            statuses[plot["status"]] = statuses.get(plot["status"], 0) + 1
+        return {
+            "type": "Feature",
+            "geometry": _point(sum(lats) / len(lats), sum(lons) / len(lons)),
+            "properties": {
+                "cluster": True,
+                "cluster_id": key,
+                "count": len(plots),
+                "status": min(statuses, key=status_rank),
+                "status_counts": statuses,
+                "bbox": [min(lons), min(lats), max(lons), max(lats)],
+            },
+        }
+
+    def _build_tile(self, z: int, x: int, y: int) -> tuple:
+        n = 2 ** z
+        x0, y0, x1, y1 = x / n, y / n, (x + 1) / n, (y + 1) / n
+        # Low-zoom tiles span more index cells than there are plots; scanning them all is cheaper
+        cells_spanned = (2 ** INDEX_ZOOM / n) ** 2
+        candidates = self.index.query((x0, y0, x1, y1)) if cells_spanned <= len(self.entries) else self.entries.values()
+        # Half-open bounds, so a plot on a tile edge belongs to exactly one tile
+        inside = [e for e in candidates if x0 <= e["x"] < x1 and y0 <= e["y"] < y1]
+        inside.sort(key=lambda e: e["plot"]["id"])
+        if z >= CLUSTER_MAX_ZOOM:
+            features = [self._plot_feature(e["plot"], z) for e in inside]
+        else:
+            cells = {}
+            cn = n * CLUSTER_GRID
+            for e in inside:
+                cells.setdefault((int(e["x"] * cn), int(e["y"] * cn)), []).append(e["plot"])
+            features = [
+                self._plot_feature(plots[0], z) if len(plots) == 1
+                else self._cluster_feature(f"{z}/{cx}/{cy}", plots)
+                for (cx, cy), plots in sorted(cells.items())
+            ]
+        encoded = ",".join(_dumps(f) for f in features).encode()
+        return encoded, len(inside), hashlib.sha1(encoded).hexdigest()[:16]
+
+    def tile(self, z: int, x: int, y: int) -> tuple:
+        """(comma-separated encoded features, plots inside, ETag) of one tile."""
+        key = (z, x, y)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self._build_tile(z, x, y)
+            self.tiles.put(key, tile)
+        return tile
+
+    def feature_collection(self, tiles: list, zoom: int) -> tuple:
+        """
+        (GeoJSON FeatureCollection of the `tiles` at `zoom` as bytes, ETag).
+        Assembled from the cached per-tile encodings without re-serializing.
+        """
+        parts = [self.tile(zoom, x, y) for x, y in tiles]
+        etag = hashlib.sha1("".join(p[2] for p in parts).encode()).hexdigest()[:16]
+        features = b",".join(p[0] for p in parts if p[0])
+        head = _dumps({"type": "FeatureCollection", "zoom": zoom, "clustered": zoom < CLUSTER_MAX_ZOOM,
+                       "tiles": len(parts), "plots": sum(p[1] for p in parts)})
+        return head[:-1].encode() + b',"features":[' + features + b"]}", f'"map-{zoom}-{etag}"'
@@ -0,0 +1,121 @@
+"""
+LandWatch - Compact Masks
+Run-length encoded binary masks. A RunMask keeps only the boundaries of its
+runs of set pixels (row-major), so a change mask costs a few bytes per run
+instead of one byte per pixel, and union, intersection, difference and area
+are computed on the runs without ever expanding them back to pixels.
+
+Serialized form: MAGIC, height and width (uint32, little endian), then the
+zlib-compressed alternating gap/run lengths as little-endian uint32.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b"LWM1"
+_HEADER = struct.Struct("<4sII")
+
+
+class RunMask:
+    """
+    A binary mask of `shape` as sorted [start, end) runs of flat pixel indices,
+    held as one array of boundaries (start0, end0, start1, end1, ...).
+    """
+
+    __slots__ = ("shape", "bounds")
+
+    def __init__(self, shape: tuple, bounds: np.ndarray):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.bounds = bounds
+
+    @classmethod
+    def from_array(cls, mask: np.ndarray) -> "RunMask":
+        """Runs of the non-zero pixels of a 2-D array."""
+        flat = np.ravel(mask) != 0
+        edges = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        if flat.size and flat[0]:
+            edges = np.concatenate(([0], edges))
+        if flat.size and flat[-1]:
+            edges = np.concatenate((edges, [flat.size]))
+        return cls(mask.shape[:2], edges.astype(np.int64))
+
+    def to_array(self) -> np.ndarray:
+        """The mask as a uint8 array with set pixels at 255 (like a thresholded image)."""
+        h, w = self.shape
+        steps = np.zeros(h * w + 1, dtype=np.int8)
+        steps[self.bounds[0::2]] = 1
+        steps[self.bounds[1::2]] = -1
+        return (np.cumsum(steps[:-1], dtype=np.int8).view(np.uint8) * 255).reshape(h, w)
+
+    # ── Serialization ──
+
+    def encode(self) -> bytes:
+        lengths = np.diff(self.bounds, prepend=0).astype("<u4")
+        return _HEADER.pack(MAGIC, *self.shape) + zlib.compress(lengths.tobytes(), 6)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "RunMask":
+        magic, h, w = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a run-length mask")
+        lengths = np.frombuffer(zlib.decompress(data[_HEADER.size:]), dtype="<u4")
+        return cls((h, w), np.cumsum(lengths, dtype=np.int64))
+
+    # ── Measures ──
+
+    @property
+    def area(self) -> int:
+        """Number of set pixels."""
+        return int((self.bounds[1::2] - self.bounds[0::2]).sum())
+
+    @property
+    def runs(self) -> int:
+        return len(self.bounds) // 2
+
+    @property
+    def nbytes(self) -> int:
+        return self.bounds.nbytes
+
+    # ── Set operations ──
+
+    def _combine(self, other: "RunMask", op) -> "RunMask":
+        """
+        Sweep the boundaries of both masks in order: `op(in_self, in_other)`
+        decides, between consecutive boundaries, whether the result is set.
+        """
+        if self.shape != other.shape:
+            raise ValueError(f"Mask shapes differ: {self.shape} vs {other.shape}")
+        positions, index = np.unique(np.concatenate((self.bounds, other.bounds)), return_inverse=True)
+        n = len(self.bounds)
+        steps = np.resize(np.array([1, -1], dtype=np.int64), n + len(other.bounds))
+        inside_self = np.cumsum(np.bincount(index[:n], steps[:n], len(positions))) > 0
+        inside_other = np.cumsum(np.bincount(index[n:], steps[n:], len(positions))) > 0
+        inside = op(inside_self, inside_other)
+        toggles = inside != np.concatenate(([False], inside[:-1]))
+        return RunMask(self.shape, positions[toggles])
+
+    def union(self, other: "RunMask") -> "RunMask":
+        return self._combine(other, np.logical_or)
+
+    def intersection(self, other: "RunMask") -> "RunMask":
+        return self._combine(other, np.logical_and)
+
+    def difference(self, other: "RunMask") -> "RunMask":
+        """Pixels set here but not in `other`."""
+        return self._combine(other, lambda a, b: a & ~b)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def iou(self, other: "RunMask") -> float:
+        """Intersection over union; 0 when both masks are empty."""
+        union = self.union(other).area
+        return self.intersection(other).area / union if union else 0.0
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RunMask) and self.shape == other.shape and np.array_equal(self.bounds, other.bounds)
+
+    def __repr__(self) -> str:
+        return f"RunMask(shape={self.shape}, runs={self.runs}, area={self.area})"
@@ -0,0 +1,249 @@
+"""
+LandWatch - Metrics & Profiling
+Latency histograms, counters and gauges rendered in the Prometheus text
+exposition format (served at /metrics), a StageTimer that turns pipeline
+progress events into per-stage durations, and a sampling profiler that
+records the collapsed stacks of one analysis as flame graph input.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Seconds; covers everything from a cached API response to a gigapixel analysis
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+MEGAPIXEL_BUCKETS = (0.25, 1, 4, 16, 64, 256, 1024)
+
+PROFILE_INTERVAL_MS = float(os.environ.get("LANDWATCH_PROFILE_INTERVAL_MS", 5))
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _quoted(value) -> str:
+    return '"%s"' % (f"{value:g}" if isinstance(value, (int, float)) else value)
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination. Safe to call from worker threads."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> list:
+        lines = []
+        with self._lock:
+            series = sorted((values, list(data)) for values, data in self._series.items())
+        for values, data in series:
+            for bound, count in zip(self.buckets, data):
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, 'le=%s' % _quoted(bound))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, values, 'le=%s' % _quoted('+Inf'))} {data[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, values)} {_number(data[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, values)} {data[-1]}")
+        return lines
+
+
+class CounterMetric:
+    """Monotonic counter per label combination. Safe to call from worker threads."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def samples(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class Collected:
+    """
+    A gauge (or counter) read from application state at scrape time: `collect`
+    returns a number, or {label values: number} when `labels` are given.
+    """
+
+    def __init__(self, name: str, help: str, collect, labels: tuple = (), kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labels = tuple(labels)
+        self.kind = kind
+
+    def samples(self) -> list:
+        values = self.collect()
+        if not self.labels:
+            return [f"{self.name} {_number(values)}"]
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """The metrics of one process, in registration order."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> CounterMetric:
+        return self._register(CounterMetric(name, help, labels))
+
+    def gauge(self, name: str, help: str, collect, labels: tuple = (), kind: str = "gauge") -> Collected:
+        return self._register(Collected(name, help, collect, labels, kind))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware observing the latency of every HTTP request (until its last
+    byte is sent, so streamed responses count in full) into `histogram`,
+    labelled by method, route template (`route_of(scope)`) and status code.
+    """
+
+    def __init__(self, app, histogram: Histogram, route_of):
+        self.app = app
+        self.histogram = histogram
+        self.route_of = route_of
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.histogram.observe(time.perf_counter() - started, scope["method"], self.route_of(scope), status[0])
+
+
+# ─── PIPELINE STAGES ───────────────────────────────────────────────────
+
+class StageTimer:
+    """
+    Progress callback (see compute_difference) recording when each stage
+    starts; a stage lasts until the next one begins. Events are forwarded to
+    `forward` when given.
+    """
+
+    def __init__(self, forward=None):
+        self.forward = forward
+        self.started = time.perf_counter()
+        self.marks = []
+
+    def __call__(self, stage, **data):
+        if not self.marks or self.marks[-1][0] != stage:
+            self.marks.append((stage, time.perf_counter()))
+        if self.forward is not None:
+            self.forward(stage, **data)
+
+    def durations(self) -> dict:
+        """Milliseconds per stage so far (a stage entered twice is summed), plus "total"."""
+        ended = time.perf_counter()
+        durations = {}
+        for (stage, at), (_, until) in zip(self.marks, self.marks[1:] + [(None, ended)]):
+            durations[stage] = durations.get(stage, 0.0) + (until - at) * 1000
+        durations["total"] = (ended - self.started) * 1000
+        return durations
+
+
+# ─── PROFILING ─────────────────────────────────────────────────────────
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of one thread (the calling thread by default)
+    every `interval_ms` from a background thread, for use as a context
+    manager; stacks start at the function that entered it. `collapsed()`
+    returns the sampled stacks in the folded format read by flamegraph.pl,
+    speedscope and inferno: "outer;...;inner count" per line. Time spent in
+    native code (OpenCV, NumPy) is attributed to its caller.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS, thread_id: int = None):
+        self.interval = interval_ms / 1000
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._root = None
+
+    def __enter__(self):
+        self.thread_id = self.thread_id or threading.get_ident()
+        self._root = sys._getframe(1) if self.thread_id == threading.get_ident() else None
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back if frame is not self._root else None
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
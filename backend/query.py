@@ -0,0 +1,201 @@
+"""
+LandWatch - Query Layer
+Indexed lookups, server-side filtering/sorting, cursor pagination and field
+projection for the plot registry (held in memory) and the alert list (held in
+the store; see AnalysisStore.query_alerts).
+
+Cursors are opaque, URL-safe tokens carrying the sort key of the last row of
+the previous page, so a page costs the same however deep into the listing it
+is and rows added or removed meanwhile do not shift later pages.
+"""
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+PLOT_SORT_FIELDS = ("id", "name", "status", "compliance_score", "dues_pending", "area_sqm", "last_inspection")
+# Below this share of the registry, a filtered result is sorted directly
+# instead of walking the pre-sorted order looking for matches
+DIRECT_SORT_FRACTION = 1 / 32
+
+
+class InvalidQuery(ValueError):
+    """Raised for an unknown field, sort key or a malformed cursor."""
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise InvalidQuery("Malformed cursor")
+    if not isinstance(values, list):
+        raise InvalidQuery("Malformed cursor")
+    return values
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def parse_fields(value: str, allowed) -> list:
+    """Comma-separated projection list, validated against `allowed` (None = no projection)."""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise InvalidQuery(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+
+def project(record: dict, fields: list) -> dict:
+    if fields is None:
+        return record
+    return {f: record[f] for f in fields if f in record}
+
+
+def _union(sets: list) -> set:
+    return sets[0] if len(sets) == 1 else set().union(*sets)
+
+
+class PlotIndex:
+    """
+    In-memory plot registry with id, area, status and dues indexes and one
+    pre-sorted (key, id) order per sortable field.
+    """
+
+    def __init__(self, plots: list):
+        self.by_id = {}
+        self.by_area = {}
+        self.by_status = {}
+        self.with_dues = set()
+        self.orders = {field: [] for field in PLOT_SORT_FIELDS}
+        self._search = {}
+        self.fields = set()  # every key some plot has, i.e. what can be projected
+        for plot in plots:
+            self._add(plot)
+        for order in self.orders.values():
+            order.sort()
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, plot_id: str):
+        return self.by_id.get(plot_id)
+
+    def _add(self, plot: dict, keep_sorted: bool = False):
+        plot_id = plot["id"]
+        self.by_id[plot_id] = plot
+        self.fields.update(plot)
+        self.by_area.setdefault(plot["industrial_area"], set()).add(plot_id)
+        self.by_status.setdefault(plot["status"], set()).add(plot_id)
+        if plot["dues_pending"] > 0:
+            self.with_dues.add(plot_id)
+        self._search[plot_id] = " ".join((plot_id, plot["name"], plot.get("lessee") or "")).lower()
+        for field, order in self.orders.items():
+            entry = (plot[field], plot_id)
+            if keep_sorted:
+                insort(order, entry)
+            else:
+                order.append(entry)
+
+    def _remove(self, plot_id: str):
+        plot = self.by_id.pop(plot_id)
+        self.by_area[plot["industrial_area"]].discard(plot_id)
+        self.by_status[plot["status"]].discard(plot_id)
+        self.with_dues.discard(plot_id)
+        del self._search[plot_id]
+        for field, order in self.orders.items():
+            del order[bisect_left(order, (plot[field], plot_id))]
+
+    def update(self, plot: dict):
+        """Insert a plot or re-index one whose fields changed."""
+        if plot["id"] in self.by_id:
+            self._remove(plot["id"])
+        self._add(plot, keep_sorted=True)
+
+    def _filters(self, areas, statuses, compliant, has_dues) -> tuple:
+        """
+        (ids matching the positive filters or None when there are none, sets
+        of ids to exclude). Negated filters stay exclusions so that nothing
+        proportional to the registry size is materialised.
+        """
+        include, exclude = [], []
+        if areas:
+            include.append(_union([self.by_area.get(a, set()) for a in areas]))
+        if statuses:
+            include.append(_union([self.by_status.get(s, set()) for s in statuses]))
+        if compliant is not None:
+            (include if compliant else exclude).append(self.by_status.get("Compliant", set()))
+        if has_dues is not None:
+            (include if has_dues else exclude).append(self.with_dues)
+        if not include:
+            return None, exclude
+        include.sort(key=len)
+        return (set.intersection(*include) if len(include) > 1 else include[0]), exclude
+
+    def query(self, areas: list = None, statuses: list = None, compliant: bool = None, has_dues: bool = None,
+              q: str = None, sort: str = "id", descending: bool = False, cursor: str = None,
+              limit: int = DEFAULT_PAGE_SIZE) -> tuple:
+        """
+        One page of plots matching every given filter, ordered by `sort` (ties by id).
+        `q` is a case-insensitive substring match on id, name and lessee.
+        Returns (plots, next_cursor or None, total matches).
+        """
+        if sort not in self.orders:
+            raise InvalidQuery(f"Cannot sort by {sort}. Available: {', '.join(PLOT_SORT_FIELDS)}")
+        after = None
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 3 or values[0] != sort:
+                raise InvalidQuery("Cursor does not belong to this sort order")
+            after = tuple(values[1:])
+        candidates, exclude = self._filters(areas, statuses, compliant, has_dues)
+        needle = q.lower() if q else None
+
+        def matches(plot_id):
+            return ((candidates is None or plot_id in candidates)
+                    and not any(plot_id in ids for ids in exclude)
+                    and (needle is None or needle in self._search[plot_id]))
+
+        if candidates is not None and len(candidates) <= len(self) * DIRECT_SORT_FRACTION:
+            order = sorted((self.by_id[i][sort], i) for i in candidates if matches(i))
+            total = len(order)
+            prefiltered = True
+        else:
+            order = self.orders[sort]
+            if needle is None and len(exclude) <= 1:
+                total = len(candidates) if candidates is not None else len(self)
+                if exclude and candidates is None:
+                    total -= len(exclude[0])
+                elif exclude:
+                    small, large = sorted((exclude[0], candidates), key=len)
+                    total -= sum(1 for i in small if i in large)
+            else:
+                total = sum(1 for i in (candidates if candidates is not None else self.by_id) if matches(i))
+            prefiltered = candidates is None and not exclude and needle is None
+
+        try:
+            if descending:
+                end = bisect_left(order, after) if after is not None else len(order)
+                walk = (order[i] for i in range(end - 1, -1, -1))
+            else:
+                start = bisect_right(order, after) if after is not None else 0
+                walk = (order[i] for i in range(start, len(order)))
+        except TypeError:
+            raise InvalidQuery("Malformed cursor")
+
+        page = []
+        for key, plot_id in walk:
+            if prefiltered or matches(plot_id):
+                page.append((key, plot_id))
+                if len(page) > limit:
+                    break
+        next_cursor = encode_cursor([sort, *page[limit - 1]]) if len(page) > limit else None
+        return [self.by_id[plot_id] for _, plot_id in page[:limit]], next_cursor, total
@@ -0,0 +1,63 @@
+"""
+LandWatch - Reference Map Registry
+On-disk layout for preprocessed reference maps. Arrays are written as raw
+.npy files and memory-mapped on load, so every worker process shares one copy
+through the OS page cache instead of decoding and blurring the map again.
+"""
+import json
+import os
+import shutil
+from functools import lru_cache
+
+import numpy as np
+
+from image_processing import prepare_reference
+
+PREPARED_ARRAYS = ("image", "gray", "blurred", "preview", "keypoints", "descriptors")
+
+
+def save_prepared_reference(prepared: dict, directory: str) -> dict:
+    """Write a prepare_reference() result to `directory`. Returns its summary."""
+    tmp = directory + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in PREPARED_ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(prepared[name]))
+    for i, level in enumerate(prepared["pyramid"]):
+        np.save(os.path.join(tmp, f"pyramid_{i}.npy"), level)
+
+    h, w = prepared["image"].shape[:2]
+    info = {
+        "width": w,
+        "height": h,
+        "pyramid_levels": len(prepared["pyramid"]),
+        "keypoints": int(len(prepared["keypoints"])),
+    }
+    with open(os.path.join(tmp, "info.json"), "w") as f:
+        json.dump(info, f)
+    # Publish atomically so readers never see a half-written reference
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+    return info
+
+
+@lru_cache(maxsize=32)
+def load_prepared_reference(directory: str) -> dict:
+    """Memory-map a saved reference. Cached per process; arrays are read-only."""
+    with open(os.path.join(directory, "info.json")) as f:
+        info = json.load(f)
+    prepared = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in PREPARED_ARRAYS}
+    prepared["pyramid"] = [
+        np.load(os.path.join(directory, f"pyramid_{i}.npy"), mmap_mode="r") for i in range(info["pyramid_levels"])
+    ]
+    return prepared
+
+
+def register_reference_image(image: np.ndarray, directory: str) -> dict:
+    """Preprocess a decoded reference map and persist it to `directory`."""
+    return save_prepared_reference(prepare_reference(image), directory)
+
+
+def delete_prepared_reference(directory: str):
+    load_prepared_reference.cache_clear()
+    shutil.rmtree(directory, ignore_errors=True)
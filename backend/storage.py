@@ -0,0 +1,1101 @@
+"""
+LandWatch - Persistent Storage
+Pluggable storage for analyses and alerts. The default backend keeps metadata
+and deviations in indexed SQLite tables (WAL mode, so several uvicorn workers
+can share one database) and image/mask blobs in a content-addressed file store.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+DATA_DIR = os.environ.get("LANDWATCH_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+RETENTION_DAYS = int(os.environ.get("LANDWATCH_RETENTION_DAYS", 5 * 365))
+MAX_ANALYSES = int(os.environ.get("LANDWATCH_MAX_ANALYSES", 0))  # 0 = unlimited
+
+# Render-source entries stored as blobs; "outlines" and "scale" are stored as one JSON blob
+BLOB_SOURCES = ("reference", "current", "diff", "mask")
+# Rendered reports are cached next to them as "report-<version>" blobs
+REPORT_PREFIX = "report-"
+
+SEVERITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+ALERT_SORTS = ("severity", "newest", "oldest")
+
+
+def _local_to_utc(value):
+    """A naive local-time ISO timestamp, as written before timestamps were stored in UTC, in UTC."""
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    return moment.astimezone(timezone.utc).isoformat()
+
+
+# (table, column, JSON column, path) of timestamps that were once written as naive local time
+LOCAL_TIMESTAMPS = (
+    ("analyses", "analyzed_at", "document", "$.metadata.analyzed_at"),
+    ("alerts", "timestamp", "data", "$.timestamp"),
+    ("reference_maps", "created_at", "data", "$.created_at"),
+    ("plot_baselines", "accepted_at", "data", "$.accepted_at"),
+)
+
+
+class BlobStore:
+    """Content-addressed file store: blobs are named by their SHA-256 digest."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:])
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def stage_file(self, src: str, chunk_size: int = 1024 * 1024) -> tuple:
+        """
+        Copy a file into the store without publishing it, hashing it on the way
+        (streamed in chunks rather than read into memory). Returns (digest,
+        staged path); commit() publishes it.
+        """
+        digest = hashlib.sha256()
+        staged = os.path.join(self.root, f"staged.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(src, "rb") as f, open(staged, "wb") as out:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        return digest.hexdigest(), staged
+
+    def commit(self, digest: str, staged: str) -> str:
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(staged, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+    def path(self, digest: str) -> str:
+        return self._path(digest)
+
+    def delete(self, digest: str):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+
+class AnalysisStore(ABC):
+    """Interface every storage backend implements."""
+
+    @abstractmethod
+    def save_analysis(self, result: dict, render_sources: dict = None, content_key: str = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_by_content_key(self, content_key: str, max_age_seconds: float = 0):
+        """Newest result id stored for `content_key` (optionally no older than max_age_seconds)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_analysis(self, result_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def has_analysis(self, result_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_render_sources(self, result_id: str, paths: bool = False):
+        """Stored render sources; with `paths`, image entries are local files instead of bytes."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_report(self, result_id: str, name: str, data: bytes):
+        """Cache a rendered report of an analysis; dropped when the analysis is saved again or deleted."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_report_path(self, result_id: str, name: str):
+        """(local file, digest) of a cached report, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_analyses(self, limit: int = 50, offset: int = 0, since: str = None, until: str = None,
+                      risk_level: str = None, plot_id: str = None) -> tuple:
+        """Return (summaries, total) newest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_analyses(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest_plot_analyses(self) -> list:
+        """
+        The newest analysis of every plot, as {result_id, plot_id, summary,
+        top_deviation: {type, severity}, recommendations: [first one]}.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_analysis(self, result_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def apply_retention(self) -> int:
+        """Evict analyses outside the retention policy. Returns the number removed."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_alerts(self) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_alerts(self, alerts: list) -> list:
+        """
+        Store raised, updated and resolved alerts; a plot has at most one open
+        alert of each type. A raised alert whose plot and type already have
+        one (raised by another process) is merged into it, and a resolve
+        closes whichever alert is open for its plot and type. Returns the
+        alerts as stored.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def open_alerts(self, plot_ids: list) -> list:
+        """Alerts of `plot_ids` that are not resolved."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_alerts(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def alert_counts(self) -> dict:
+        """Number of alerts per (severity, status)."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def version(self) -> tuple:
+        """
+        (counter, unix time) of the last write to analyses or alerts. Every
+        process sharing the store sees the same value, so it tells each one
+        when its view of either is stale.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def query_alerts(self, severities: list = None, statuses: list = None, plot_id: str = None,
+                     sort: str = "severity", after: list = None, limit: int = 100, with_total: bool = True) -> tuple:
+        """
+        One page of alerts matching the filters, in `sort` order (ALERT_SORTS;
+        "severity" is most severe first, then oldest inserted). `after` is the
+        keyset position returned with the previous page.
+        Returns (alerts, keyset of the last alert or None when no more, total
+        matches or None without `with_total`).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def reference_dir(self, reference_id: str) -> str:
+        """Directory holding the preprocessed arrays of a registered reference map."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_reference(self, reference: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_reference(self, reference_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_references(self) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_reference(self, reference_id: str) -> list:
+        """
+        Delete a reference map unless it is the accepted baseline of a plot.
+        Returns those plots; the map is only deleted when there are none.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_baseline(self, plot_id: str):
+        """The plot's currently accepted baseline ({reference_id, accepted_at, ...}) or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_baseline(self, baseline: dict):
+        """
+        Accept a new baseline; tracks still open on the plot become "accepted".
+        Returns False, storing nothing, if its reference map no longer exists.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_pass(self, monitoring_pass: dict, tracks: list, image_path: str = None, labels: bytes = None):
+        """
+        Store a monitoring pass together with the tracks it created or updated,
+        its source image file and its deviation label map.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pass_blob(self, pass_id: str, name: str):
+        """The stored "image" or "labels" bytes of a pass, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pass_blob_path(self, pass_id: str, name: str):
+        """Local file holding the stored "image" or "labels" of a pass, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest_pass(self, plot_id: str, reference_id: str = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_pass(self, pass_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_passes(self, plot_id: str) -> list:
+        """Passes of a plot, oldest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_tracks(self, track_ids: list) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_tracks(self, plot_id: str, status: str = None) -> list:
+        """Deviation tracks of a plot, oldest first-detected first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_jobs(self, jobs: list):
+        """
+        Store the state of analysis jobs and append their new events: `jobs` is
+        a list of (job without deviations_found, seq of its first new event,
+        [(event, data), ...]).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_job(self, job_id: str):
+        """A stored job, with deviations_found rebuilt from its events, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def job_events(self, job_id: str, after: int = 0) -> list:
+        """Events of a job after sequence number `after`, as [(seq, event, data), ...]."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def prune_jobs(self, keep: int) -> int:
+        """Delete finished jobs beyond the `keep` newest jobs. Returns how many were deleted."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_plot(self, plot_id: str, changes: dict) -> int:
+        """
+        Persist changed registry fields of a plot (merged with those stored
+        before). Returns the registry version that includes them.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def plot_updates(self, after: int = 0) -> list:
+        """Plots whose fields changed after registry version `after`, oldest change first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def registry_version(self) -> int:
+        """Counter of persisted plot updates, shared by every process using the store."""
+        raise NotImplementedError
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    result_id TEXT PRIMARY KEY,
+    analyzed_at TEXT NOT NULL,
+    risk_level TEXT,
+    plot_id TEXT,
+    total_deviations INTEGER,
+    change_percentage REAL,
+    reference_filename TEXT,
+    current_filename TEXT,
+    summary TEXT NOT NULL,
+    document TEXT NOT NULL,
+    content_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_analyzed_at ON analyses(analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_risk ON analyses(risk_level, analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_plot ON analyses(plot_id, analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_content_key ON analyses(content_key, analyzed_at);
+
+CREATE TABLE IF NOT EXISTS deviations (
+    result_id TEXT NOT NULL REFERENCES analyses(result_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    deviation_id TEXT NOT NULL,
+    type TEXT,
+    severity TEXT,
+    area_pixels INTEGER,
+    data TEXT NOT NULL,
+    PRIMARY KEY (result_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_deviations_severity ON deviations(severity);
+
+CREATE TABLE IF NOT EXISTS analysis_blobs (
+    result_id TEXT NOT NULL REFERENCES analyses(result_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (result_id, name)
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_blobs_digest ON analysis_blobs(digest);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    plot_id TEXT,
+    severity TEXT,
+    status TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL,
+    severity_rank INTEGER,
+    type TEXT
+);
+-- One open alert per plot and type, whichever process raises it
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_open ON alerts(plot_id, type) WHERE status <> 'Resolved';
+CREATE INDEX IF NOT EXISTS idx_alerts_plot ON alerts(plot_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts(severity, status);
+CREATE INDEX IF NOT EXISTS idx_alerts_rank ON alerts(severity_rank);
+CREATE INDEX IF NOT EXISTS idx_alerts_status ON alerts(status, severity_rank);
+CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts(timestamp);
+
+CREATE TABLE IF NOT EXISTS store_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+INSERT OR IGNORE INTO store_version VALUES (0, 0, strftime('%s', 'now'));
+
+CREATE TABLE IF NOT EXISTS reference_maps (
+    reference_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    name TEXT,
+    filename TEXT,
+    plot_id TEXT,
+    width INTEGER,
+    height INTEGER,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reference_maps_plot ON reference_maps(plot_id);
+
+CREATE TABLE IF NOT EXISTS plot_baselines (
+    plot_id TEXT NOT NULL,
+    accepted_at TEXT NOT NULL,
+    reference_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (plot_id, accepted_at)
+);
+
+CREATE TABLE IF NOT EXISTS plot_passes (
+    pass_id TEXT PRIMARY KEY,
+    plot_id TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    reference_id TEXT NOT NULL,
+    result_id TEXT NOT NULL,
+    image_digest TEXT,
+    labels_digest TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plot_passes_plot ON plot_passes(plot_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_plot_passes_baseline ON plot_passes(plot_id, reference_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_plot_passes_image ON plot_passes(image_digest);
+CREATE INDEX IF NOT EXISTS idx_plot_passes_labels ON plot_passes(labels_digest);
+
+CREATE TABLE IF NOT EXISTS deviation_tracks (
+    track_id TEXT PRIMARY KEY,
+    plot_id TEXT NOT NULL,
+    first_detected TEXT NOT NULL,
+    last_detected TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_deviation_tracks_plot ON deviation_tracks(plot_id, status, first_detected);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+
+CREATE TABLE IF NOT EXISTS plot_updates (
+    plot_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    changes TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_plot_updates_version ON plot_updates(version);
+"""
+
+
+class SQLiteStore(AnalysisStore):
+    """Default backend: SQLite (WAL) for metadata, BlobStore for images and masks."""
+
+    def __init__(self, db_path: str, blob_dir: str, retention_days: int = RETENTION_DAYS,
+                 max_analyses: int = MAX_ANALYSES):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.blobs = BlobStore(blob_dir)
+        self.references_root = os.path.join(os.path.dirname(os.path.abspath(db_path)), "references")
+        self.retention_days = retention_days
+        self.max_analyses = max_analyses
+        self._local = threading.local()
+        with self._conn() as conn:
+            self._migrate(conn)
+            self._migrate_timestamps(conn)
+            conn.executescript(SCHEMA)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        # Columns added after the first release of the schema
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(analyses)")}
+        if columns and "content_key" not in columns:
+            conn.execute("ALTER TABLE analyses ADD COLUMN content_key TEXT")
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(alerts)")}
+        if columns and "severity_rank" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN severity_rank INTEGER")
+            for severity, rank in SEVERITY_RANK.items():
+                conn.execute("UPDATE alerts SET severity_rank = ? WHERE severity = ?", (rank, severity))
+            conn.execute("UPDATE alerts SET severity_rank = ? WHERE severity_rank IS NULL", (len(SEVERITY_RANK),))
+        if columns and "type" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN type TEXT")
+            conn.execute("UPDATE alerts SET type = json_extract(data, '$.type')")
+            # Keep the oldest of any duplicate open alerts, so the unique index can be built
+            conn.execute(
+                "UPDATE alerts SET status = 'Resolved', data = json_set(data, '$.status', 'Resolved') "
+                "WHERE status <> 'Resolved' AND rowid NOT IN "
+                "(SELECT MIN(rowid) FROM alerts WHERE status <> 'Resolved' GROUP BY plot_id, type)"
+            )
+
+    def _migrate_timestamps(self, conn: sqlite3.Connection):
+        conn.create_function("local_to_utc", 1, _local_to_utc, deterministic=True)
+        for table, column, document, path in LOCAL_TIMESTAMPS:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+                continue
+            # Every timestamp written since is UTC, so only rows without an offset are converted
+            conn.execute(
+                f"UPDATE {table} SET {column} = local_to_utc({column}), "
+                f"{document} = json_set({document}, '{path}', local_to_utc({column})) "
+                f"WHERE {column} NOT LIKE '%+00:00'"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """
+        Transaction that takes the database write lock up front (BEGIN IMMEDIATE).
+        Blobs are published and reclaimed only inside one, so no worker can delete
+        a blob between another storing it and committing the row that references it.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _bump_version(self, conn: sqlite3.Connection):
+        conn.execute("UPDATE store_version SET version = version + 1, updated_at = ?", (time.time(),))
+
+    def version(self) -> tuple:
+        row = self._conn().execute("SELECT version, updated_at FROM store_version").fetchone()
+        return row["version"], row["updated_at"]
+
+    # ── Analyses ──
+
+    def save_analysis(self, result: dict, render_sources: dict = None, content_key: str = None):
+        result_id = result["result_id"]
+        metadata = result.get("metadata", {})
+        summary = result.get("summary", {})
+        deviations = result.get("deviations", [])
+        document = {k: v for k, v in result.items() if k != "deviations"}
+
+        with self._write() as conn:
+            blob_rows = []
+            if render_sources:
+                for name in BLOB_SOURCES:
+                    blob_rows.append((result_id, name, self.blobs.put(render_sources[name])))
+                layout = {k: v for k, v in render_sources.items() if k not in BLOB_SOURCES}
+                blob_rows.append((result_id, "layout", self.blobs.put(json.dumps(layout).encode())))
+            # A report rendered from the previous version of this analysis is stale
+            stale = {
+                r["digest"] for r in conn.execute(
+                    "SELECT digest FROM analysis_blobs WHERE result_id = ? AND name LIKE ?", (result_id, REPORT_PREFIX + "%")
+                )
+            }
+            if stale:
+                conn.execute("DELETE FROM analysis_blobs WHERE result_id = ? AND name LIKE ?", (result_id, REPORT_PREFIX + "%"))
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    result_id,
+                    metadata.get("analyzed_at") or datetime.now(timezone.utc).isoformat(),
+                    summary.get("risk_level"),
+                    metadata.get("plot_id"),
+                    summary.get("total_deviations", len(deviations)),
+                    summary.get("change_percentage"),
+                    metadata.get("reference_filename"),
+                    metadata.get("current_filename"),
+                    json.dumps(summary),
+                    json.dumps(document),
+                    content_key,
+                ),
+            )
+            conn.execute("DELETE FROM deviations WHERE result_id = ?", (result_id,))
+            conn.executemany(
+                "INSERT INTO deviations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (result_id, i, d.get("id"), d.get("type"), d.get("severity"), d.get("area_pixels"), json.dumps(d))
+                    for i, d in enumerate(deviations)
+                ],
+            )
+            if blob_rows:
+                conn.executemany("INSERT OR REPLACE INTO analysis_blobs VALUES (?, ?, ?)", blob_rows)
+            self._bump_version(conn)
+        self._release_blobs(stale)
+        self.apply_retention()
+
+    def get_analysis(self, result_id: str):
+        conn = self._conn()
+        row = conn.execute("SELECT document FROM analyses WHERE result_id = ?", (result_id,)).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row["document"])
+        result["deviations"] = [
+            json.loads(r["data"])
+            for r in conn.execute("SELECT data FROM deviations WHERE result_id = ? ORDER BY position", (result_id,))
+        ]
+        return result
+
+    def find_by_content_key(self, content_key: str, max_age_seconds: float = 0):
+        query = "SELECT result_id FROM analyses WHERE content_key = ?"
+        params = [content_key]
+        if max_age_seconds:
+            query += " AND analyzed_at >= ?"
+            params.append((datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)).isoformat())
+        row = self._conn().execute(query + " ORDER BY analyzed_at DESC LIMIT 1", params).fetchone()
+        return row["result_id"] if row else None
+
+    def has_analysis(self, result_id: str) -> bool:
+        row = self._conn().execute("SELECT 1 FROM analyses WHERE result_id = ?", (result_id,)).fetchone()
+        return row is not None
+
+    def get_render_sources(self, result_id: str, paths: bool = False):
+        rows = self._conn().execute(
+            "SELECT name, digest FROM analysis_blobs WHERE result_id = ? AND name NOT LIKE ?",
+            (result_id, REPORT_PREFIX + "%"),
+        ).fetchall()
+        if not rows:
+            return None
+        digests = {r["name"]: r["digest"] for r in rows}
+        sources = json.loads(self.blobs.get(digests.pop("layout")))
+        for name, digest in digests.items():
+            sources[name] = self.blobs.path(digest) if paths else self.blobs.get(digest)
+        return sources
+
+    def save_report(self, result_id: str, name: str, data: bytes):
+        with self._write() as conn:
+            digest = self.blobs.put(data)
+            # Only while the analysis still exists, or the blob would never be collected
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_blobs SELECT ?, ?, ? WHERE EXISTS "
+                "(SELECT 1 FROM analyses WHERE result_id = ?)",
+                (result_id, REPORT_PREFIX + name, digest, result_id),
+            )
+        self._release_blobs({digest})
+
+    def get_report_path(self, result_id: str, name: str):
+        row = self._conn().execute(
+            "SELECT digest FROM analysis_blobs WHERE result_id = ? AND name = ?", (result_id, REPORT_PREFIX + name)
+        ).fetchone()
+        if row is None or not os.path.exists(self.blobs.path(row["digest"])):
+            return None
+        return self.blobs.path(row["digest"]), row["digest"]
+
+    def list_analyses(self, limit: int = 50, offset: int = 0, since: str = None, until: str = None,
+                      risk_level: str = None, plot_id: str = None) -> tuple:
+        clauses, params = [], []
+        if since:
+            clauses.append("analyzed_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("analyzed_at <= ?")
+            params.append(until)
+        if risk_level:
+            clauses.append("risk_level = ?")
+            params.append(risk_level)
+        if plot_id:
+            clauses.append("plot_id = ?")
+            params.append(plot_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT result_id, analyzed_at, plot_id, summary, reference_filename, current_filename "
+            f"FROM analyses {where} ORDER BY analyzed_at DESC, result_id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        summaries = [
+            {
+                "result_id": r["result_id"],
+                "analyzed_at": r["analyzed_at"],
+                "plot_id": r["plot_id"],
+                "summary": json.loads(r["summary"]),
+                "reference_file": r["reference_filename"],
+                "current_file": r["current_filename"],
+            }
+            for r in rows
+        ]
+        return summaries, total
+
+    def count_analyses(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def latest_plot_analyses(self) -> list:
+        rows = self._conn().execute(
+            "SELECT a.result_id, a.plot_id, a.summary, d.type, d.severity, "
+            "json_extract(a.document, '$.recommendations[0]') AS recommendation "
+            "FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY plot_id ORDER BY analyzed_at DESC, rowid DESC) AS n "
+            "FROM analyses WHERE plot_id IS NOT NULL) a "
+            "LEFT JOIN deviations d ON d.result_id = a.result_id AND d.position = 0 WHERE a.n = 1"
+        ).fetchall()
+        return [
+            {
+                "result_id": r["result_id"],
+                "plot_id": r["plot_id"],
+                "summary": json.loads(r["summary"]),
+                "top_deviation": {"type": r["type"], "severity": r["severity"]},
+                "recommendations": [json.loads(r["recommendation"])] if r["recommendation"] else [],
+            }
+            for r in rows
+        ]
+
+    def delete_analysis(self, result_id: str):
+        self._delete_analyses([result_id])
+
+    def _delete_analyses(self, result_ids: list):
+        if not result_ids:
+            return
+        conn = self._conn()
+        marks = ",".join("?" * len(result_ids))
+        with conn:
+            digests = {
+                r["digest"]
+                for r in conn.execute(f"SELECT digest FROM analysis_blobs WHERE result_id IN ({marks})", result_ids)
+            }
+            if conn.execute(f"DELETE FROM analyses WHERE result_id IN ({marks})", result_ids).rowcount:
+                self._bump_version(conn)
+        self._release_blobs(digests)
+
+    def _release_blobs(self, digests):
+        # Blobs are shared by content; only remove the ones nothing references any more
+        if not digests:
+            return
+        with self._write() as conn:
+            for digest in digests:
+                referenced = conn.execute(
+                    "SELECT 1 FROM analysis_blobs WHERE digest = ? UNION ALL "
+                    "SELECT 1 FROM plot_passes WHERE image_digest = ? OR labels_digest = ? LIMIT 1",
+                    (digest, digest, digest),
+                ).fetchone()
+                if referenced is None:
+                    self.blobs.delete(digest)
+
+    def apply_retention(self) -> int:
+        conn = self._conn()
+        expired = []
+        if self.retention_days > 0:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).isoformat()
+            expired += [r[0] for r in conn.execute("SELECT result_id FROM analyses WHERE analyzed_at < ?", (cutoff,))]
+        if self.max_analyses > 0:
+            expired += [
+                r[0] for r in conn.execute(
+                    "SELECT result_id FROM analyses ORDER BY analyzed_at DESC, result_id DESC LIMIT -1 OFFSET ?",
+                    (self.max_analyses,),
+                )
+            ]
+        expired = list(dict.fromkeys(expired))
+        self._delete_analyses(expired)
+        return len(expired)
+
+    # ── Alerts ──
+
+    def list_alerts(self) -> list:
+        return [json.loads(r["data"]) for r in self._conn().execute("SELECT data FROM alerts ORDER BY rowid")]
+
+    def add_alerts(self, alerts: list) -> list:
+        stored = []
+        with self._write() as conn:
+            for alert in alerts:
+                row = None
+                if alert.get("plot_id") and alert.get("type"):
+                    row = conn.execute(
+                        "SELECT data FROM alerts WHERE plot_id = ? AND type = ? AND status <> 'Resolved'",
+                        (alert["plot_id"], alert["type"]),
+                    ).fetchone()
+                current = json.loads(row["data"]) if row else None
+                if alert.get("status") == "Resolved":
+                    if current is None:
+                        continue  # already resolved, or never stored
+                    alert = {**current, "status": "Resolved", "resolved_at": alert.get("resolved_at")}
+                elif current is not None and current["id"] != alert["id"]:
+                    alert = {**alert, "id": current["id"], "timestamp": current["timestamp"],
+                             "status": current["status"], "updated_at": alert.get("updated_at", alert["timestamp"])}
+                conn.execute(
+                    "INSERT OR REPLACE INTO alerts (id, plot_id, severity, status, timestamp, data, severity_rank, "
+                    "type) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (alert["id"], alert.get("plot_id"), alert.get("severity"), alert.get("status"),
+                     alert.get("timestamp"), json.dumps(alert),
+                     SEVERITY_RANK.get(alert.get("severity"), len(SEVERITY_RANK)), alert.get("type")),
+                )
+                stored.append(alert)
+            if stored:
+                self._bump_version(conn)
+        return stored
+
+    def open_alerts(self, plot_ids: list) -> list:
+        conn = self._conn()
+        found = []
+        for start in range(0, len(plot_ids), 500):
+            chunk = list(plot_ids[start:start + 500])
+            found += [
+                json.loads(r["data"]) for r in conn.execute(
+                    f"SELECT data FROM alerts WHERE status <> 'Resolved' AND plot_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            ]
+        return found
+
+    def count_alerts(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+
+    def alert_counts(self) -> dict:
+        rows = self._conn().execute("SELECT severity, status, COUNT(*) AS n FROM alerts GROUP BY severity, status")
+        return {(r["severity"], r["status"]): r["n"] for r in rows}
+
+    def query_alerts(self, severities: list = None, statuses: list = None, plot_id: str = None,
+                     sort: str = "severity", after: list = None, limit: int = 100, with_total: bool = True) -> tuple:
+        clauses, params = [], []
+        if severities:
+            clauses.append(f"severity IN ({','.join('?' * len(severities))})")
+            params += severities
+        if statuses:
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+            params += statuses
+        if plot_id:
+            clauses.append("plot_id = ?")
+            params.append(plot_id)
+        conn = self._conn()
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM alerts {where}", params).fetchone()[0] if with_total else None
+
+        # Keyset pagination: rowid breaks ties in every order
+        key, direction = {
+            "severity": ("severity_rank", ">"),
+            "newest": ("timestamp", "<"),
+            "oldest": ("timestamp", ">"),
+        }[sort]
+        if after is not None:
+            clauses.append(f"({key}, rowid) {direction} (?, ?)")
+            params += list(after)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        descending = " DESC" if direction == "<" else ""
+        rows = conn.execute(
+            f"SELECT {key} AS sort_key, rowid, data FROM alerts {where} "
+            f"ORDER BY {key}{descending}, rowid{descending} LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        last = [rows[-1]["sort_key"], rows[-1]["rowid"]] if more else None
+        return [json.loads(r["data"]) for r in rows], last, total
+
+    # ── Reference maps ──
+
+    def reference_dir(self, reference_id: str) -> str:
+        return os.path.join(self.references_root, reference_id)
+
+    def save_reference(self, reference: dict):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reference_maps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    reference["reference_id"], reference["sha256"], reference.get("name"),
+                    reference.get("filename"), reference.get("plot_id"), reference.get("width"),
+                    reference.get("height"), reference["created_at"], json.dumps(reference),
+                ),
+            )
+
+    def get_reference(self, reference_id: str):
+        row = self._conn().execute(
+            "SELECT data FROM reference_maps WHERE reference_id = ?", (reference_id,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def list_references(self) -> list:
+        return [
+            json.loads(r["data"])
+            for r in self._conn().execute("SELECT data FROM reference_maps ORDER BY created_at DESC")
+        ]
+
+    def delete_reference(self, reference_id: str) -> list:
+        with self._write() as conn:
+            plot_ids = [
+                r["plot_id"] for r in conn.execute(
+                    "SELECT plot_id FROM plot_baselines b WHERE reference_id = ? AND accepted_at = "
+                    "(SELECT MAX(accepted_at) FROM plot_baselines WHERE plot_id = b.plot_id) ORDER BY plot_id",
+                    (reference_id,),
+                )
+            ]
+            if not plot_ids:
+                conn.execute("DELETE FROM reference_maps WHERE reference_id = ?", (reference_id,))
+        return plot_ids
+
+    # ── Plot time series ──
+
+    def get_baseline(self, plot_id: str):
+        row = self._conn().execute(
+            "SELECT data FROM plot_baselines WHERE plot_id = ? ORDER BY accepted_at DESC LIMIT 1", (plot_id,)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def set_baseline(self, baseline: dict) -> bool:
+        # Under the write lock, so the reference cannot be deleted between the check and the insert
+        with self._write() as conn:
+            if conn.execute(
+                "SELECT 1 FROM reference_maps WHERE reference_id = ?", (baseline["reference_id"],)
+            ).fetchone() is None:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO plot_baselines VALUES (?, ?, ?, ?)",
+                (baseline["plot_id"], baseline["accepted_at"], baseline["reference_id"], json.dumps(baseline)),
+            )
+            rows = conn.execute(
+                "SELECT data FROM deviation_tracks WHERE plot_id = ? AND status = 'active'", (baseline["plot_id"],)
+            ).fetchall()
+            accepted = []
+            for r in rows:
+                track = json.loads(r["data"])
+                track["status"] = "accepted"
+                track["accepted_at"] = baseline["accepted_at"]
+                accepted.append((json.dumps(track), track["track_id"]))
+            conn.executemany("UPDATE deviation_tracks SET status = 'accepted', data = ? WHERE track_id = ?", accepted)
+        return True
+
+    def save_pass(self, monitoring_pass: dict, tracks: list, image_path: str = None, labels: bytes = None):
+        # The image is copied in before taking the write lock; only the rename happens under it
+        staged = self.blobs.stage_file(image_path) if image_path is not None else None
+        try:
+            with self._write() as conn:
+                if staged is not None:
+                    monitoring_pass["image_digest"] = self.blobs.commit(*staged)
+                if labels is not None:
+                    monitoring_pass["labels_digest"] = self.blobs.put(labels)
+                conn.execute(
+                    "INSERT INTO plot_passes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        monitoring_pass["pass_id"], monitoring_pass["plot_id"], monitoring_pass["captured_at"],
+                        monitoring_pass["reference_id"], monitoring_pass["result_id"],
+                        monitoring_pass.get("image_digest"), monitoring_pass.get("labels_digest"),
+                        json.dumps(monitoring_pass),
+                    ),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO deviation_tracks VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (t["track_id"], t["plot_id"], t["first_detected"], t["last_detected"], t["status"],
+                         json.dumps(t))
+                        for t in tracks
+                    ],
+                )
+        finally:
+            if staged is not None and os.path.exists(staged[1]):
+                os.remove(staged[1])
+
+    def latest_pass(self, plot_id: str, reference_id: str = None):
+        query, params = "SELECT data FROM plot_passes WHERE plot_id = ?", [plot_id]
+        if reference_id is not None:
+            query += " AND reference_id = ?"
+            params.append(reference_id)
+        row = self._conn().execute(query + " ORDER BY captured_at DESC LIMIT 1", params).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_pass(self, pass_id: str):
+        row = self._conn().execute("SELECT data FROM plot_passes WHERE pass_id = ?", (pass_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_pass_blob(self, pass_id: str, name: str):
+        path = self.get_pass_blob_path(pass_id, name)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def get_pass_blob_path(self, pass_id: str, name: str):
+        monitoring_pass = self.get_pass(pass_id)
+        digest = monitoring_pass.get(f"{name}_digest") if monitoring_pass else None
+        return self.blobs.path(digest) if digest else None
+
+    def list_passes(self, plot_id: str) -> list:
+        return [
+            json.loads(r["data"])
+            for r in self._conn().execute(
+                "SELECT data FROM plot_passes WHERE plot_id = ? ORDER BY captured_at", (plot_id,)
+            )
+        ]
+
+    def get_tracks(self, track_ids: list) -> dict:
+        if not track_ids:
+            return {}
+        marks = ",".join("?" * len(track_ids))
+        rows = self._conn().execute(f"SELECT data FROM deviation_tracks WHERE track_id IN ({marks})", list(track_ids))
+        return {t["track_id"]: t for t in (json.loads(r["data"]) for r in rows)}
+
+    def list_tracks(self, plot_id: str, status: str = None) -> list:
+        query, params = "SELECT data FROM deviation_tracks WHERE plot_id = ?", [plot_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        return [
+            json.loads(r["data"])
+            for r in self._conn().execute(query + " ORDER BY first_detected, track_id", params)
+        ]
+
+    # ── Analysis jobs ──
+
+    def save_jobs(self, jobs: list):
+        with self._write() as conn:
+            for job, first_seq, events in jobs:
+                # An upsert keeps the rowid, which orders jobs by creation for prune_jobs
+                conn.execute(
+                    "INSERT INTO jobs VALUES (?, ?, ?, ?) ON CONFLICT (job_id) DO UPDATE SET "
+                    "status = excluded.status, updated_at = excluded.updated_at, data = excluded.data",
+                    (job["job_id"], job["status"], job["updated_at"], json.dumps(job)),
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO job_events VALUES (?, ?, ?, ?)",
+                    [(job["job_id"], first_seq + i, event, json.dumps(data)) for i, (event, data) in enumerate(events)],
+                )
+
+    def get_job(self, job_id: str):
+        row = self._conn().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = json.loads(row["data"])
+        job["deviations_found"] = [
+            json.loads(r["data"]) for r in self._conn().execute(
+                "SELECT data FROM job_events WHERE job_id = ? AND event = 'deviation' ORDER BY seq", (job_id,)
+            )
+        ]
+        return job
+
+    def job_events(self, job_id: str, after: int = 0) -> list:
+        return [
+            (r["seq"], r["event"], json.loads(r["data"]))
+            for r in self._conn().execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+            )
+        ]
+
+    def prune_jobs(self, keep: int) -> int:
+        with self._write() as conn:
+            job_ids = [
+                r["job_id"] for r in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status IN ('completed', 'failed') AND rowid NOT IN "
+                    "(SELECT rowid FROM jobs ORDER BY rowid DESC LIMIT ?)", (keep,),
+                )
+            ]
+            conn.executemany("DELETE FROM job_events WHERE job_id = ?", [(j,) for j in job_ids])
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(j,) for j in job_ids])
+        return len(job_ids)
+
+    # ── Plot registry ──
+
+    def update_plot(self, plot_id: str, changes: dict) -> int:
+        with self._write() as conn:
+            row = conn.execute("SELECT changes FROM plot_updates WHERE plot_id = ?", (plot_id,)).fetchone()
+            merged = {**(json.loads(row["changes"]) if row else {}), **changes}
+            version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM plot_updates").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO plot_updates VALUES (?, ?, ?, ?)",
+                (plot_id, version, datetime.now(timezone.utc).isoformat(), json.dumps(merged)),
+            )
+        return version
+
+    def plot_updates(self, after: int = 0) -> list:
+        return [
+            {"plot_id": r["plot_id"], "version": r["version"], "changes": json.loads(r["changes"])}
+            for r in self._conn().execute(
+                "SELECT plot_id, version, changes FROM plot_updates WHERE version > ? ORDER BY version", (after,)
+            )
+        ]
+
+    def registry_version(self) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(version), 0) FROM plot_updates").fetchone()[0]
+
+
+def create_store(url: str = None) -> AnalysisStore:
+    """
+    Build the storage backend named by `url` (or LANDWATCH_STORE).
+    Supported: "sqlite:///path/to/landwatch.db" (default: DATA_DIR/landwatch.db).
+    """
+    url = url or os.environ.get("LANDWATCH_STORE") or f"sqlite:///{os.path.join(DATA_DIR, 'landwatch.db')}"
+    if url.startswith("sqlite:///"):
+        db_path = url[len("sqlite:///"):]
+        return SQLiteStore(db_path, os.path.join(os.path.dirname(os.path.abspath(db_path)), "blobs"))
+    raise ValueError(f"Unsupported storage backend: {url}")
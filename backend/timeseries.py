@@ -0,0 +1,108 @@
+"""
+LandWatch - Plot Time Series
+Tracks deviations of one plot across monitoring passes.
+
+Every pass is compared only against the plot's accepted baseline. Its
+deviations are then linked to the previous pass under that baseline through
+the stored deviation label maps (preview resolution, one label per
+deviation), so a region that keeps growing stays one track with its original
+first-detected date, without re-analysing any historical image.
+"""
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+
+def deviation_labels(outlines: list, shape: tuple) -> np.ndarray:
+    """Rasterize render-source outlines into a uint16 map: deviation i is labelled i + 1."""
+    labels = np.zeros(shape[:2], dtype=np.uint16)
+    for i, outline in enumerate(outlines):
+        cv2.fillPoly(labels, [np.array(outline, dtype=np.int32).reshape(-1, 1, 2)], i + 1)
+    return labels
+
+
+def encode_labels(labels: np.ndarray) -> bytes:
+    return cv2.imencode(".png", labels)[1].tobytes()
+
+
+def decode_labels(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+def change_turnover(prev_mask, mask, scale: float) -> dict:
+    """
+    Full-resolution pixels of change that appeared and that cleared since the
+    previous pass, from the run-length change masks (masks.RunMask, preview
+    resolution `scale`) of both passes. Empty when there is nothing to compare.
+    """
+    if prev_mask is None or prev_mask.shape != mask.shape:
+        return {}
+    per_pixel = 1 / scale ** 2
+    return {
+        "new_change_pixels": round(mask.difference(prev_mask).area * per_pixel),
+        "cleared_change_pixels": round(prev_mask.difference(mask).area * per_pixel),
+    }
+
+
+def link_deviations(prev_labels: np.ndarray, labels: np.ndarray, count: int) -> list:
+    """
+    Match the `count` deviations of `labels` against the previous pass.
+    Returns, per deviation, {"continues": previous label or None, "overlaps": [previous labels]}.
+    Each previous deviation is continued by at most one new one, chosen by
+    largest overlap; the rest of its overlaps are splits or merges.
+    """
+    links = [{"continues": None, "overlaps": []} for _ in range(count)]
+    if prev_labels is None or count == 0:
+        return links
+    if prev_labels.shape != labels.shape:
+        prev_labels = cv2.resize(prev_labels, (labels.shape[1], labels.shape[0]), interpolation=cv2.INTER_NEAREST)
+
+    both = (labels > 0) & (prev_labels > 0)
+    n_prev = int(prev_labels.max()) + 1
+    pairs = labels[both].astype(np.int64) * n_prev + prev_labels[both]
+    codes, overlap = np.unique(pairs, return_counts=True)
+    claimed = set()
+    for code in codes[np.argsort(-overlap, kind="stable")]:
+        new, prev = divmod(int(code), n_prev)
+        link = links[new - 1]
+        link["overlaps"].append(prev)
+        if link["continues"] is None and prev not in claimed:
+            link["continues"] = prev
+            claimed.add(prev)
+    return links
+
+
+def _utc(value: str) -> datetime:
+    """A stored timestamp as an aware datetime; passes recorded without an offset are UTC."""
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def trend_statistics(points: list) -> dict:
+    """
+    Least-squares growth of changed area over passes ({captured_at, change_percentage,
+    changed_area_pixels, changed_area_sqm?}). Rates are per 30 days.
+    """
+    if not points:
+        return {"passes": 0}
+    first, last = points[0], points[-1]
+    stats = {
+        "passes": len(points),
+        "first_captured_at": first["captured_at"],
+        "last_captured_at": last["captured_at"],
+        "change_percentage_delta": round(last["change_percentage"] - first["change_percentage"], 3),
+        "changed_area_pixels_delta": last["changed_area_pixels"] - first["changed_area_pixels"],
+        "change_percentage_per_30d": None,
+        "changed_area_sqm_per_30d": None,
+    }
+    days = np.array([
+        (_utc(p["captured_at"]) - _utc(first["captured_at"])).total_seconds() / 86400
+        for p in points
+    ])
+    if len(points) < 2 or np.ptp(days) == 0:
+        return stats
+    stats["change_percentage_per_30d"] = round(float(np.polyfit(days, [p["change_percentage"] for p in points], 1)[0]) * 30, 3)
+    if all(p.get("changed_area_sqm") is not None for p in points):
+        stats["changed_area_sqm_per_30d"] = round(float(np.polyfit(days, [p["changed_area_sqm"] for p in points], 1)[0]) * 30, 1)
+    return stats
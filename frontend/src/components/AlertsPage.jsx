@@ -7,15 +7,21 @@ export default function AlertsPage() {
     const [alerts, setAlerts] = useState([])
     const [summary, setSummary] = useState({})
     const [filter, setFilter] = useState('all')
+    const [nextCursor, setNextCursor] = useState(null)
 
-    useEffect(() => { fetchAlerts() }, [])
+    // Severity filtering and paging happen on the server
+    useEffect(() => { fetchAlerts() }, [filter])
 
-    const fetchAlerts = async () => {
+    const fetchAlerts = async (cursor = null) => {
+        const params = new URLSearchParams({ limit: 50 })
+        if (filter !== 'all') params.set('severity', filter)
+        if (cursor) params.set('cursor', cursor)
         try {
-            const res = await fetch(`${API}/api/alerts`)
+            const res = await fetch(`${API}/api/alerts?${params}`)
             const data = await res.json()
-            setAlerts(data.alerts || [])
+            setAlerts(prev => cursor ? [...prev, ...(data.alerts || [])] : (data.alerts || []))
             setSummary(data.summary || {})
+            setNextCursor(data.next_cursor || null)
         } catch {
             setAlerts([])
         }
@@ -25,11 +31,6 @@ export default function AlertsPage() {
         window.open(`${API}/api/export/alerts`, '_blank')
     }
 
-    const filteredAlerts = alerts.filter(a => {
-        if (filter === 'all') return true
-        return a.severity === filter
-    })
-
     const severityColors = {
         Critical: { bg: 'rgba(239,68,68,0.08)', border: 'rgba(239,68,68,0.2)', dot: 'var(--accent-red)' },
         High: { bg: 'rgba(245,158,11,0.08)', border: 'rgba(245,158,11,0.2)', dot: 'var(--accent-amber)' },
@@ -92,7 +93,7 @@ export default function AlertsPage() {
 
                 {/* Alerts List */}
                 <div style={{ display: 'flex', flexDirection: 'column', gap: 12 }}>
-                    {filteredAlerts.map(alert => {
+                    {alerts.map(alert => {
                         const colors = severityColors[alert.severity] || severityColors.Low
                         return (
                             <div key={alert.id} className="card animate-in" style={{
@@ -135,6 +136,11 @@ export default function AlertsPage() {
                             </div>
                         )
                     })}
+                    {nextCursor && (
+                        <button className="btn btn-secondary" style={{ alignSelf: 'center' }} onClick={() => fetchAlerts(nextCursor)}>
+                            Load more
+                        </button>
+                    )}
                 </div>
             </div>
         </>
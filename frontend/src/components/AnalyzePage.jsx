@@ -27,6 +27,8 @@ export default function AnalyzePage() {
     const [results, setResults] = useState(null)
     const [activeTab, setActiveTab] = useState('overlay')
     const [error, setError] = useState(null)
+    const [stage, setStage] = useState(null)
+    const [partialDeviations, setPartialDeviations] = useState([])
     const [sliderPos, setSliderPos] = useState(50)
     const sliderRef = useRef(null)
 
@@ -49,19 +51,36 @@ export default function AnalyzePage() {
     const refDropzone = useDropzone({ onDrop: onDropReference, accept: { 'image/jpeg': [], 'image/png': [] }, multiple: false })
     const curDropzone = useDropzone({ onDrop: onDropCurrent, accept: { 'image/jpeg': [], 'image/png': [] }, multiple: false })
 
+    // Submit an analysis job and follow its progress over Server-Sent Events
     const runAnalysis = async () => {
         if (!referenceFile || !currentFile) return
-        setAnalyzing(true); setError(null)
+        setAnalyzing(true); setError(null); setStage('queued'); setPartialDeviations([])
         try {
             const formData = new FormData()
             formData.append('reference', referenceFile)
             formData.append('current', currentFile)
-            const res = await fetch(`${API}/api/analyze`, { method: 'POST', body: formData })
+            const res = await fetch(`${API}/api/analyses`, { method: 'POST', body: formData })
             if (!res.ok) { const e = await res.json(); throw new Error(e.detail || 'Analysis failed') }
-            setResults(await res.json())
+            const job = await res.json()
+            const events = new EventSource(`${API}${job.events_url}`)
+            const finish = (message) => {
+                events.close(); setAnalyzing(false); setStage(null)
+                if (message) setError(message)
+            }
+            events.addEventListener('stage', (e) => setStage(JSON.parse(e.data).stage))
+            events.addEventListener('deviation', (e) => setPartialDeviations((prev) => [...prev, JSON.parse(e.data)]))
+            events.addEventListener('completed', async () => {
+                try {
+                    const r = await fetch(`${API}${job.status_url}`)
+                    setResults(await r.json()); finish()
+                } catch { finish('Failed to fetch analysis results') }
+            })
+            events.addEventListener('failed', (e) => finish(JSON.parse(e.data).error || 'Analysis failed'))
+            events.onerror = () => { if (events.readyState === EventSource.CLOSED) finish('Lost connection to analysis job') }
         } catch (err) {
             setError(err.message || 'Failed to connect. Make sure backend is running on port 8000.')
-        } finally { setAnalyzing(false) }
+            setAnalyzing(false); setStage(null)
+        }
     }
 
     const downloadReport = async () => {
@@ -178,9 +197,14 @@ export default function AnalyzePage() {
                         <div style={{ textAlign: 'center' }}>
                             <button className="btn btn-primary" onClick={runAnalysis} disabled={!referenceFile || !currentFile || analyzing}
                                 style={{ padding: '14px 40px', fontSize: 15 }}>
-                                {analyzing ? <><div className="spinner" style={{ width: 18, height: 18, borderWidth: 2 }} /> Analyzing...</>
+                                {analyzing ? <><div className="spinner" style={{ width: 18, height: 18, borderWidth: 2 }} /> Analyzing{stage ? ` (${stage})` : ''}...</>
                                     : <><Zap size={18} /> Run Change Detection Analysis</>}
                             </button>
+                            {analyzing && partialDeviations.length > 0 && (
+                                <div style={{ marginTop: 12, fontSize: 12, color: 'var(--text-secondary)' }}>
+                                    {partialDeviations.length} deviation(s) found so far: {partialDeviations.map((d) => `${d.id} ${d.type} (${d.severity})`).join(', ')}
+                                </div>
+                            )}
                         </div>
                     </>
                 ) : (
@@ -195,6 +219,11 @@ export default function AnalyzePage() {
                                 <div className="risk-desc">
                                     {results.summary.total_deviations} deviation(s) detected · {results.summary.change_percentage}% area changed
                                 </div>
+                                {results.metadata?.registration?.applied && (
+                                    <div className="risk-desc">
+                                        Images aligned: shift {results.metadata.registration.shift_px.join(', ')} px · rotation {results.metadata.registration.rotation_deg}° · confidence {Math.round(results.metadata.registration.confidence * 100)}%
+                                    </div>
+                                )}
                             </div>
                             <button className="btn btn-primary" onClick={downloadReport} style={{ padding: '8px 16px', fontSize: 13 }}>
                                 <FileText size={14} /> PDF Report
@@ -235,10 +264,10 @@ export default function AnalyzePage() {
                                 <div ref={sliderRef} onMouseMove={(e) => e.buttons === 1 && handleSliderMove(e)} onClick={handleSliderMove}
                                     style={{ position: 'relative', width: '100%', aspectRatio: '16/9', overflow: 'hidden', borderRadius: 8, cursor: 'col-resize', userSelect: 'none', border: '1px solid var(--border-color)' }}>
                                     {/* Current (full background) */}
-                                    <img src={`data:image/jpeg;base64,${results.images.annotated_current}`} alt="Current" style={{ position: 'absolute', top: 0, left: 0, width: '100%', height: '100%', objectFit: 'contain', background: 'var(--bg-primary)' }} />
+                                    <img src={`${API}${results.image_urls.annotated_current}`} alt="Current" style={{ position: 'absolute', top: 0, left: 0, width: '100%', height: '100%', objectFit: 'contain', background: 'var(--bg-primary)' }} />
                                     {/* Reference (clipped) */}
                                     <div style={{ position: 'absolute', top: 0, left: 0, width: `${sliderPos}%`, height: '100%', overflow: 'hidden' }}>
-                                        <img src={`data:image/jpeg;base64,${results.images.annotated_reference}`} alt="Reference" style={{ position: 'absolute', top: 0, left: 0, width: `${100 / (sliderPos / 100)}%`, height: '100%', objectFit: 'contain', background: 'var(--bg-primary)' }} />
+                                        <img src={`${API}${results.image_urls.annotated_reference}`} alt="Reference" style={{ position: 'absolute', top: 0, left: 0, width: `${100 / (sliderPos / 100)}%`, height: '100%', objectFit: 'contain', background: 'var(--bg-primary)' }} />
                                     </div>
                                     {/* Slider Line */}
                                     <div style={{ position: 'absolute', top: 0, left: `${sliderPos}%`, width: 3, height: '100%', background: 'var(--accent-blue)', transform: 'translateX(-1.5px)', boxShadow: '0 0 10px rgba(59,130,246,0.5)' }}>
@@ -269,30 +298,30 @@ export default function AnalyzePage() {
                                 </div>
                                 {activeTab === 'overlay' && (
                                     <div className="result-image-container">
-                                        <img src={`data:image/jpeg;base64,${results.images.overlay}`} alt="Overlay" />
+                                        <img src={`${API}${results.image_urls.overlay}`} alt="Overlay" />
                                         <div className="result-image-label"><Eye size={14} /> Red regions show detected changes</div>
                                     </div>
                                 )}
                                 {activeTab === 'heatmap' && (
                                     <div className="result-image-container">
-                                        <img src={`data:image/jpeg;base64,${results.images.heatmap}`} alt="Heatmap" />
+                                        <img src={`${API}${results.image_urls.heatmap}`} alt="Heatmap" />
                                         <div className="result-image-label"><Flame size={14} /> Heat intensity: blue=low, red=high magnitude of change</div>
                                     </div>
                                 )}
                                 {activeTab === 'difference' && (
                                     <div className="result-image-container">
-                                        <img src={`data:image/jpeg;base64,${results.images.difference}`} alt="Diff" />
+                                        <img src={`${API}${results.image_urls.difference}`} alt="Diff" />
                                         <div className="result-image-label"><Layers size={14} /> Binary mask after noise filtering</div>
                                     </div>
                                 )}
                                 {activeTab === 'annotated' && (
                                     <div className="results-grid">
                                         <div className="result-image-container">
-                                            <img src={`data:image/jpeg;base64,${results.images.annotated_reference}`} alt="Ref" />
+                                            <img src={`${API}${results.image_urls.annotated_reference}`} alt="Ref" />
                                             <div className="result-image-label"><Image size={14} /> Reference (deviation regions marked)</div>
                                         </div>
                                         <div className="result-image-container">
-                                            <img src={`data:image/jpeg;base64,${results.images.annotated_current}`} alt="Cur" />
+                                            <img src={`${API}${results.image_urls.annotated_current}`} alt="Cur" />
                                             <div className="result-image-label"><Image size={14} /> Current (deviation regions marked)</div>
                                         </div>
                                     </div>
@@ -307,14 +336,14 @@ export default function AnalyzePage() {
                                     <div className="card-header"><h3><AlertTriangle size={16} /> Detected Deviations</h3></div>
                                     <div className="card-body" style={{ padding: 0 }}>
                                         <table className="deviation-table">
-                                            <thead><tr><th>ID</th><th>Type</th><th>Severity</th><th>Area (px)</th></tr></thead>
+                                            <thead><tr><th>ID</th><th>Type</th><th>Severity</th><th>{results.geotransform ? 'Area (m²)' : 'Area (px)'}</th></tr></thead>
                                             <tbody>
                                                 {results.deviations.map(dev => (
                                                     <tr key={dev.id}>
                                                         <td style={{ fontWeight: 600 }}>{dev.id}</td>
                                                         <td>{dev.type}</td>
                                                         <td><span className={`badge badge-${dev.severity.toLowerCase()}`}>{dev.severity}</span></td>
-                                                        <td>{dev.area_pixels?.toLocaleString()}</td>
+                                                        <td>{(dev.area_sqm ?? dev.area_pixels)?.toLocaleString()}</td>
                                                     </tr>
                                                 ))}
                                             </tbody>
@@ -40,6 +40,7 @@ export default function Dashboard({ onNavigate }) {
     const [stats, setStats] = useState(null)
     const [plots, setPlots] = useState([])
     const [alerts, setAlerts] = useState([])
+    const [alertTotal, setAlertTotal] = useState(0)
     const [areas, setAreas] = useState([])
 
     useEffect(() => { fetchData() }, [])
@@ -48,14 +49,15 @@ export default function Dashboard({ onNavigate }) {
         try {
             const [statsRes, plotsRes, alertsRes, areasRes] = await Promise.all([
                 fetch(`${API}/api/dashboard/stats`),
-                fetch(`${API}/api/plots`),
-                fetch(`${API}/api/alerts`),
+                fetch(`${API}/api/plots?limit=10&fields=id,name,status,lessee,area_sqm,compliance_score,dues_pending`),
+                fetch(`${API}/api/alerts?limit=8&fields=id,type,severity,message,plot_id,plot_name,timestamp`),
                 fetch(`${API}/api/industrial-areas`),
             ])
             setStats(await statsRes.json())
             setPlots((await plotsRes.json()).plots || [])
             const alertsData = await alertsRes.json()
             setAlerts(alertsData.alerts || [])
+            setAlertTotal(alertsData.summary?.total || 0)
             setAreas((await areasRes.json()).areas || [])
         } catch {
             setStats({
@@ -158,7 +160,7 @@ export default function Dashboard({ onNavigate }) {
                         </div>
                         <div className="card-body">
                             <div className="map-container">
-                                <MapView plots={plots} />
+                                <MapView />
                             </div>
                         </div>
                     </div>
@@ -167,7 +169,7 @@ export default function Dashboard({ onNavigate }) {
                         <div className="card-header">
                             <h3><Bell size={16} /> Recent Alerts</h3>
                             <button className="btn btn-secondary" onClick={() => onNavigate('alerts')} style={{ padding: '6px 12px', fontSize: 12 }}>
-                                View All ({alerts.length})
+                                View All ({alertTotal})
                             </button>
                         </div>
                         <div className="card-body" style={{ padding: 0, maxHeight: 440, overflowY: 'auto' }}>
@@ -296,7 +298,7 @@ export default function Dashboard({ onNavigate }) {
                 {/* PLOTS TABLE */}
                 <div className="card animate-in">
                     <div className="card-header">
-                        <h3><Eye size={16} /> Plot Registry ({plots.length} plots across {stats?.industrial_areas_count || 0} areas)</h3>
+                        <h3><Eye size={16} /> Plot Registry ({stats?.total_plots || plots.length} plots across {stats?.industrial_areas_count || 0} areas)</h3>
                         <button className="btn btn-secondary" onClick={() => onNavigate('plots')}>View All</button>
                     </div>
                     <div className="card-body" style={{ padding: 0, maxHeight: 400, overflowY: 'auto' }}>
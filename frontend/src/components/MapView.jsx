@@ -1,6 +1,9 @@
-import { MapContainer, TileLayer, Marker, Popup, Circle } from 'react-leaflet'
+import { useEffect, useRef, useState } from 'react'
+import { MapContainer, TileLayer, Marker, Popup, Circle, Polygon, useMap, useMapEvents } from 'react-leaflet'
 import L from 'leaflet'
 
+const API = 'http://localhost:8000'
+
 // Fix for default marker icon
 delete L.Icon.Default.prototype._getIconUrl
 L.Icon.Default.mergeOptions({
@@ -17,25 +20,149 @@ const statusColors = {
     'Unauthorized Construction': '#ef4444',
 }
 
-export default function MapView({ plots }) {
-    const center = [21.2514, 81.6296] // Raipur, Chhattisgarh
-
-    const createIcon = (status) => {
-        const color = statusColors[status] || '#3b82f6'
-        return L.divIcon({
-            className: 'custom-marker',
-            html: `<div style="
+const createIcon = (status) => {
+    const color = statusColors[status] || '#3b82f6'
+    return L.divIcon({
+        className: 'custom-marker',
+        html: `<div style="
         width: 14px; height: 14px;
         background: ${color};
         border-radius: 50%;
         border: 2px solid white;
         box-shadow: 0 0 8px ${color}80;
       "></div>`,
-            iconSize: [14, 14],
-            iconAnchor: [7, 7],
-        })
+        iconSize: [14, 14],
+        iconAnchor: [7, 7],
+    })
+}
+
+const createClusterIcon = (count, status) => {
+    const color = statusColors[status] || '#3b82f6'
+    const size = count < 10 ? 28 : count < 100 ? 34 : count < 1000 ? 40 : 46
+    return L.divIcon({
+        className: 'custom-marker',
+        html: `<div style="
+        width: ${size}px; height: ${size}px; line-height: ${size - 4}px;
+        background: ${color}cc;
+        border-radius: 50%;
+        border: 2px solid white;
+        box-shadow: 0 0 10px ${color}80;
+        color: white; font: 600 12px Inter, sans-serif; text-align: center;
+      ">${count}</div>`,
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2],
+    })
+}
+
+function ClusterMarker({ feature }) {
+    const map = useMap()
+    const { count, status, status_counts: statusCounts, bbox } = feature.properties
+    const [lon, lat] = feature.geometry.coordinates
+
+    const zoomIn = () => {
+        const [west, south, east, north] = bbox
+        if (west === east && south === north) {
+            map.setView([lat, lon], map.getZoom() + 2)
+        } else {
+            map.fitBounds([[south, west], [north, east]], { padding: [24, 24] })
+        }
+    }
+
+    return (
+        <Marker
+            position={[lat, lon]}
+            icon={createClusterIcon(count, status)}
+            eventHandlers={{ click: zoomIn }}
+            title={Object.entries(statusCounts).map(([s, n]) => `${s}: ${n}`).join('\n')}
+        />
+    )
+}
+
+function PlotMarker({ feature }) {
+    const plot = feature.properties
+    const [lon, lat] = feature.geometry.coordinates
+    const color = statusColors[plot.status] || '#3b82f6'
+
+    return (
+        <Marker position={[lat, lon]} icon={createIcon(plot.status)}>
+            <Popup>
+                <div style={{ fontFamily: 'Inter, sans-serif', minWidth: 200 }}>
+                    <strong style={{ fontSize: '14px' }}>{plot.id}</strong>
+                    <br />
+                    <span style={{ fontSize: '12px', color: '#666' }}>{plot.name}</span>
+                    <br />
+                    <span style={{
+                        display: 'inline-block',
+                        marginTop: '6px',
+                        padding: '2px 8px',
+                        borderRadius: '4px',
+                        fontSize: '11px',
+                        fontWeight: 600,
+                        background: color + '20',
+                        color: color,
+                    }}>
+                        {plot.status}
+                    </span>
+                    <br />
+                    <span style={{ fontSize: '11px', color: '#888', marginTop: '4px', display: 'block' }}>
+                        Lessee: {plot.lessee} | Area: {plot.area_sqm?.toLocaleString()} sqm
+                    </span>
+                </div>
+            </Popup>
+            {plot.boundary ? (
+                <Polygon
+                    positions={plot.boundary}
+                    pathOptions={{ color, fillColor: color, fillOpacity: 0.2, weight: 1 }}
+                />
+            ) : (
+                <Circle
+                    center={[lat, lon]}
+                    radius={200}
+                    pathOptions={{ color, fillColor: color, fillOpacity: 0.1, weight: 1 }}
+                />
+            )}
+        </Marker>
+    )
+}
+
+// Loads the clustered map feed for the current viewport after every pan or zoom
+function PlotFeed() {
+    const map = useMap()
+    const [features, setFeatures] = useState([])
+    const pending = useRef(null)
+
+    const load = async () => {
+        pending.current?.abort()
+        const controller = new AbortController()
+        pending.current = controller
+        const bounds = map.getBounds()
+        const bbox = [
+            Math.max(bounds.getWest(), -180), Math.max(bounds.getSouth(), -90),
+            Math.min(bounds.getEast(), 180), Math.min(bounds.getNorth(), 90),
+        ].map(v => v.toFixed(5)).join(',')
+        try {
+            const res = await fetch(`${API}/api/map/plots?bbox=${bbox}&zoom=${map.getZoom()}`, { signal: controller.signal })
+            if (res.ok) setFeatures((await res.json()).features || [])
+        } catch {
+            // Aborted by a newer viewport, or the API is unreachable: keep what is shown
+        }
     }
 
+    useMapEvents({ moveend: load })
+    useEffect(() => {
+        load()
+        return () => pending.current?.abort()
+    }, [])
+
+    return features.map(feature => feature.properties.cluster
+        ? <ClusterMarker key={feature.properties.cluster_id} feature={feature} />
+        : <PlotMarker key={feature.properties.id} feature={feature} />
+    )
+}
+
+export default function MapView() {
+    const center = [21.2514, 81.6296] // Raipur, Chhattisgarh
+
     return (
         <MapContainer
             center={center}
@@ -47,48 +174,7 @@ export default function MapView({ plots }) {
                 attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'
                 url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
             />
-            {plots.map(plot => (
-                <Marker
-                    key={plot.id}
-                    position={plot.coordinates}
-                    icon={createIcon(plot.status)}
-                >
-                    <Popup>
-                        <div style={{ fontFamily: 'Inter, sans-serif', minWidth: 200 }}>
-                            <strong style={{ fontSize: '14px' }}>{plot.id}</strong>
-                            <br />
-                            <span style={{ fontSize: '12px', color: '#666' }}>{plot.name}</span>
-                            <br />
-                            <span style={{
-                                display: 'inline-block',
-                                marginTop: '6px',
-                                padding: '2px 8px',
-                                borderRadius: '4px',
-                                fontSize: '11px',
-                                fontWeight: 600,
-                                background: (statusColors[plot.status] || '#3b82f6') + '20',
-                                color: statusColors[plot.status] || '#3b82f6',
-                            }}>
-                                {plot.status}
-                            </span>
-                            <br />
-                            <span style={{ fontSize: '11px', color: '#888', marginTop: '4px', display: 'block' }}>
-                                Lessee: {plot.lessee} | Area: {plot.area_sqm?.toLocaleString()} sqm
-                            </span>
-                        </div>
-                    </Popup>
-                    <Circle
-                        center={plot.coordinates}
-                        radius={200}
-                        pathOptions={{
-                            color: statusColors[plot.status] || '#3b82f6',
-                            fillColor: statusColors[plot.status] || '#3b82f6',
-                            fillOpacity: 0.1,
-                            weight: 1,
-                        }}
-                    />
-                </Marker>
-            ))}
+            <PlotFeed />
         </MapContainer>
     )
 }
@@ -5,17 +5,51 @@ const API = 'http://localhost:8000'
 
 export default function PlotsPage() {
     const [plots, setPlots] = useState([])
+    const [total, setTotal] = useState(0)
+    const [nextCursor, setNextCursor] = useState(null)
+    const [areas, setAreas] = useState([])
     const [search, setSearch] = useState('')
     const [filter, setFilter] = useState('all')
     const [areaFilter, setAreaFilter] = useState('all')
     const [selectedPlot, setSelectedPlot] = useState(null)
+    const [trend, setTrend] = useState(null)
 
-    useEffect(() => { fetchPlots() }, [])
+    useEffect(() => {
+        fetch(`${API}/api/industrial-areas`)
+            .then(res => res.json())
+            .then(data => setAreas((data.areas || []).map(a => a.name)))
+            .catch(() => setAreas([]))
+    }, [])
 
-    const fetchPlots = async () => {
+    // Filtering, search and paging happen on the server; refetch when they change
+    useEffect(() => {
+        const timer = setTimeout(() => fetchPlots(), 250)
+        return () => clearTimeout(timer)
+    }, [search, filter, areaFilter])
+
+    useEffect(() => {
+        setTrend(null)
+        if (!selectedPlot) return
+        fetch(`${API}/api/plots/${selectedPlot.id}/trend`)
+            .then(res => res.ok ? res.json() : null)
+            .then(setTrend)
+            .catch(() => setTrend(null))
+    }, [selectedPlot])
+
+    const fetchPlots = async (cursor = null) => {
+        const params = new URLSearchParams({ limit: 50 })
+        if (search) params.set('q', search)
+        if (filter === 'compliant') params.set('compliant', 'true')
+        if (filter === 'violations') params.set('compliant', 'false')
+        if (filter === 'dues') params.set('has_dues', 'true')
+        if (areaFilter !== 'all') params.set('area', areaFilter)
+        if (cursor) params.set('cursor', cursor)
         try {
-            const res = await fetch(`${API}/api/plots`)
-            setPlots((await res.json()).plots || [])
+            const res = await fetch(`${API}/api/plots?${params}`)
+            const data = await res.json()
+            setPlots(prev => cursor ? [...prev, ...(data.plots || [])] : (data.plots || []))
+            setTotal(data.total || 0)
+            setNextCursor(data.next_cursor || null)
         } catch {
             // fallback handled in render
         }
@@ -34,26 +68,12 @@ export default function PlotsPage() {
         return 'badge-info'
     }
 
-    const areas = [...new Set(plots.map(p => p.industrial_area))].filter(Boolean)
-
-    const filtered = plots.filter(p => {
-        const matchSearch = p.name.toLowerCase().includes(search.toLowerCase()) ||
-            p.id.toLowerCase().includes(search.toLowerCase()) ||
-            (p.lessee || '').toLowerCase().includes(search.toLowerCase())
-        const matchStatus = filter === 'all' ||
-            (filter === 'compliant' && p.status === 'Compliant') ||
-            (filter === 'violations' && p.status !== 'Compliant') ||
-            (filter === 'dues' && p.dues_pending > 0)
-        const matchArea = areaFilter === 'all' || p.industrial_area === areaFilter
-        return matchSearch && matchStatus && matchArea
-    })
-
     return (
         <>
             <header className="page-header">
                 <div>
                     <h2>Plot Registry</h2>
-                    <p>Complete inventory of {plots.length} monitored industrial land parcels</p>
+                    <p>Complete inventory of {total} monitored industrial land parcels</p>
                 </div>
                 <div className="header-actions">
                     <a href="https://cggis.cgstate.gov.in/csidc/" target="_blank" rel="noopener noreferrer" className="btn btn-secondary">
@@ -105,7 +125,7 @@ export default function PlotsPage() {
                                 </tr>
                             </thead>
                             <tbody>
-                                {filtered.map(plot => (
+                                {plots.map(plot => (
                                     <tr key={plot.id} onClick={() => setSelectedPlot(selectedPlot?.id === plot.id ? null : plot)} style={{ cursor: 'pointer' }}>
                                         <td style={{ fontWeight: 600 }}>{plot.id}</td>
                                         <td style={{ fontSize: 12 }}>{plot.name}</td>
@@ -129,6 +149,13 @@ export default function PlotsPage() {
                                 ))}
                             </tbody>
                         </table>
+                        {nextCursor && (
+                            <div style={{ padding: 16, textAlign: 'center' }}>
+                                <button className="btn btn-secondary" onClick={() => fetchPlots(nextCursor)}>
+                                    Load more ({plots.length} of {total})
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
 
@@ -178,6 +205,21 @@ export default function PlotsPage() {
                                     <div className="summary-row"><span className="label">Built Area</span><span className="value">{selectedPlot.constructed_area_pct}%</span></div>
                                 </div>
                             </div>
+                            {trend?.points?.length > 0 && (
+                                <div className="summary-box" style={{ padding: 14, marginTop: 16 }}>
+                                    <h4 style={{ fontSize: 12, color: 'var(--text-muted)', marginBottom: 10, textTransform: 'uppercase' }}>Monitoring Trend</h4>
+                                    <div className="summary-row"><span className="label">Passes Since Baseline</span><span className="value">{trend.statistics.passes}</span></div>
+                                    <div className="summary-row"><span className="label">Change / 30 days</span><span className="value">{trend.statistics.change_percentage_per_30d ?? '—'}{trend.statistics.change_percentage_per_30d != null && '%'}</span></div>
+                                    <div className="summary-row"><span className="label">Active Deviations</span><span className="value">{trend.active_deviations}</span></div>
+                                    <div className="summary-row"><span className="label">First Detected</span><span className="value">{trend.earliest_active_detection?.slice(0, 10) || '—'}</span></div>
+                                    <div style={{ display: 'flex', alignItems: 'flex-end', gap: 4, height: 60, marginTop: 10 }}>
+                                        {trend.points.map(p => (
+                                            <div key={p.pass_id} title={`${p.captured_at.slice(0, 10)}: ${p.change_percentage}%`}
+                                                style={{ flex: 1, maxWidth: 24, height: `${Math.max(4, Math.min(100, p.change_percentage * 5))}%`, background: p.reference_id === trend.baseline?.reference_id ? 'var(--accent-amber)' : 'var(--bg-secondary)', borderRadius: 2 }} />
+                                        ))}
+                                    </div>
+                                </div>
+                            )}
                         </div>
                     </div>
                 )}
@@ -8,28 +8,33 @@ const COLORS = ['#10b981', '#ef4444', '#f59e0b', '#8b5cf6', '#06b6d4']
 export default function ReportsPage() {
     const [analyses, setAnalyses] = useState([])
     const [stats, setStats] = useState(null)
-    const [plots, setPlots] = useState([])
+    const [areas, setAreas] = useState([])
+    const [reportArea, setReportArea] = useState('')
 
     useEffect(() => { fetchData() }, [])
 
     const fetchData = async () => {
         try {
-            const [aRes, sRes, pRes] = await Promise.all([
-                fetch(`${API}/api/analyses`), fetch(`${API}/api/dashboard/stats`), fetch(`${API}/api/plots`)
+            const [aRes, sRes, iaRes] = await Promise.all([
+                fetch(`${API}/api/analyses`), fetch(`${API}/api/dashboard/stats`), fetch(`${API}/api/industrial-areas`)
             ])
             setAnalyses((await aRes.json()).analyses || [])
             setStats(await sRes.json())
-            setPlots((await pRes.json()).plots || [])
+            const list = (await iaRes.json()).areas || []
+            setAreas(list)
+            setReportArea(list[0]?.id || '')
         } catch { setAnalyses([]); }
     }
 
     const exportPlots = () => window.open(`${API}/api/export/plots`, '_blank')
     const exportAlerts = () => window.open(`${API}/api/export/alerts`, '_blank')
+    const downloadAreaReport = () => reportArea && window.open(`${API}/api/industrial-areas/${reportArea}/report`, '_blank')
 
-    const complianceDistribution = plots.length > 0 ? [
-        { name: 'High (70-100)', value: plots.filter(p => p.compliance_score >= 70).length },
-        { name: 'Medium (40-69)', value: plots.filter(p => p.compliance_score >= 40 && p.compliance_score < 70).length },
-        { name: 'Low (0-39)', value: plots.filter(p => p.compliance_score < 40).length },
+    const bands = stats?.compliance_bands
+    const complianceDistribution = bands ? [
+        { name: 'High (70-100)', value: bands.high },
+        { name: 'Medium (40-69)', value: bands.medium },
+        { name: 'Low (0-39)', value: bands.low },
     ] : []
 
     return (
@@ -57,6 +62,15 @@ export default function ReportsPage() {
                                 <button className="btn btn-secondary" onClick={exportAlerts} style={{ justifyContent: 'center' }}>
                                     <Download size={16} /> Export Alerts (CSV)
                                 </button>
+                                <div style={{ display: 'flex', gap: 8 }}>
+                                    <select value={reportArea} onChange={e => setReportArea(e.target.value)}
+                                        style={{ flex: 1, padding: '10px 12px', background: 'var(--bg-card)', border: '1px solid var(--border-color)', borderRadius: 10, color: 'var(--text-primary)', fontSize: 13, fontFamily: 'Inter', outline: 'none', cursor: 'pointer' }}>
+                                        {areas.map(a => <option key={a.id} value={a.id}>{a.name}</option>)}
+                                    </select>
+                                    <button className="btn btn-secondary" onClick={downloadAreaReport} disabled={!reportArea}>
+                                        <FileText size={16} /> Area Report (PDF)
+                                    </button>
+                                </div>
                             </div>
                         </div>
                     </div>